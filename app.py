@@ -1,111 +1,125 @@
-from flask import Flask, jsonify, request, send_from_directory, Blueprint
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from flask import Flask, jsonify, request, send_from_directory, send_file, Blueprint
 import os
-import requests
-from datetime import datetime
-
-app = Flask(__name__, static_folder='dist/public', static_url_path='')
+import hashlib
+from psycopg2.extras import Json
+from db_pool import db_connection, get_pool
+from migrations import migrate
+import catalog
+from catalog_cache import products_cache, is_enabled as catalog_cache_enabled
+import compression
+import metrics
+from query_profiler import profiler
+from static_assets import static_files
+from fast_json import FastJSONProvider
+from config_cache import settings_file
+import orders
+import cart
+import users
+
+# dist/public is served by serve_react from an in-memory index (see static_assets.py)
+app = Flask(__name__, static_folder=None)
+app.json = FastJSONProvider(app)
+compression.init_app(app)
+metrics.init_app(app)
 
 # Create API Blueprint with /api prefix for Render deployment
 api = Blueprint('api', __name__, url_prefix='/api')
 
 
-# Database connection
-def get_db_connection():
-    # Use DATABASE_URL if available, otherwise build from individual vars
-    database_url = os.getenv('DATABASE_URL')
-    
-    if database_url:
-        # Check if this is a remote Neon database (contains neon.tech)
-        # Local PostgreSQL on VPS doesn't need sslmode
-        if 'neon.tech' in database_url or 'amazonaws.com' in database_url:
-            if 'sslmode=' not in database_url:
-                database_url = database_url + ('&' if '?' in database_url else '?') + 'sslmode=require'
-        conn = psycopg2.connect(database_url, cursor_factory=RealDictCursor)
-    else:
-        # Build connection from individual PostgreSQL environment variables
-        conn = psycopg2.connect(
-            host=os.getenv('PGHOST', 'localhost'),
-            port=os.getenv('PGPORT', '5432'),
-            user=os.getenv('PGUSER'),
-            password=os.getenv('PGPASSWORD'),
-            database=os.getenv('PGDATABASE'),
-            cursor_factory=RealDictCursor
-        )
-    return conn
-
-# Initialize database tables
+# Initialize database tables (applies pending schema migrations, see migrations.py)
 def init_db():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    # Create products table
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS products (
-            id VARCHAR PRIMARY KEY DEFAULT gen_random_uuid(),
-            name TEXT NOT NULL,
-            description TEXT,
-            price INTEGER NOT NULL,
-            images TEXT[] NOT NULL,
-            category_id TEXT
-        )
-    ''')
-    
-    # Create users table if not exists
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id VARCHAR PRIMARY KEY DEFAULT gen_random_uuid(),
-            username TEXT,
-            password TEXT,
-            telegram_id BIGINT UNIQUE,
-            first_name TEXT,
-            last_name TEXT
-        )
-    ''')
-    
-    # Create favorites table (many-to-many: users <-> products)
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS favorites (
-            id VARCHAR PRIMARY KEY DEFAULT gen_random_uuid(),
-            user_id VARCHAR REFERENCES users(id) ON DELETE CASCADE,
-            product_id VARCHAR REFERENCES products(id) ON DELETE CASCADE,
-            UNIQUE(user_id, product_id)
-        )
-    ''')
-    
-    # Create cart table
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS cart (
-            id VARCHAR PRIMARY KEY DEFAULT gen_random_uuid(),
-            user_id VARCHAR REFERENCES users(id) ON DELETE CASCADE,
-            product_id VARCHAR REFERENCES products(id) ON DELETE CASCADE,
-            quantity INTEGER NOT NULL DEFAULT 1,
-            UNIQUE(user_id, product_id)
-        )
-    ''')
-    
-    conn.commit()
-    cur.close()
-    conn.close()
+    migrate()
+
+# Conditional GET helpers
+def _make_etag(prefix, version, *parts):
+    digest = hashlib.sha1('\x00'.join(parts).encode('utf-8')).hexdigest()[:16]
+    return f'{prefix}{version}-{digest}'
+
+def _set_validators(response, etag, last_modified=None):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # Clients may keep the body but must revalidate on every open
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def _not_modified(etag, last_modified=None):
+    """Returns a 304 response if the request's validators match, otherwise None"""
+    if request.if_none_match:
+        # Compressed representations carry a coding suffix (see compression.py)
+        candidates = [etag] + [f'{etag}-{enc}' for enc in compression.available_encodings()]
+        matched = next((c for c in candidates if request.if_none_match.contains(c)), None)
+        if matched is None:
+            return None
+        etag = matched
+    elif not (last_modified and request.if_modified_since
+              and last_modified.replace(microsecond=0) <= request.if_modified_since):
+        return None
+    return _set_validators(app.response_class(status=304), etag, last_modified)
+
+def _catalog_version():
+    """Returns (version, updated_at) of the products table without reading it"""
+    if catalog_cache_enabled():
+        return products_cache.version()
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute('SELECT version, updated_at FROM catalog_version')
+        row = cur.fetchone()
+        cur.close()
+    return (row['version'], row['updated_at']) if row else (0, None)
 
 # API Routes
 
 @app.route('/api/config', methods=['GET'])
 def get_config():
     try:
-        import json
-        from flask import Response
-        config_path = os.path.join(os.path.dirname(__file__), 'config', 'settings.json')
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        return Response(
-            json.dumps(config, ensure_ascii=False),
+        entry = settings_file.get()
+        not_modified = _not_modified(entry.etag, entry.last_modified)
+        if not_modified:
+            return not_modified
+
+        # Serve the pre-serialized (and pre-compressed) bytes as-is
+        encoding = compression.negotiate(request.accept_encodings)
+        response = app.response_class(
+            entry.compressed.get(encoding, entry.body),
             mimetype='application/json; charset=utf-8'
         )
+        response.vary.add('Accept-Encoding')
+        etag = entry.etag
+        if encoding in entry.compressed:
+            response.headers['Content-Encoding'] = encoding
+            etag = f'{etag}-{encoding}'
+        return _set_validators(response, etag, entry.last_modified)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/health', methods=['GET'])
+def health():
+    # Pool counters are per worker process; `in_use` is connections checked out right now
+    return jsonify({
+        'status': 'ok',
+        'db_pool': get_pool().stats(),
+        'catalog_cache': products_cache.stats() if catalog_cache_enabled() else None,
+        'user_cache': users.user_cache.stats(),
+        'static_files': static_files.stats(),
+    })
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    # Totals of all workers (and the notification dispatcher), see metrics.py
+    return app.response_class(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/debug/queries', methods=['GET'])
+def get_query_profile():
+    # Heaviest SQL fingerprints of this worker process (QUERY_PROFILE=1), see query_profiler.py
+    if not profiler.enabled:
+        return jsonify({'error': 'Query profiling is disabled (QUERY_PROFILE=1)'}), 404
+    limit = request.args.get('limit', 20, type=int)
+    queries = profiler.top(limit)
+    if request.args.get('reset') == '1':
+        profiler.reset()
+    return jsonify({'pid': os.getpid(), 'queries': queries})
+
 @app.route('/config/<path:filename>')
 def serve_config_files(filename):
     try:
@@ -113,39 +127,61 @@ def serve_config_files(filename):
     except Exception as e:
         return jsonify({'error': str(e)}), 404
 
-@app.route('/api/products', methods=['GET'])
-def get_products():
+def _products_page(filters, etag_prefix):
     try:
-        category = request.args.get('category')
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        if category:
-            cur.execute('SELECT * FROM products WHERE category_id = %s', (category,))
+        version, last_modified = _catalog_version()
+        etag = _make_etag(etag_prefix, version, *sorted(f'{k}={v}' for k, v in request.args.items(multi=True)))
+        not_modified = _not_modified(etag, last_modified)
+        if not_modified:
+            return not_modified
+        # Search needs the trigram/full-text indexes, so it always goes to the database
+        if catalog_cache_enabled() and not filters['q']:
+            page = products_cache.get_page(filters)
         else:
-            cur.execute('SELECT * FROM products')
-        
-        products = cur.fetchall()
-        cur.close()
-        conn.close()
-        return jsonify(products)
+            with db_connection() as conn:
+                cur = conn.cursor()
+                page = catalog.fetch_page(cur, filters)
+                cur.close()
+        return _set_validators(jsonify(page), etag, last_modified)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/products', methods=['GET'])
+def get_products():
+    try:
+        filters = catalog.parse_query(request.args)
+    except catalog.InvalidQuery as e:
+        return jsonify({'error': str(e)}), 400
+    return _products_page(filters, 'c')
+
+@app.route('/api/products/search', methods=['GET'])
+def search_products():
+    # Same filters and page shape as /api/products, ranked by relevance unless sort is given
+    if not (request.args.get('q') or '').strip():
+        return jsonify({'error': 'q is required'}), 400
+    try:
+        filters = catalog.parse_query(request.args, default_sort=catalog.RELEVANCE)
+    except catalog.InvalidQuery as e:
+        return jsonify({'error': str(e)}), 400
+    return _products_page(filters, 's')
+
 @app.route('/api/products', methods=['POST'])
 def create_product():
     try:
         data = request.json
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            'INSERT INTO products (name, description, price, images, category_id) VALUES (%s, %s, %s, %s, %s) RETURNING *',
-            (data['name'], data.get('description'), data['price'], data['images'], data.get('category_id'))
-        )
-        product = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                'INSERT INTO products (name, description, price, images, image_variants, category_id) '
+                'VALUES (%s, %s, %s, %s, %s, %s) RETURNING *',
+                (data['name'], data.get('description'), data['price'], data['images'],
+                 Json(data.get('image_variants') or []), data.get('category_id'))
+            )
+            product = cur.fetchone()
+            conn.commit()
+            cur.close()
+        # The trigger notifies other workers; don't wait for the round trip here
+        products_cache.invalidate()
         return jsonify(product), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -153,15 +189,27 @@ def create_product():
 @app.route('/api/products/<product_id>', methods=['GET'])
 def get_product(product_id):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute('SELECT * FROM products WHERE id = %s', (product_id,))
-        product = cur.fetchone()
-        cur.close()
-        conn.close()
+        projection = catalog.parse_projection(request.args, default='detail')
+    except catalog.InvalidQuery as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        version, last_modified = _catalog_version()
+        etag = _make_etag('p', version, product_id, projection.name)
+        not_modified = _not_modified(etag, last_modified)
+        if not_modified:
+            return not_modified
+        if catalog_cache_enabled():
+            product = products_cache.get_product(product_id)
+            product = projection.from_row(product) if product else None
+        else:
+            with db_connection() as conn:
+                cur = conn.cursor()
+                cur.execute(f'SELECT {projection.select_sql()} FROM products WHERE id = %s', (product_id,))
+                product = cur.fetchone()
+                cur.close()
         
         if product:
-            return jsonify(product)
+            return _set_validators(jsonify(product), etag, last_modified)
         return jsonify({'error': 'Product not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -169,16 +217,19 @@ def get_product(product_id):
 @app.route('/api/favorites/<user_id>', methods=['GET'])
 def get_favorites(user_id):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute('''
-            SELECT p.* FROM products p
-            JOIN favorites f ON p.id = f.product_id
-            WHERE f.user_id = %s
-        ''', (user_id,))
-        favorites = cur.fetchall()
-        cur.close()
-        conn.close()
+        projection = catalog.parse_projection(request.args)
+    except catalog.InvalidQuery as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f'''
+                SELECT {projection.select_sql('p')} FROM products p
+                JOIN favorites f ON p.id = f.product_id
+                WHERE f.user_id = %s
+            ''', (user_id,))
+            favorites = cur.fetchall()
+            cur.close()
         return jsonify(favorites)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -187,16 +238,15 @@ def get_favorites(user_id):
 def add_to_favorites():
     try:
         data = request.json
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            'INSERT INTO favorites (user_id, product_id) VALUES (%s, %s) ON CONFLICT (user_id, product_id) DO NOTHING RETURNING *',
-            (data['user_id'], data['product_id'])
-        )
-        favorite = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                'INSERT INTO favorites (user_id, product_id) VALUES (%s, %s) ON CONFLICT (user_id, product_id) DO NOTHING RETURNING *',
+                (data['user_id'], data['product_id'])
+            )
+            favorite = cur.fetchone()
+            conn.commit()
+            cur.close()
         return jsonify(favorite), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -204,15 +254,14 @@ def add_to_favorites():
 @app.route('/api/favorites/<user_id>/<product_id>', methods=['DELETE'])
 def remove_from_favorites(user_id, product_id):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            'DELETE FROM favorites WHERE user_id = %s AND product_id = %s',
-            (user_id, product_id)
-        )
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                'DELETE FROM favorites WHERE user_id = %s AND product_id = %s',
+                (user_id, product_id)
+            )
+            conn.commit()
+            cur.close()
         return jsonify({'message': 'Removed from favorites'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -221,38 +270,40 @@ def remove_from_favorites(user_id, product_id):
 @app.route('/api/auth/telegram', methods=['POST'])
 def telegram_auth():
     try:
-        data = request.json
-        telegram_id = data.get('telegram_id')
-        first_name = data.get('first_name', '')
-        last_name = data.get('last_name', '')
-        username = data.get('username', '')
-        
-        if not telegram_id:
-            return jsonify({'error': 'telegram_id is required'}), 400
-        
-        conn = get_db_connection()
-        cur = conn.cursor()
-        
-        # Check if user exists
-        cur.execute('SELECT * FROM users WHERE telegram_id = %s', (telegram_id,))
-        user = cur.fetchone()
-        
+        identity = users.parse_identity(request.json)
+    except users.InvalidIdentity as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        # Repeat logins with an unchanged profile are served from the per-worker cache
+        user = users.user_cache.get(identity)
         if user:
-            # User exists, return user data
-            cur.close()
-            conn.close()
             return jsonify({'user': user, 'is_new': False})
-        else:
-            # Create new user
-            cur.execute(
-                'INSERT INTO users (telegram_id, username, first_name, last_name) VALUES (%s, %s, %s, %s) RETURNING *',
-                (telegram_id, username, first_name, last_name)
-            )
-            new_user = cur.fetchone()
+        
+        with db_connection() as conn:
+            cur = conn.cursor()
+            user, is_new = users.upsert_user(cur, identity)
+            conn.commit()
+            cur.close()
+        users.user_cache.put(user)
+        return jsonify({'user': user, 'is_new': is_new}), 201 if is_new else 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# Mini App startup: user + cart + favorites in one request (see users.py)
+@app.route('/api/bootstrap', methods=['POST'])
+def bootstrap():
+    try:
+        identity = users.parse_identity(request.json)
+    except users.InvalidIdentity as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            result = users.bootstrap(cur, identity)
             conn.commit()
             cur.close()
-            conn.close()
-            return jsonify({'user': new_user, 'is_new': True}), 201
+        users.user_cache.put(result['user'])
+        return jsonify(result), 201 if result['is_new'] else 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -260,16 +311,19 @@ def telegram_auth():
 @app.route('/api/cart/<user_id>', methods=['GET'])
 def get_cart(user_id):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute('''
-            SELECT p.*, c.quantity FROM products p
-            JOIN cart c ON p.id = c.product_id
-            WHERE c.user_id = %s
-        ''', (user_id,))
-        cart_items = cur.fetchall()
-        cur.close()
-        conn.close()
+        projection = catalog.parse_projection(request.args)
+    except catalog.InvalidQuery as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f'''
+                SELECT {projection.select_sql('p')}, c.quantity FROM products p
+                JOIN cart c ON p.id = c.product_id
+                WHERE c.user_id = %s
+            ''', (user_id,))
+            cart_items = cur.fetchall()
+            cur.close()
         return jsonify(cart_items)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -278,20 +332,15 @@ def get_cart(user_id):
 def add_to_cart():
     try:
         data = request.json
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            '''INSERT INTO cart (user_id, product_id, quantity) 
-               VALUES (%s, %s, %s) 
-               ON CONFLICT (user_id, product_id) 
-               DO UPDATE SET quantity = cart.quantity + EXCLUDED.quantity
-               RETURNING *''',
-            (data['user_id'], data['product_id'], data.get('quantity', 1))
-        )
-        cart_item = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                cart.ADD_SQL,
+                (data['user_id'], data['product_id'], data.get('quantity', 1))
+            )
+            cart_item = cur.fetchone()
+            conn.commit()
+            cur.close()
         return jsonify(cart_item), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -300,34 +349,53 @@ def add_to_cart():
 def update_cart_quantity():
     try:
         data = request.json
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            'UPDATE cart SET quantity = %s WHERE user_id = %s AND product_id = %s RETURNING *',
-            (data['quantity'], data['user_id'], data['product_id'])
-        )
-        cart_item = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                'UPDATE cart SET quantity = %s WHERE user_id = %s AND product_id = %s RETURNING *',
+                (data['quantity'], data['user_id'], data['product_id'])
+            )
+            cart_item = cur.fetchone()
+            conn.commit()
+            cur.close()
         if cart_item:
             return jsonify(cart_item)
         return jsonify({'error': 'Cart item not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/cart/batch', methods=['POST'])
+def batch_update_cart():
+    data = request.json or {}
+    user_id = data.get('user_id')
+    if not user_id:
+        return jsonify({'error': 'user_id is required'}), 400
+    try:
+        operations = cart.parse_operations(data.get('operations'))
+    except cart.InvalidBatch as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        # All operations in one statement and one commit; returns the resulting cart
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cart_items = cart.apply_batch(cur, user_id, operations)
+            conn.commit()
+            cur.close()
+        return jsonify(cart_items)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/cart/<user_id>/<product_id>', methods=['DELETE'])
 def remove_from_cart(user_id, product_id):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            'DELETE FROM cart WHERE user_id = %s AND product_id = %s',
-            (user_id, product_id)
-        )
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                'DELETE FROM cart WHERE user_id = %s AND product_id = %s',
+                (user_id, product_id)
+            )
+            conn.commit()
+            cur.close()
         return jsonify({'message': 'Removed from cart'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -335,162 +403,69 @@ def remove_from_cart(user_id, product_id):
 @app.route('/api/cart/<user_id>', methods=['DELETE'])
 def clear_cart(user_id):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute('DELETE FROM cart WHERE user_id = %s', (user_id,))
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute('DELETE FROM cart WHERE user_id = %s', (user_id,))
+            conn.commit()
+            cur.close()
         return jsonify({'message': 'Cart cleared'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# Telegram notification function
-def send_telegram_notification(user_info, cart_items, total):
-    bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
-    chat_id = os.getenv('TELEGRAM_CHAT_ID')
-    
-    print(f"🔔 Attempting to send Telegram notification...")
-    print(f"Bot token exists: {bool(bot_token)}")
-    print(f"Chat ID exists: {bool(chat_id)}")
-    
-    if not bot_token or not chat_id:
-        print("❌ Telegram credentials not configured")
-        return False
-    
-    # Format the order message with detailed information
-    first_name = user_info.get('first_name', '')
-    last_name = user_info.get('last_name', '')
-    username = user_info.get('username', '')
-    telegram_id = user_info.get('telegram_id')
-    user_id = user_info.get('id', '')
-    
-    # Build full name
-    full_name = f"{first_name} {last_name}".strip()
-    if not full_name:
-        full_name = username or 'Неизвестный'
-    
-    # HTML escape helper function
-    def escape_html(text):
-        if text is None:
-            return ''
-        return str(text).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-    
-    # Calculate order details
-    total_items = sum(item['quantity'] for item in cart_items)
-    order_time = datetime.now().strftime('%d.%m.%Y в %H:%M')
-    
-    # Start building message with HTML formatting
-    message = "🔔 <b>НОВЫЙ ЗАКАЗ</b>\n"
-    message += "========================\n\n"
-    
-    # User information section
-    message += "👤 <b>ИНФОРМАЦИЯ О КЛИЕНТЕ</b>\n"
-    message += f"ФИО: <b>{escape_html(full_name)}</b>\n"
-    
-    if username:
-        message += f"Username: @{escape_html(username)}\n"
-    
-    if telegram_id:
-        message += f"Telegram ID: {telegram_id}\n"
-    
-    message += f"ID пользователя: {escape_html(user_id)}\n"
-    message += f"Дата заказа: {order_time}\n\n"
-    
-    # Order details section
-    message += "📦 <b>ДЕТАЛИ ЗАКАЗА</b>\n"
-    message += f"Всего позиций: {len(cart_items)} шт.\n"
-    message += f"Общее количество: {total_items} ед.\n\n"
-    
-    # Items list
-    message += "🛒 <b>СОСТАВ ЗАКАЗА</b>\n"
-    for idx, item in enumerate(cart_items, 1):
-        item_name = escape_html(item['name'])
-        item_quantity = item['quantity']
-        item_price = item['price']
-        item_total = item_price * item_quantity
-        
-        message += f"{idx}. <b>{item_name}</b>\n"
-        message += f"   Цена: {item_price:,} сум x {item_quantity} шт.\n"
-        message += f"   Сумма: <b>{item_total:,} сум</b>\n\n"
-    
-    # Total section
-    message += "========================\n"
-    message += f"💰 <b>ИТОГО К ОПЛАТЕ: {total:,} сум</b>\n"
-    message += "========================"
-    
-    # Send message via Telegram Bot API
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    payload = {
-        'chat_id': chat_id,
-        'text': message,
-        'parse_mode': 'HTML'
-    }
-    
-    try:
-        print(f"📤 Sending message to Telegram...")
-        print(f"Message preview: {message[:100]}...")
-        response = requests.post(url, json=payload, timeout=10)
-        if response.status_code == 200:
-            print(f"✅ Telegram notification sent successfully!")
-            return True
-        else:
-            print(f"❌ Telegram API error (status {response.status_code}): {response.text}")
-            return False
-    except Exception as e:
-        print(f"❌ Failed to send Telegram notification: {e}")
-        return False
-
 # Order endpoint
 @app.route('/api/orders', methods=['POST'])
 def create_order():
     try:
-        data = request.json
+        data = request.json or {}
         user_id = data.get('user_id')
-        cart_items = data.get('items', [])
-        total = data.get('total', 0)
+        if not user_id:
+            return jsonify({'error': 'user_id is required'}), 400
         
         print(f"\n{'='*50}")
         print(f"📦 NEW ORDER REQUEST")
         print(f"{'='*50}")
         print(f"User ID: {user_id}")
-        print(f"Items count: {len(cart_items)}")
-        print(f"Total: {total}")
-        print(f"Items: {cart_items}")
         
-        # Get user info
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute('SELECT * FROM users WHERE id = %s', (user_id,))
-        user_info = cur.fetchone()
-        
-        if not user_info:
-            print(f"⚠️ User not found in database: {user_id}")
-            print(f"❌ Cannot send notification - user not found")
-        else:
-            print(f"✅ User found: {user_info}")
-            # Send Telegram notification
-            notification_sent = send_telegram_notification(user_info, cart_items, total)
-            if notification_sent:
-                print(f"✅ Order notification sent successfully")
-            else:
-                print(f"⚠️ Order notification failed to send")
+        # Items, prices and total come from the cart and products tables, not the client.
+        # One statement creates the order, clears the cart and queues the owner's
+        # notification (sent by notification_dispatcher.py)
+        with db_connection() as conn:
+            cur = conn.cursor()
+            order = orders.checkout(cur, user_id)
+            conn.commit()
+            cur.close()
         
-        # Clear the cart after order
-        cur.execute('DELETE FROM cart WHERE user_id = %s', (user_id,))
-        conn.commit()
-        cur.close()
-        conn.close()
+        if order is None:
+            print(f"⚠️ Cart is empty for user: {user_id}")
+            return jsonify({'error': 'Cart is empty'}), 400
         
+        print(f"✅ Order #{order['id']} created: {order['items_count']} item(s), total {order['total']}")
         print(f"{'='*50}\n")
         
-        return jsonify({'message': 'Order created successfully'}), 201
+        return jsonify(order), 201
     except Exception as e:
         print(f"❌ ERROR creating order: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/orders/<user_id>', methods=['GET'])
+def get_orders(user_id):
+    try:
+        limit = min(max(int(request.args.get('limit', orders.DEFAULT_LIMIT)), 1), orders.MAX_LIMIT)
+        before = request.args.get('before')
+        before = int(before) if before else None
+    except ValueError:
+        return jsonify({'error': 'limit and before must be numbers'}), 400
+    try:
+        with db_connection() as conn:
+            cur = conn.cursor()
+            user_orders = orders.list_orders(cur, user_id, limit, before)
+            cur.close()
+        return jsonify(user_orders)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 # ============================================================
 # API Blueprint Routes (with /api prefix for Render deployment)
 # ============================================================
@@ -499,6 +474,10 @@ def create_order():
 def api_get_products():
     return get_products()
 
+@api.route('/products/search', methods=['GET'])
+def api_search_products():
+    return search_products()
+
 @api.route('/products', methods=['POST'])
 def api_create_product():
     return create_product()
@@ -523,6 +502,10 @@ def api_remove_from_favorites(user_id, product_id):
 def api_auth_telegram():
     return telegram_auth()
 
+@api.route('/bootstrap', methods=['POST'])
+def api_bootstrap():
+    return bootstrap()
+
 @api.route('/cart/<user_id>', methods=['GET'])
 def api_get_cart(user_id):
     return get_cart(user_id)
@@ -535,6 +518,10 @@ def api_add_to_cart():
 def api_update_cart():
     return update_cart_quantity()
 
+@api.route('/cart/batch', methods=['POST'])
+def api_batch_update_cart():
+    return batch_update_cart()
+
 @api.route('/cart/<user_id>/<product_id>', methods=['DELETE'])
 def api_remove_from_cart(user_id, product_id):
     return remove_from_cart(user_id, product_id)
@@ -547,28 +534,54 @@ def api_clear_cart(user_id):
 def api_create_order():
     return create_order()
 
+@api.route('/orders/<user_id>', methods=['GET'])
+def api_get_orders(user_id):
+    return get_orders(user_id)
+
 # Register the API blueprint
 app.register_blueprint(api)
 
+def _asset_response(asset):
+    if asset.body is None:
+        # Too large to keep in memory
+        return send_file(asset.path, mimetype=asset.content_type, conditional=True)
+    not_modified = _not_modified(asset.etag, asset.last_modified)
+    if not_modified:
+        not_modified.headers['Cache-Control'] = asset.cache_control
+        return not_modified
+
+    encoding = compression.negotiate(request.accept_encodings)
+    response = app.response_class(asset.compressed.get(encoding, asset.body), content_type=asset.content_type)
+    etag = asset.etag
+    if asset.compressed:
+        response.vary.add('Accept-Encoding')
+    if encoding in asset.compressed:
+        response.headers['Content-Encoding'] = encoding
+        etag = f'{etag}-{encoding}'
+    _set_validators(response, etag, asset.last_modified)
+    response.headers['Cache-Control'] = asset.cache_control
+    return response
+
 # Serve React App - this must be the last route
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve_react(path):
-    # If path is a file and exists in static folder, serve it
-    if path and os.path.exists(os.path.join(app.static_folder, path)):
-        return send_from_directory(app.static_folder, path)
-    # Otherwise, serve index.html for SPA routing
-    return send_from_directory(app.static_folder, 'index.html')
-
-# Initialize database tables on startup
-try:
-    init_db()
-    print("Database tables initialized successfully")
-except Exception as e:
-    print(f"Warning: Could not initialize database tables: {e}")
+    # Files and the index.html fallback for SPA routes come from memory
+    asset = static_files.lookup(path)
+    if asset is None:
+        return jsonify({'error': 'File not found'}), 404
+    return _asset_response(asset)
+
+# Index the SPA build once per worker, before the first request
+static_files.load()
 
 # Production: Gunicorn will use the 'app' object directly
 # For local development, you can still run: python app.py
+# Schema migrations are not run on import: run `python migrations.py` once per deploy
 if __name__ == '__main__':
+    try:
+        init_db()
+    except Exception as e:
+        print(f"Warning: Could not initialize database tables: {e}")
     port = int(os.getenv('PORT', 5000))
     app.run(host='0.0.0.0', port=port)
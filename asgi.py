@@ -0,0 +1,598 @@
+"""
+Asynchronous (ASGI) serving mode for the shop API.
+
+Serves the same /api routes as app.py, with the same request and response
+formats, from an asyncio event loop backed by an async Postgres pool
+(psycopg 3). A request that waits on the database no longer ties up a
+whole worker, so one process serves hundreds of concurrent Mini App
+clients instead of one per gunicorn sync worker.
+
+The SQL is shared with the Flask app (catalog.py, cart.py, orders.py,
+users.py); the in-process catalog and config caches are reused as-is.
+
+Run (optional dependencies: pip install -r requirements-async.txt):
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+    SERVER_MODE=async ./start_production.sh
+
+Settings (environment variables):
+    ASYNC_DB_POOL_MIN_SIZE   connections opened at startup (default 2)
+    ASYNC_DB_POOL_MAX_SIZE   max connections per process (default 20)
+    ASYNC_DB_POOL_TIMEOUT    seconds to wait for a free connection (default 10)
+"""
+
+import hashlib
+import os
+from contextlib import asynccontextmanager
+from email.utils import format_datetime, parsedate_to_datetime
+
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+from psycopg_pool import AsyncConnectionPool
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.responses import FileResponse, Response
+from starlette.routing import Route
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+import cart
+import catalog
+import compression
+import fast_json
+import metrics
+import orders
+import users
+from catalog_cache import products_cache, is_enabled as catalog_cache_enabled
+from config_cache import settings_file
+from db_pool import connect_params
+from query_profiler import ProfiledAsyncCursor, profiler
+from static_assets import static_files
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CONFIG_DIR = os.path.join(BASE_DIR, 'config')
+
+_dsn, _connect_kwargs = connect_params()
+pool = AsyncConnectionPool(
+    make_conninfo(_dsn, **_connect_kwargs),
+    min_size=int(os.getenv('ASYNC_DB_POOL_MIN_SIZE', '2')),
+    max_size=int(os.getenv('ASYNC_DB_POOL_MAX_SIZE', '20')),
+    timeout=float(os.getenv('ASYNC_DB_POOL_TIMEOUT', '10')),
+    kwargs={'row_factory': dict_row, 'cursor_factory': ProfiledAsyncCursor},
+    open=False,
+)
+
+
+# ------------------------------------------------------------------
+# Responses
+# ------------------------------------------------------------------
+
+def _encoding(request):
+    accept = parse_accept_header(request.headers.get('accept-encoding', ''), Accept)
+    return compression.negotiate(accept)
+
+
+def json_response(request, data, status=200, etag=None, last_modified=None):
+    """
+    JSON response encoded like app.py (fast_json) and compressed like compression.init_app
+
+    Strong ETags of compressed bodies get a `-<coding>` suffix, as in the Flask app.
+    """
+    body = fast_json.dumps(data)
+    headers = {'Vary': 'Accept-Encoding'}
+    encoding = _encoding(request) if len(body) >= compression.MIN_SIZE else None
+    if encoding:
+        body = compression.compress(body, encoding)
+        headers['Content-Encoding'] = encoding
+    if etag:
+        _set_validators(headers, f'{etag}-{encoding}' if encoding else etag, last_modified)
+    return Response(body, status_code=status, media_type='application/json', headers=headers)
+
+
+def error(request, message, status):
+    return json_response(request, {'error': message}, status)
+
+
+# ------------------------------------------------------------------
+# Conditional GET (same validators as app.py)
+# ------------------------------------------------------------------
+
+def _make_etag(prefix, version, *parts):
+    digest = hashlib.sha1('\x00'.join(parts).encode('utf-8')).hexdigest()[:16]
+    return f'{prefix}{version}-{digest}'
+
+
+def _set_validators(headers, etag, last_modified=None):
+    headers['ETag'] = f'"{etag}"'
+    if last_modified:
+        headers['Last-Modified'] = format_datetime(last_modified.replace(microsecond=0), usegmt=True)
+    # Clients may keep the body but must revalidate on every open
+    headers['Cache-Control'] = 'no-cache'
+    return headers
+
+
+def _not_modified(request, etag, last_modified=None):
+    """Returns a 304 response if the request's validators match, otherwise None"""
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match:
+        tags = {tag.strip().removeprefix('W/').strip('"') for tag in if_none_match.split(',')}
+        # Compressed representations carry a coding suffix
+        candidates = [etag] + [f'{etag}-{enc}' for enc in compression.available_encodings()]
+        matched = next((c for c in candidates if c in tags or '*' in tags), None)
+        if matched is None:
+            return None
+        etag = matched
+    else:
+        if_modified_since = request.headers.get('if-modified-since')
+        if not (last_modified and if_modified_since):
+            return None
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        if since.tzinfo is None or last_modified.replace(microsecond=0) > since:
+            return None
+    return Response(status_code=304, headers=_set_validators({}, etag, last_modified))
+
+
+async def _catalog_version():
+    """Returns (version, updated_at) of the products table without reading it"""
+    if catalog_cache_enabled():
+        return await run_in_threadpool(products_cache.version)
+    async with pool.connection() as conn:
+        cur = await conn.execute('SELECT version, updated_at FROM catalog_version')
+        row = await cur.fetchone()
+    return (row['version'], row['updated_at']) if row else (0, None)
+
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+# ------------------------------------------------------------------
+# API routes
+# ------------------------------------------------------------------
+
+async def get_config(request):
+    try:
+        entry = settings_file.get()
+        not_modified = _not_modified(request, entry.etag, entry.last_modified)
+        if not_modified:
+            return not_modified
+
+        # Serve the pre-serialized (and pre-compressed) bytes as-is
+        encoding = _encoding(request)
+        headers = {'Vary': 'Accept-Encoding'}
+        etag = entry.etag
+        if encoding in entry.compressed:
+            headers['Content-Encoding'] = encoding
+            etag = f'{etag}-{encoding}'
+        _set_validators(headers, etag, entry.last_modified)
+        return Response(entry.compressed.get(encoding, entry.body),
+                        media_type='application/json; charset=utf-8', headers=headers)
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+async def health(request):
+    stats = pool.get_stats()
+    return json_response(request, {
+        'status': 'ok',
+        'db_pool': {
+            'pid': os.getpid(),
+            'max_size': pool.max_size,
+            'in_use': stats.get('pool_size', 0) - stats.get('pool_available', 0),
+            'idle': stats.get('pool_available', 0),
+            'waiting': stats.get('requests_waiting', 0),
+        },
+        'catalog_cache': products_cache.stats() if catalog_cache_enabled() else None,
+        'user_cache': users.user_cache.stats(),
+    })
+
+
+async def get_metrics(request):
+    body = await run_in_threadpool(metrics.render)
+    return Response(body, headers={'Content-Type': metrics.CONTENT_TYPE})
+
+
+async def get_query_profile(request):
+    # Heaviest SQL fingerprints of this worker process (QUERY_PROFILE=1), see query_profiler.py
+    if not profiler.enabled:
+        return error(request, 'Query profiling is disabled (QUERY_PROFILE=1)', 404)
+    try:
+        limit = int(request.query_params.get('limit', 20))
+    except ValueError:
+        limit = 20
+    queries = profiler.top(limit)
+    if request.query_params.get('reset') == '1':
+        profiler.reset()
+    return json_response(request, {'pid': os.getpid(), 'queries': queries})
+
+
+async def _products_page(request, filters, etag_prefix):
+    try:
+        version, last_modified = await _catalog_version()
+        etag = _make_etag(etag_prefix, version, *sorted(f'{k}={v}' for k, v in request.query_params.multi_items()))
+        not_modified = _not_modified(request, etag, last_modified)
+        if not_modified:
+            return not_modified
+        # Search needs the trigram/full-text indexes, so it always goes to the database
+        if catalog_cache_enabled() and not filters['q']:
+            page = await run_in_threadpool(products_cache.get_page, filters)
+        else:
+            async with pool.connection() as conn:
+                setup = catalog.build_search_setup(filters)
+                if setup:
+                    await conn.execute(*setup)
+                cur = await conn.execute(*catalog.build_page_query(filters))
+                rows = await cur.fetchall()
+                cur = await conn.execute(*catalog.build_count_query(filters))
+                total = (await cur.fetchone())['total']
+            page = catalog.finish_page(filters, rows, total)
+        return json_response(request, page, etag=etag, last_modified=last_modified)
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+async def get_products(request):
+    try:
+        filters = catalog.parse_query(request.query_params)
+    except catalog.InvalidQuery as e:
+        return error(request, str(e), 400)
+    return await _products_page(request, filters, 'c')
+
+
+async def search_products(request):
+    if not (request.query_params.get('q') or '').strip():
+        return error(request, 'q is required', 400)
+    try:
+        filters = catalog.parse_query(request.query_params, default_sort=catalog.RELEVANCE)
+    except catalog.InvalidQuery as e:
+        return error(request, str(e), 400)
+    return await _products_page(request, filters, 's')
+
+
+async def create_product(request):
+    try:
+        data = await request.json()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                'INSERT INTO products (name, description, price, images, image_variants, category_id) '
+                'VALUES (%s, %s, %s, %s, %s, %s) RETURNING *',
+                (data['name'], data.get('description'), data['price'], data['images'],
+                 Jsonb(data.get('image_variants') or []), data.get('category_id'))
+            )
+            product = await cur.fetchone()
+        # The trigger notifies other workers; don't wait for the round trip here
+        products_cache.invalidate()
+        return json_response(request, product, 201)
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+async def get_product(request):
+    product_id = request.path_params['product_id']
+    try:
+        projection = catalog.parse_projection(request.query_params, default='detail')
+    except catalog.InvalidQuery as e:
+        return error(request, str(e), 400)
+    try:
+        version, last_modified = await _catalog_version()
+        etag = _make_etag('p', version, product_id, projection.name)
+        not_modified = _not_modified(request, etag, last_modified)
+        if not_modified:
+            return not_modified
+        if catalog_cache_enabled():
+            product = await run_in_threadpool(products_cache.get_product, product_id)
+            product = projection.from_row(product) if product else None
+        else:
+            async with pool.connection() as conn:
+                cur = await conn.execute(f'SELECT {projection.select_sql()} FROM products WHERE id = %s', (product_id,))
+                product = await cur.fetchone()
+
+        if product:
+            return json_response(request, product, etag=etag, last_modified=last_modified)
+        return error(request, 'Product not found', 404)
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+async def get_favorites(request):
+    try:
+        projection = catalog.parse_projection(request.query_params)
+    except catalog.InvalidQuery as e:
+        return error(request, str(e), 400)
+    try:
+        async with pool.connection() as conn:
+            cur = await conn.execute(f'''
+                SELECT {projection.select_sql('p')} FROM products p
+                JOIN favorites f ON p.id = f.product_id
+                WHERE f.user_id = %s
+            ''', (request.path_params['user_id'],))
+            favorites = await cur.fetchall()
+        return json_response(request, favorites)
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+async def add_to_favorites(request):
+    try:
+        data = await request.json()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                'INSERT INTO favorites (user_id, product_id) VALUES (%s, %s) ON CONFLICT (user_id, product_id) DO NOTHING RETURNING *',
+                (data['user_id'], data['product_id'])
+            )
+            favorite = await cur.fetchone()
+        return json_response(request, favorite, 201)
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+async def remove_from_favorites(request):
+    try:
+        async with pool.connection() as conn:
+            await conn.execute(
+                'DELETE FROM favorites WHERE user_id = %s AND product_id = %s',
+                (request.path_params['user_id'], request.path_params['product_id'])
+            )
+        return json_response(request, {'message': 'Removed from favorites'})
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+async def telegram_auth(request):
+    try:
+        identity = users.parse_identity(await _json_body(request))
+    except users.InvalidIdentity as e:
+        return error(request, str(e), 400)
+    try:
+        # Repeat logins with an unchanged profile are served from the per-process cache
+        user = users.user_cache.get(identity)
+        if user:
+            return json_response(request, {'user': user, 'is_new': False})
+
+        async with pool.connection() as conn:
+            cur = await conn.execute(users.UPSERT_SQL, identity)
+            row = await cur.fetchone()
+            if row is None:
+                # See users.upsert_user(): committed after this statement's snapshot
+                cur = await conn.execute(users.UPSERT_SQL, identity)
+                row = await cur.fetchone()
+        is_new = row.pop('is_new')
+        users.user_cache.put(row)
+        return json_response(request, {'user': row, 'is_new': is_new}, 201 if is_new else 200)
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+async def bootstrap(request):
+    try:
+        identity = users.parse_identity(await _json_body(request))
+    except users.InvalidIdentity as e:
+        return error(request, str(e), 400)
+    try:
+        async with pool.connection() as conn:
+            cur = await conn.execute(users.BOOTSTRAP_SQL, identity)
+            row = await cur.fetchone()
+            if row is None:
+                cur = await conn.execute(users.BOOTSTRAP_SQL, identity)
+                row = await cur.fetchone()
+        result = users.bootstrap_result(row)
+        users.user_cache.put(result['user'])
+        return json_response(request, result, 201 if result['is_new'] else 200)
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+async def get_cart(request):
+    try:
+        projection = catalog.parse_projection(request.query_params)
+    except catalog.InvalidQuery as e:
+        return error(request, str(e), 400)
+    try:
+        async with pool.connection() as conn:
+            cur = await conn.execute(f'''
+                SELECT {projection.select_sql('p')}, c.quantity FROM products p
+                JOIN cart c ON p.id = c.product_id
+                WHERE c.user_id = %s
+            ''', (request.path_params['user_id'],))
+            cart_items = await cur.fetchall()
+        return json_response(request, cart_items)
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+async def add_to_cart(request):
+    try:
+        data = await request.json()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                cart.ADD_SQL,
+                (data['user_id'], data['product_id'], data.get('quantity', 1))
+            )
+            cart_item = await cur.fetchone()
+        return json_response(request, cart_item, 201)
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+async def update_cart_quantity(request):
+    try:
+        data = await request.json()
+        async with pool.connection() as conn:
+            cur = await conn.execute(
+                'UPDATE cart SET quantity = %s WHERE user_id = %s AND product_id = %s RETURNING *',
+                (data['quantity'], data['user_id'], data['product_id'])
+            )
+            cart_item = await cur.fetchone()
+        if cart_item:
+            return json_response(request, cart_item)
+        return error(request, 'Cart item not found', 404)
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+async def batch_update_cart(request):
+    data = await _json_body(request) or {}
+    user_id = data.get('user_id')
+    if not user_id:
+        return error(request, 'user_id is required', 400)
+    try:
+        operations = cart.parse_operations(data.get('operations'))
+    except cart.InvalidBatch as e:
+        return error(request, str(e), 400)
+    try:
+        async with pool.connection() as conn:
+            cur = await conn.execute(cart.BATCH_SQL, cart.batch_params(user_id, operations))
+            cart_items = await cur.fetchall()
+        return json_response(request, cart_items)
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+async def remove_from_cart(request):
+    try:
+        async with pool.connection() as conn:
+            await conn.execute(
+                'DELETE FROM cart WHERE user_id = %s AND product_id = %s',
+                (request.path_params['user_id'], request.path_params['product_id'])
+            )
+        return json_response(request, {'message': 'Removed from cart'})
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+async def clear_cart(request):
+    try:
+        async with pool.connection() as conn:
+            await conn.execute('DELETE FROM cart WHERE user_id = %s', (request.path_params['user_id'],))
+        return json_response(request, {'message': 'Cart cleared'})
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+async def create_order(request):
+    try:
+        data = await _json_body(request) or {}
+        user_id = data.get('user_id')
+        if not user_id:
+            return error(request, 'user_id is required', 400)
+        # Same single checkout statement as app.py; the notification goes to the outbox
+        async with pool.connection() as conn:
+            cur = await conn.execute(orders.CHECKOUT_SQL, orders.checkout_params(user_id))
+            order = await cur.fetchone()
+        if order is None:
+            return error(request, 'Cart is empty', 400)
+        print(f"✅ Order #{order['id']} created: {order['items_count']} item(s), total {order['total']}")
+        return json_response(request, order, 201)
+    except Exception as e:
+        print(f"❌ ERROR creating order: {str(e)}")
+        return error(request, str(e), 500)
+
+
+async def get_orders(request):
+    try:
+        limit = min(max(int(request.query_params.get('limit', orders.DEFAULT_LIMIT)), 1), orders.MAX_LIMIT)
+        before = request.query_params.get('before')
+        before = int(before) if before else None
+    except ValueError:
+        return error(request, 'limit and before must be numbers', 400)
+    try:
+        async with pool.connection() as conn:
+            cur = await conn.execute(*orders.build_list_query(request.path_params['user_id'], limit, before))
+            user_orders = await cur.fetchall()
+        return json_response(request, user_orders)
+    except Exception as e:
+        return error(request, str(e), 500)
+
+
+# ------------------------------------------------------------------
+# Static files (same behavior as serve_react / serve_config_files in app.py)
+# ------------------------------------------------------------------
+
+def _safe_path(root, path):
+    full = os.path.realpath(os.path.join(root, path))
+    if full != root and not full.startswith(root + os.sep):
+        return None
+    return full
+
+
+async def serve_config_files(request):
+    path = _safe_path(os.path.realpath(CONFIG_DIR), request.path_params['filename'])
+    if path and os.path.isfile(path):
+        return FileResponse(path)
+    return error(request, 'File not found', 404)
+
+
+async def serve_react(request):
+    # Files and the index.html fallback for SPA routes come from memory (see static_assets.py)
+    asset = static_files.lookup(request.path_params.get('path', ''))
+    if asset is None:
+        return error(request, 'File not found', 404)
+    if asset.body is None:
+        # Too large to keep in memory
+        return FileResponse(asset.path, media_type=asset.content_type)
+    not_modified = _not_modified(request, asset.etag, asset.last_modified)
+    if not_modified:
+        not_modified.headers['Cache-Control'] = asset.cache_control
+        return not_modified
+
+    encoding = _encoding(request)
+    headers = {}
+    etag = asset.etag
+    if asset.compressed:
+        headers['Vary'] = 'Accept-Encoding'
+    if encoding in asset.compressed:
+        headers['Content-Encoding'] = encoding
+        etag = f'{etag}-{encoding}'
+    _set_validators(headers, etag, asset.last_modified)
+    headers['Cache-Control'] = asset.cache_control
+    return Response(asset.compressed.get(encoding, asset.body), headers=headers,
+                    media_type=asset.content_type)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await pool.open()
+    static_files.load()
+    print(f"🚀 Async API ready (pid {os.getpid()}, pool {pool.min_size}-{pool.max_size})")
+    try:
+        yield
+    finally:
+        await pool.close()
+
+
+routes = [
+    Route('/api/config', get_config, methods=['GET']),
+    Route('/api/health', health, methods=['GET']),
+    Route('/api/metrics', get_metrics, methods=['GET']),
+    Route('/api/debug/queries', get_query_profile, methods=['GET']),
+    Route('/config/{filename:path}', serve_config_files, methods=['GET']),
+    Route('/api/products', get_products, methods=['GET']),
+    Route('/api/products', create_product, methods=['POST']),
+    Route('/api/products/search', search_products, methods=['GET']),
+    Route('/api/products/{product_id}', get_product, methods=['GET']),
+    Route('/api/favorites/{user_id}', get_favorites, methods=['GET']),
+    Route('/api/favorites', add_to_favorites, methods=['POST']),
+    Route('/api/favorites/{user_id}/{product_id}', remove_from_favorites, methods=['DELETE']),
+    Route('/api/auth/telegram', telegram_auth, methods=['POST']),
+    Route('/api/bootstrap', bootstrap, methods=['POST']),
+    Route('/api/cart/batch', batch_update_cart, methods=['POST']),
+    Route('/api/cart/{user_id}', get_cart, methods=['GET']),
+    Route('/api/cart', add_to_cart, methods=['POST']),
+    Route('/api/cart', update_cart_quantity, methods=['PUT']),
+    Route('/api/cart/{user_id}/{product_id}', remove_from_cart, methods=['DELETE']),
+    Route('/api/cart/{user_id}', clear_cart, methods=['DELETE']),
+    Route('/api/orders', create_order, methods=['POST']),
+    Route('/api/orders/{user_id}', get_orders, methods=['GET']),
+    # Serve React App - this must be the last route
+    Route('/', serve_react, methods=['GET']),
+    Route('/{path:path}', serve_react, methods=['GET']),
+]
+
+app = Starlette(routes=routes, lifespan=lifespan, middleware=[Middleware(metrics.ASGIMiddleware)])
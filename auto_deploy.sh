@@ -251,9 +251,31 @@ RestartSec=10
 WantedBy=multi-user.target
 EOF
 
+# Доставка уведомлений о заказах (очередь notification_outbox)
+cat > /etc/systemd/system/shop-notifications.service <<EOF
+[Unit]
+Description=Telegram Shop order notification dispatcher
+After=network.target postgresql.service
+
+[Service]
+Type=simple
+User=$APP_USER
+WorkingDirectory=$APP_DIR
+Environment="PATH=$APP_DIR/venv/bin"
+EnvironmentFile=$APP_DIR/.env
+ExecStart=$APP_DIR/venv/bin/python notification_dispatcher.py
+Restart=always
+RestartSec=10
+
+[Install]
+WantedBy=multi-user.target
+EOF
+
 systemctl daemon-reload
 systemctl enable shop-app > /dev/null 2>&1
+systemctl enable shop-notifications > /dev/null 2>&1
 systemctl start shop-app
+systemctl start shop-notifications
 
 sleep 3
 
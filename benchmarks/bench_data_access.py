@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Benchmark: data-access and serialization hot paths at several catalog sizes.
+
+For every size a throwaway schema (default `bench_data_access`) is dropped,
+recreated with migrations.py and filled with synthetic products via COPY.
+All connections of this process get `search_path=<schema>,public` through
+PGOPTIONS, so the real tables are never touched. Then it times:
+
+    get_all_products        db_operations.get_all_products()
+    get_product_by_id       db_operations.get_product_by_id(<random id>)
+    find_products_by_name   db_operations.find_products_by_name(<random word>)
+    update_product          db_operations.update_product(<random id>, price=...)
+    cart_add                cart.ADD_SQL (POST /api/cart) + commit
+    cart_batch              cart.apply_batch() with 5 operations + commit
+    json_<encoder>          fast_json.dumps() of the full product list
+
+Connection settings are the app's (DATABASE_URL or PG*). Results are printed
+as a table or, with --json/--output, as JSON; --compare prints the ratio of
+each median to an earlier results file.
+
+Usage:
+    python benchmarks/bench_data_access.py                         # 100, 10k, 100k products
+    python benchmarks/bench_data_access.py --sizes 100,10000 --repeat 50
+    python benchmarks/bench_data_access.py --output before.json
+    python benchmarks/bench_data_access.py --output after.json --compare before.json
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from bench_json import WORDS, make_products  # noqa: E402
+
+DEFAULT_SCHEMA = 'bench_data_access'
+
+
+def timed(fn, repeat, warmup=1):
+    """Runs fn warmup + repeat times; returns timing stats in ms"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(samples[min(int(len(samples) * 0.95), len(samples) - 1)], 3),
+        'min_ms': round(samples[0], 3),
+        'ops_per_s': round(1000 / statistics.mean(samples), 1),
+        'repeat': repeat,
+    }
+
+
+def prepare_schema(schema, size, seed):
+    """Recreates the schema, applies migrations and loads `size` products"""
+    from db_pool import connect
+    from migrations import migrate
+
+    conn = connect()
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f'DROP SCHEMA IF EXISTS {schema} CASCADE')
+    cur.execute(f'CREATE SCHEMA {schema}')
+    migrate(verbose=False)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for p in make_products(size, seed):
+        images = '{' + ','.join(f'"{url}"' for url in p['images']) + '}'
+        writer.writerow([p['id'], p['name'], p['description'], p['price'], images,
+                         p['category_id'], p['created_at'].isoformat()])
+    buffer.seek(0)
+    cur.copy_expert(
+        'COPY products (id, name, description, price, images, category_id, created_at) FROM STDIN WITH (FORMAT csv)',
+        buffer
+    )
+    cur.execute("INSERT INTO users (telegram_id, username) VALUES (1, 'bench') RETURNING id")
+    user_id = cur.fetchone()['id']
+    cur.execute('ANALYZE')
+    cur.execute('SELECT id FROM products')
+    product_ids = [row['id'] for row in cur.fetchall()]
+    cur.close()
+    conn.close()
+    return user_id, product_ids
+
+
+def drop_schema(schema):
+    from db_pool import connect, get_pool
+    get_pool().closeall()
+    try:
+        conn = connect()
+        conn.autocommit = True
+        conn.cursor().execute(f'DROP SCHEMA IF EXISTS {schema} CASCADE')
+        conn.close()
+    except Exception as e:
+        print(f"⚠️ Could not drop schema {schema}: {e}", file=sys.stderr)
+
+
+def run_size(schema, size, repeat, seed):
+    import cart
+    import db_operations
+    import fast_json
+    from db_pool import db_connection
+
+    user_id, product_ids = prepare_schema(schema, size, seed)
+    rng = random.Random(seed)
+    results = {}
+
+    products = db_operations.get_all_products()
+    if len(products) != size:
+        raise RuntimeError(f'Expected {size} products, got {len(products)} (see errors above)')
+
+    results['get_all_products'] = timed(db_operations.get_all_products, repeat)
+    results['get_product_by_id'] = timed(lambda: db_operations.get_product_by_id(rng.choice(product_ids)), repeat)
+    results['find_products_by_name'] = timed(lambda: db_operations.find_products_by_name(rng.choice(WORDS)), repeat)
+    results['update_product'] = timed(
+        lambda: db_operations.update_product(rng.choice(product_ids), price=rng.randint(10, 2000) * 1000), repeat
+    )
+
+    def cart_add():
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(cart.ADD_SQL, (user_id, rng.choice(product_ids), 1))
+            cur.fetchone()
+            conn.commit()
+            cur.close()
+
+    def cart_batch():
+        operations = [('add', rng.choice(product_ids), 1) for _ in range(4)]
+        operations.append(('remove', rng.choice(product_ids), None))
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cart.apply_batch(cur, user_id, operations)
+            conn.commit()
+            cur.close()
+
+    results['cart_add'] = timed(cart_add, repeat)
+    results['cart_batch'] = timed(cart_batch, repeat)
+
+    for name in fast_json.ENCODERS:
+        fast_json.set_encoder(name)
+        results[f'json_{name}'] = timed(lambda: fast_json.dumps(products), repeat)
+    results['json_bytes'] = len(fast_json.dumps(products))
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results, previous=None):
+    for size, benchmarks in results['sizes'].items():
+        print(f"\n{size} products, {results['repeat']} runs each")
+        header = f"{'benchmark':<24}{'median ms':>12}{'p95 ms':>12}{'ops/s':>12}"
+        print(header + (f"{'vs before':>12}" if previous else ''))
+        for name, r in benchmarks.items():
+            if not isinstance(r, dict):
+                continue
+            line = f"{name:<24}{r['median_ms']:>12}{r['p95_ms']:>12}{r['ops_per_s']:>12}"
+            before = (previous or {}).get('sizes', {}).get(size, {}).get(name)
+            if before:
+                line += f"{r['median_ms'] / before['median_ms']:>11.2f}x"
+            print(line)
+        print(f"{'json bytes':<24}{benchmarks['json_bytes']:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='100,10000,100000', help='comma-separated catalog sizes')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--schema', default=DEFAULT_SCHEMA, help='throwaway schema (name must start with bench)')
+    parser.add_argument('--keep', action='store_true', help='keep the schema after the run')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    parser.add_argument('--output', help='also write the JSON results to this file')
+    parser.add_argument('--compare', help='results file of an earlier run')
+    args = parser.parse_args()
+
+    if not re.fullmatch(r'bench\w*', args.schema):
+        sys.exit('❌ --schema must start with "bench" (it is dropped and recreated)')
+    # Read by libpq on every connect, including the app's pool and migrations
+    os.environ['PGOPTIONS'] = f"{os.getenv('PGOPTIONS', '')} -c search_path={args.schema},public".strip()
+    # Slow-query lines would drown the report
+    os.environ.setdefault('SLOW_QUERY_MS', '-1')
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    results = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'sizes': {},
+    }
+    try:
+        for size in sizes:
+            print(f"⏳ {size} products...", file=sys.stderr)
+            results['sizes'][str(size)] = run_size(args.schema, size, args.repeat, args.seed)
+    finally:
+        if not args.keep:
+            drop_schema(args.schema)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results, previous)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JSON encoding and bytes on the wire for large product catalogs.
+
+Compares the stdlib encoder with orjson (when installed) on synthetic
+catalog rows shaped like `SELECT * FROM products`, then reports the
+response size with no compression, gzip and brotli (when installed).
+
+Usage:
+    python benchmarks/bench_json.py                 # 10k products
+    python benchmarks/bench_json.py --products 50000 --repeat 10
+    python benchmarks/bench_json.py --json          # machine-readable output
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import compression  # noqa: E402
+import fast_json  # noqa: E402
+
+WORDS = ['Куртка', 'Шапка', 'Кроссовки', 'Рубашка', 'Брюки', 'Ремень', 'Classic', 'Premium',
+         'Oversize', 'Slim', 'Winter', 'Summer', 'Black', 'White', 'Beige']
+
+
+def make_products(count, seed=42):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    products = []
+    for i in range(count):
+        name = ' '.join(rng.choice(WORDS) for _ in range(3))
+        products.append({
+            'id': f'{rng.getrandbits(128):032x}',
+            'name': name,
+            'description': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(10, 40))),
+            'price': rng.randint(10, 2000) * 1000,
+            'images': [
+                f'https://res.cloudinary.com/demo/image/upload/v1/telegram_shop_products/{rng.getrandbits(64):016x}.jpg'
+                for _ in range(rng.randint(1, 4))
+            ],
+            'category_id': str(rng.randint(0, 4)),
+            'created_at': start + timedelta(seconds=i * 37),
+        })
+    return products
+
+
+def timed(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return result, statistics.median(samples) * 1000
+
+
+def run(count, repeat):
+    products = make_products(count)
+    page = {'items': products, 'total': count, 'next_cursor': None, 'limit': count}
+    results = {'products': count, 'repeat': repeat, 'encoders': {}, 'wire': {}}
+
+    body = None
+    for name in fast_json.ENCODERS:
+        fast_json.set_encoder(name)
+        body, encode_ms = timed(lambda: fast_json.dumps(page), repeat)
+        _, stream_ms = timed(lambda: b''.join(fast_json.iter_json(page)), repeat)
+        results['encoders'][name] = {
+            'encode_ms': round(encode_ms, 2),
+            'stream_encode_ms': round(stream_ms, 2),
+            'bytes': len(body),
+        }
+
+    # Flask's default provider for reference (sort_keys + ensure_ascii)
+    _, flask_ms = timed(lambda: json.dumps(page, default=str, sort_keys=True).encode('utf-8'), repeat)
+    results['encoders']['flask_default'] = {'encode_ms': round(flask_ms, 2)}
+
+    results['wire']['identity'] = {'bytes': len(body), 'compress_ms': 0.0}
+    for encoding in compression.available_encodings():
+        compressed, compress_ms = timed(lambda: compression.compress(body, encoding), repeat)
+        results['wire'][encoding] = {'bytes': len(compressed), 'compress_ms': round(compress_ms, 2)}
+
+    return results
+
+
+def print_table(results):
+    print(f"Catalog: {results['products']} products, median of {results['repeat']} runs\n")
+    print(f"{'encoder':<16}{'encode ms':>12}{'stream ms':>12}{'bytes':>14}")
+    for name, r in results['encoders'].items():
+        print(f"{name:<16}{r['encode_ms']:>12}{r.get('stream_encode_ms', ''):>12}{r.get('bytes', ''):>14}")
+    print(f"\n{'encoding':<16}{'bytes':>14}{'compress ms':>14}{'ratio':>8}")
+    identity = results['wire']['identity']['bytes']
+    for name, r in results['wire'].items():
+        print(f"{name:<16}{r['bytes']:>14}{r['compress_ms']:>14}{r['bytes'] / identity:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.products, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == '__main__':
+    main()
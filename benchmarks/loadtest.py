@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Load test: replays Mini App traffic against a running shop API.
+
+Each virtual user is a Telegram user (created through /api/auth/telegram
+with ids from a reserved range) that loops over weighted sessions:
+
+    browse    /api/config, /api/bootstrap, /api/products (+ next pages, categories)
+    search    /api/products/search?q=...
+    product   /api/products/<id>
+    cart      /api/cart/batch, /api/cart (add), /api/favorites
+    checkout  add to cart, /api/orders, /api/orders/<user_id>
+
+Choices are drawn from random.Random(seed + user), so two runs with the same
+--seed, --users and catalog send the same request sequence per user.
+
+The report lists throughput, error count and p50/p95/p99 latency per
+endpoint (URL rule, not concrete path). --save-baseline stores it;
+--baseline compares a run against a stored one and exits with status 1 when
+an endpoint's p95 or throughput got worse by more than --tolerance.
+
+The catalog must not be empty (python seed_db.py or generate_data.py).
+Checkouts create real orders and outbox rows for the load-test users; run it
+against a local database only.
+
+Usage:
+    python benchmarks/loadtest.py --start --users 20 --duration 30
+    python benchmarks/loadtest.py --url http://127.0.0.1:5000 --save-baseline benchmarks/baseline.json
+    python benchmarks/loadtest.py --start --baseline benchmarks/baseline.json --tolerance 0.2
+    python benchmarks/loadtest.py --start --server async     # asgi.py under uvicorn
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# First Telegram id of the load-test users (far above real ids)
+TELEGRAM_ID_BASE = 9_900_000_000
+
+SESSIONS = {
+    'browse': 40,
+    'search': 15,
+    'product': 25,
+    'cart': 15,
+    'checkout': 5,
+}
+
+SEARCH_TERMS = ['куртка', 'шапка', 'кроссовки', 'classic', 'black', 'premium', 'футболка', 'slim']
+
+
+class Recorder:
+    """Latency samples per endpoint, shared by all virtual users"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}   # endpoint -> [seconds]
+        self.errors = {}    # endpoint -> count
+
+    def add(self, endpoint, seconds, ok):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(seconds)
+            if not ok:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+class VirtualUser:
+    def __init__(self, base_url, index, seed, recorder, products, categories):
+        self.base_url = base_url.rstrip('/')
+        self.rng = random.Random(seed + index)
+        self.recorder = recorder
+        self.products = products
+        self.categories = categories
+        self.telegram_id = TELEGRAM_ID_BASE + index
+        self.session = requests.Session()
+        self.session.headers['Accept-Encoding'] = 'gzip, br'
+        self.user_id = None
+
+    def call(self, method, endpoint, path, expect=(200, 201, 304), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=30, **kwargs)
+            ok = response.status_code in expect
+        except requests.RequestException:
+            response, ok = None, False
+        self.recorder.add(endpoint, time.perf_counter() - started, ok)
+        if ok and response.status_code != 304 and response.content:
+            return response.json()
+        return None
+
+    def login(self):
+        data = self.call('POST', 'POST /api/auth/telegram', '/api/auth/telegram', json={
+            'telegram_id': self.telegram_id, 'username': f'loadtest{self.telegram_id}',
+            'first_name': 'Load', 'last_name': 'Test',
+        })
+        self.user_id = data['user']['id'] if data else None
+        return self.user_id is not None
+
+    def product_id(self):
+        return self.rng.choice(self.products)
+
+    # Sessions -------------------------------------------------------
+
+    def browse(self):
+        self.call('GET', 'GET /api/config', '/api/config')
+        self.call('POST', 'POST /api/bootstrap', '/api/bootstrap', json={'telegram_id': self.telegram_id})
+        params = {'limit': 20}
+        if self.categories and self.rng.random() < 0.4:
+            params['category'] = self.rng.choice(self.categories)
+        if self.rng.random() < 0.3:
+            params['sort'] = self.rng.choice(['price_asc', 'price_desc', 'old'])
+        page = self.call('GET', 'GET /api/products', '/api/products', params=params)
+        # Scroll a few pages
+        for _ in range(self.rng.randint(0, 3)):
+            if not page or not page.get('next_cursor'):
+                break
+            page = self.call('GET', 'GET /api/products', '/api/products',
+                             params={**params, 'cursor': page['next_cursor']})
+
+    def search(self):
+        self.call('GET', 'GET /api/products/search', '/api/products/search',
+                  params={'q': self.rng.choice(SEARCH_TERMS), 'limit': 20})
+
+    def product(self):
+        for _ in range(self.rng.randint(1, 4)):
+            self.call('GET', 'GET /api/products/<id>', f'/api/products/{self.product_id()}')
+
+    def cart(self):
+        operations = [{'op': 'add', 'product_id': self.product_id(), 'quantity': self.rng.randint(1, 3)}
+                      for _ in range(self.rng.randint(1, 5))]
+        self.call('POST', 'POST /api/cart/batch', '/api/cart/batch',
+                  json={'user_id': self.user_id, 'operations': operations})
+        self.call('POST', 'POST /api/cart', '/api/cart',
+                  json={'user_id': self.user_id, 'product_id': self.product_id(), 'quantity': 1})
+        self.call('GET', 'GET /api/cart/<user_id>', f'/api/cart/{self.user_id}')
+        self.call('POST', 'POST /api/favorites', '/api/favorites',
+                  json={'user_id': self.user_id, 'product_id': self.product_id()})
+        self.call('GET', 'GET /api/favorites/<user_id>', f'/api/favorites/{self.user_id}')
+
+    def checkout(self):
+        self.call('POST', 'POST /api/cart', '/api/cart',
+                  json={'user_id': self.user_id, 'product_id': self.product_id(), 'quantity': 1})
+        # 400 = the cart was emptied by a concurrent checkout of the same user; not an error here
+        self.call('POST', 'POST /api/orders', '/api/orders', expect=(201, 400), json={'user_id': self.user_id})
+        self.call('GET', 'GET /api/orders/<user_id>', f'/api/orders/{self.user_id}', params={'limit': 10})
+
+    def run(self, deadline):
+        if not self.login():
+            return
+        names = list(SESSIONS)
+        weights = [SESSIONS[name] for name in names]
+        while time.monotonic() < deadline:
+            getattr(self, self.rng.choices(names, weights)[0])()
+
+
+def discover(base_url):
+    """Loads product ids and category ids the virtual users pick from"""
+    session = requests.Session()
+    products, cursor = [], None
+    while len(products) < 500:
+        params = {'limit': 100, **({'cursor': cursor} if cursor else {})}
+        page = session.get(f'{base_url}/api/products', params=params, timeout=30).json()
+        products += [item['id'] for item in page['items']]
+        cursor = page.get('next_cursor')
+        if not cursor:
+            break
+    config = session.get(f'{base_url}/api/config', timeout=30).json()
+    categories = [str(c['id']) for c in config.get('categories', [])]
+    return products, categories
+
+
+def percentile(sorted_samples, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(int(round(p / 100 * len(sorted_samples) + 0.5)) - 1, 0)
+    return sorted_samples[min(rank, len(sorted_samples) - 1)]
+
+
+def summarize(recorder, elapsed, args):
+    endpoints = {}
+    all_samples = []
+    for endpoint, samples in sorted(recorder.samples.items()):
+        samples = sorted(samples)
+        all_samples += samples
+        endpoints[endpoint] = {
+            'requests': len(samples),
+            'errors': recorder.errors.get(endpoint, 0),
+            'rps': round(len(samples) / elapsed, 2),
+            'p50_ms': round(percentile(samples, 50) * 1000, 2),
+            'p95_ms': round(percentile(samples, 95) * 1000, 2),
+            'p99_ms': round(percentile(samples, 99) * 1000, 2),
+        }
+    all_samples.sort()
+    return {
+        'users': args.users,
+        'duration_s': round(elapsed, 1),
+        'seed': args.seed,
+        'total': {
+            'requests': len(all_samples),
+            'errors': sum(recorder.errors.values()),
+            'rps': round(len(all_samples) / elapsed, 2),
+            'p50_ms': round(percentile(all_samples, 50) * 1000, 2),
+            'p95_ms': round(percentile(all_samples, 95) * 1000, 2),
+            'p99_ms': round(percentile(all_samples, 99) * 1000, 2),
+        },
+        'endpoints': endpoints,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compares p95 latency, throughput and errors per endpoint with a baseline
+
+    Returns:
+        list: Human-readable regressions (empty if none)
+    """
+    regressions = []
+    rows = {**baseline['endpoints'], 'TOTAL': baseline['total']}
+    current = {**results['endpoints'], 'TOTAL': results['total']}
+    for endpoint, base in rows.items():
+        now = current.get(endpoint)
+        if now is None:
+            continue
+        if now['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{endpoint}: p95 {base['p95_ms']} -> {now['p95_ms']} ms")
+        if now['rps'] < base['rps'] * (1 - tolerance):
+            regressions.append(f"{endpoint}: throughput {base['rps']} -> {now['rps']} req/s")
+        if now['errors'] > base['errors']:
+            regressions.append(f"{endpoint}: errors {base['errors']} -> {now['errors']}")
+    return regressions
+
+
+def print_table(results, baseline=None):
+    print(f"{results['users']} users, {results['duration_s']} s, seed {results['seed']}\n")
+    header = f"{'endpoint':<32}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+    if baseline:
+        header += f"{'base p95':>10}"
+    print(header)
+    rows = list(results['endpoints'].items()) + [('TOTAL', results['total'])]
+    for endpoint, r in rows:
+        line = (f"{endpoint:<32}{r['requests']:>10}{r['errors']:>8}{r['rps']:>9}"
+                f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
+        if baseline:
+            base = baseline['total'] if endpoint == 'TOTAL' else baseline['endpoints'].get(endpoint)
+            line += f"{base['p95_ms'] if base else '-':>10}"
+        print(line)
+
+
+def start_server(port, workers, mode):
+    """Starts the app from this checkout and waits for /api/health"""
+    if mode == 'async':
+        command = ['uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                   '--workers', str(workers), '--log-level', 'warning']
+    else:
+        command = ['gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}', '--workers', str(workers)]
+    process = subprocess.Popen(command, cwd=ROOT)
+    url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            if requests.get(f'{url}/api/health', timeout=1).ok:
+                return process, url
+        except requests.RequestException:
+            pass
+        if process.poll() is not None:
+            sys.exit(f'❌ Server exited with status {process.returncode}')
+        time.sleep(0.2)
+    process.terminate()
+    sys.exit('❌ Server did not become healthy')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='API to test (ignored with --start)')
+    parser.add_argument('--start', action='store_true', help='start the app from this checkout on --port')
+    parser.add_argument('--server', choices=['sync', 'async'], default='sync', help='app.py (gunicorn) or asgi.py (uvicorn)')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--baseline', help='compare against this results file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative regression (default 0.2)')
+    parser.add_argument('--save-baseline', help='write the results to this file')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    process, base_url = start_server(args.port, args.workers, args.server) if args.start else (None, args.url.rstrip('/'))
+    try:
+        try:
+            products, categories = discover(base_url)
+        except requests.RequestException as e:
+            sys.exit(f'❌ API not reachable at {base_url}: {e}')
+        if not products:
+            sys.exit('❌ The catalog is empty; seed it first (seed_db.py / generate_data.py)')
+
+        recorder = Recorder()
+        users = [VirtualUser(base_url, i, args.seed, recorder, products, categories) for i in range(args.users)]
+        deadline = time.monotonic() + args.duration
+        started = time.perf_counter()
+        threads = [threading.Thread(target=user.run, args=(deadline,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results = summarize(recorder, time.perf_counter() - started, args)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+    else:
+        print_table(results, baseline)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Baseline saved to {args.save_baseline}")
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == '__main__':
+    main()
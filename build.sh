@@ -11,4 +11,7 @@ npm ci
 echo "Building frontend..."
 npm run build
 
+echo "Pre-compressing static assets..."
+python static_assets.py --precompress
+
 echo "Build completed successfully!"
@@ -0,0 +1,164 @@
+"""
+Batched cart mutations.
+
+POST /api/cart/batch takes a list of operations:
+    {"op": "add",    "product_id": "...", "quantity": 1}   add to the current quantity (>= 1)
+    {"op": "set",    "product_id": "...", "quantity": 3}   replace the quantity (<= 0 removes)
+    {"op": "remove", "product_id": "..."}
+
+Operations are applied in order. They are first folded into at most one
+action per product (e.g. add, add, set 5, add -> set 6), and the folded
+actions are then applied with a single statement built on unnest() arrays,
+which also returns the resulting cart. Products that no longer exist are
+skipped.
+"""
+
+import catalog
+
+MAX_OPERATIONS = 200
+
+OPS = ('add', 'set', 'remove')
+
+
+class InvalidBatch(ValueError):
+    """Raised for a malformed batch (reported as HTTP 400)"""
+
+
+def parse_operations(raw):
+    """
+    Validates the `operations` list of a batch request
+
+    Returns:
+        list: (op, product_id, quantity) tuples; quantity is None for remove
+
+    Raises:
+        InvalidBatch: If the list or one of its operations is malformed
+    """
+    if not isinstance(raw, list):
+        raise InvalidBatch('operations must be a list')
+    if len(raw) > MAX_OPERATIONS:
+        raise InvalidBatch(f'At most {MAX_OPERATIONS} operations per batch')
+
+    operations = []
+    for index, item in enumerate(raw):
+        if not isinstance(item, dict):
+            raise InvalidBatch(f'operations[{index}] must be an object')
+        op = item.get('op')
+        product_id = item.get('product_id')
+        if op not in OPS:
+            raise InvalidBatch(f"operations[{index}].op must be one of {', '.join(OPS)}")
+        if not isinstance(product_id, str) or not product_id:
+            raise InvalidBatch(f'operations[{index}].product_id is required')
+
+        quantity = None
+        if op != 'remove':
+            quantity = item.get('quantity', 1 if op == 'add' else None)
+            if isinstance(quantity, bool) or not isinstance(quantity, int):
+                raise InvalidBatch(f'operations[{index}].quantity must be an integer')
+            if op == 'add' and quantity < 1:
+                raise InvalidBatch(f'operations[{index}].quantity must be >= 1 for add')
+        operations.append((op, product_id, quantity))
+    return operations
+
+
+def fold_operations(operations):
+    """
+    Reduces an ordered list of operations to one action per product
+
+    Returns:
+        dict: product_id -> ('add', delta) | ('set', quantity) | ('remove', None)
+    """
+    actions = {}
+    for op, product_id, quantity in operations:
+        current = actions.get(product_id)
+        if op == 'remove' or (op == 'set' and quantity <= 0):
+            actions[product_id] = ('remove', None)
+        elif op == 'set':
+            actions[product_id] = ('set', quantity)
+        elif current is None:
+            actions[product_id] = ('add', quantity)
+        elif current[0] == 'remove':
+            # The row is gone at this point, so the add starts from zero
+            actions[product_id] = ('set', quantity)
+        else:
+            actions[product_id] = (current[0], current[1] + quantity)
+    return actions
+
+
+# POST /api/cart: adds to the current quantity, creating the row if needed
+ADD_SQL = '''
+    INSERT INTO cart (user_id, product_id, quantity)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (user_id, product_id)
+    DO UPDATE SET quantity = cart.quantity + EXCLUDED.quantity
+    RETURNING *
+'''
+
+
+# Each CTE touches a disjoint set of products, so no row is modified twice.
+# CTEs all see the same snapshot, so the result is assembled from their
+# RETURNING rows plus the untouched part of the cart.
+BATCH_SQL = f'''
+    WITH ops AS (
+        SELECT o.product_id, o.action, o.quantity
+        FROM unnest(%(product_ids)s::varchar[], %(actions)s::text[], %(quantities)s::int[])
+             AS o(product_id, action, quantity)
+        JOIN products p ON p.id = o.product_id
+    ),
+    removed AS (
+        DELETE FROM cart c
+        WHERE c.user_id = %(user_id)s
+          AND c.product_id IN (SELECT product_id FROM ops WHERE action = 'remove')
+        RETURNING c.product_id
+    ),
+    set_rows AS (
+        INSERT INTO cart (user_id, product_id, quantity)
+        SELECT %(user_id)s, product_id, quantity FROM ops WHERE action = 'set'
+        ON CONFLICT (user_id, product_id) DO UPDATE SET quantity = EXCLUDED.quantity
+        RETURNING product_id, quantity
+    ),
+    added_rows AS (
+        INSERT INTO cart (user_id, product_id, quantity)
+        SELECT %(user_id)s, product_id, quantity FROM ops WHERE action = 'add'
+        ON CONFLICT (user_id, product_id) DO UPDATE SET quantity = cart.quantity + EXCLUDED.quantity
+        RETURNING product_id, quantity
+    ),
+    result AS (
+        SELECT product_id, quantity FROM set_rows
+        UNION ALL
+        SELECT product_id, quantity FROM added_rows
+        UNION ALL
+        SELECT c.product_id, c.quantity FROM cart c
+        WHERE c.user_id = %(user_id)s AND c.product_id <> ALL(%(product_ids)s::varchar[])
+    )
+    SELECT {catalog.CARD.select_sql('p')}, r.quantity
+    FROM result r JOIN products p ON p.id = r.product_id
+'''
+
+
+def apply_batch(cur, user_id, operations):
+    """
+    Applies parsed operations to a user's cart (the caller commits)
+
+    Parameters:
+        cur: Cursor of an open transaction
+        user_id (str): Cart owner
+        operations (list): Result of parse_operations
+
+    Returns:
+        list: The whole cart afterwards, shaped like GET /api/cart/<user_id>
+    """
+    cur.execute(BATCH_SQL, batch_params(user_id, operations))
+    return cur.fetchall()
+
+
+def batch_params(user_id, operations):
+    """Folds operations into the array parameters of BATCH_SQL"""
+    actions = fold_operations(operations)
+    product_ids = list(actions)
+    return {
+        'user_id': user_id,
+        'product_ids': product_ids,
+        'actions': [actions[pid][0] for pid in product_ids],
+        'quantities': [actions[pid][1] for pid in product_ids],
+    }
@@ -0,0 +1,502 @@
+"""
+Product catalog queries: filtering, sorting and keyset pagination.
+
+GET /api/products accepts:
+    category    category_id from config/settings.json
+    price_from  minimum price (inclusive)
+    price_to    maximum price (inclusive)
+    q           search text, matched against name and description (see below)
+    sort        new | price_asc | price_desc (see sortOptions in settings.json),
+                or relevance when q is given
+    cursor      opaque value returned as `next_cursor` by the previous page
+    limit       page size, 1..MAX_LIMIT (default DEFAULT_LIMIT)
+    fields      projection name or comma-separated field list (default card)
+
+Pages are addressed by a keyset cursor (sort value + id of the last row)
+rather than OFFSET, so page 500 costs the same as page 1.
+
+Search (q) combines three index-backed matches: a case-insensitive substring
+of the name, trigram word similarity on name and description (tolerates
+typos such as "iphnoe"), and full-text search over both. `sort=relevance`
+orders results by a score built from the same signals; every row then
+carries that `score`. GET /api/products/search defaults to this order.
+
+Projections (`fields=`) decide which columns a query reads and returns:
+    card    id, name, price, category_id, created_at, the first image only
+            (`images` of one element) and `thumbnail`, the smallest variant of
+            that image (see image_variants.py); default of lists, favorites
+            and the cart
+    detail  every product field with all images and image_variants; default
+            of GET /api/products/<id>
+    admin   the whole row (`SELECT *`), for the admin tools
+A comma-separated list of FIELDS (`fields=id,name,price`) selects just
+those; `id` is always included.
+
+This file is also used by telegram_bot/ (kept identical).
+
+Settings (environment variables):
+    SEARCH_SIMILARITY  pg_trgm word similarity threshold, 0..1 (default 0.35)
+"""
+
+import base64
+import json
+import math
+import os
+from datetime import datetime
+
+DEFAULT_LIMIT = 12
+MAX_LIMIT = 100
+
+# sort id -> (column, direction)
+SORTS = {
+    'new': ('created_at', 'DESC'),
+    'old': ('created_at', 'ASC'),
+    'price_asc': ('price', 'ASC'),
+    'price_desc': ('price', 'DESC'),
+}
+
+# Ranked search order; only valid together with q
+RELEVANCE = 'relevance'
+RELEVANCE_ORDER = ('score', 'DESC')
+
+SEARCH_SIMILARITY = float(os.getenv('SEARCH_SIMILARITY', '0.35'))
+
+# Full-text document; must match the expression of products_search_fts_idx (migrations.py)
+SEARCH_DOCUMENT = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+# The web client historically used dashes in sort ids
+SORT_ALIASES = {
+    'price-asc': 'price_asc',
+    'price-desc': 'price_desc',
+}
+
+
+class InvalidQuery(ValueError):
+    """Raised for malformed catalog query parameters (reported as HTTP 400)"""
+
+
+def thumbnail(row):
+    """Returns the smallest variant of the first image of a product row, or None"""
+    variants = row.get('image_variants')
+    if variants and variants[0]:
+        return variants[0][0]
+    return None
+
+
+def _column(name):
+    return '{t}.' + name, lambda row: row.get(name)
+
+
+# field -> (SQL over a products row aliased {t}, the same value computed from a full row dict)
+FIELDS = {name: _column(name) for name in (
+    'id', 'name', 'description', 'price', 'images', 'image_variants', 'category_id', 'created_at'
+)}
+FIELDS['thumbnail'] = ('{t}.image_variants->0->0', thumbnail)
+FIRST_IMAGE = ('{t}.images[1:1]', lambda row: (row.get('images') or [])[:1])
+
+
+class Projection:
+    """A set of product fields: the select list that reads them and the same shape from a full row"""
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields  # key -> (sql, function), None = every column
+
+    def select_sql(self, table='products', extra=()):
+        """
+        Builds the select list for a products row aliased `table`
+
+        Parameters:
+            table (str): Alias of products in the FROM clause
+            extra (tuple): Columns the query itself needs (sort keys); added
+                when missing and dropped again by trim()
+        """
+        if self.fields is None:
+            return f'{table}.*'
+        parts = []
+        for key, (sql, _) in self.fields.items():
+            sql = sql.format(t=table)
+            parts.append(sql if sql == f'{table}.{key}' else f'{sql} AS {key}')
+        parts.extend(f'{table}.{column}' for column in extra if column not in self.fields)
+        return ', '.join(parts)
+
+    def jsonb_sql(self, table='products'):
+        """The projected row as one jsonb expression (for jsonb_agg)"""
+        if self.fields is None:
+            return f'to_jsonb({table})'
+        pairs = ', '.join(f"'{key}', {sql.format(t=table)}" for key, (sql, _) in self.fields.items())
+        return f'jsonb_build_object({pairs})'
+
+    def from_row(self, row):
+        """Projects a full products row (catalog cache)"""
+        if self.fields is None:
+            return dict(row)
+        return {key: function(row) for key, (_, function) in self.fields.items()}
+
+    def trim(self, row):
+        """Drops the extra columns of select_sql from a fetched row; a search score is kept"""
+        if self.fields is None:
+            return row
+        trimmed = {key: row[key] for key in self.fields}
+        if 'score' in row:
+            trimmed['score'] = row['score']
+        return trimmed
+
+
+PROJECTIONS = {
+    'card': Projection('card', {
+        'id': FIELDS['id'],
+        'name': FIELDS['name'],
+        'price': FIELDS['price'],
+        'category_id': FIELDS['category_id'],
+        'created_at': FIELDS['created_at'],
+        'images': FIRST_IMAGE,
+        'thumbnail': FIELDS['thumbnail'],
+    }),
+    'detail': Projection('detail', {
+        key: FIELDS[key] for key in (
+            'id', 'name', 'description', 'price', 'images', 'image_variants', 'category_id', 'created_at'
+        )
+    }),
+    'admin': Projection('admin', None),
+}
+CARD = PROJECTIONS['card']
+
+
+def parse_projection(args, default='card'):
+    """
+    Resolves the `fields` query parameter
+
+    Parameters:
+        args (Mapping): request.args or any dict-like object
+        default (str): Projection used when the request has none
+
+    Returns:
+        Projection: Named projection or one built from the listed FIELDS
+
+    Raises:
+        InvalidQuery: For an unknown projection or field name
+    """
+    raw = (args.get('fields') or '').strip() or default
+    if raw in PROJECTIONS:
+        return PROJECTIONS[raw]
+    names = [name.strip() for name in raw.split(',') if name.strip()]
+    for name in names:
+        if name not in FIELDS:
+            raise InvalidQuery(f"Unknown field '{name}'")
+    return Projection(raw, {name: FIELDS[name] for name in ['id'] + names})
+
+
+def encode_cursor(sort, row):
+    """Builds the cursor that points just after `row` for the given sort"""
+    column, _ = _order(sort)
+    value = row[column]
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, row['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """
+    Decodes a cursor produced by encode_cursor
+
+    Returns:
+        tuple: (sort_value, id)
+
+    Raises:
+        InvalidQuery: If the cursor is malformed or was issued for another sort
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, value, product_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidQuery('Invalid cursor')
+    if cursor_sort != sort:
+        raise InvalidQuery('Cursor does not match sort order')
+    if not isinstance(product_id, str) or not _valid_cursor_value(_order(sort)[0], value):
+        raise InvalidQuery('Invalid cursor')
+    return value, product_id
+
+
+def _valid_cursor_value(column, value):
+    # A well-formed cursor with values of the wrong type would only fail in the database
+    if column == 'created_at':
+        if not isinstance(value, str):
+            return False
+        try:
+            datetime.fromisoformat(value)
+        except ValueError:
+            return False
+        return True
+    if column == 'price':
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def _order(sort):
+    return RELEVANCE_ORDER if sort == RELEVANCE else SORTS[sort]
+
+
+def _parse_int(args, name, minimum=None, maximum=None, rounding=math.floor):
+    """Parses an integer parameter; decimals are rounded with `rounding` (floor or ceil)"""
+    raw = args.get(name)
+    if raw is None or raw == '':
+        return None
+    try:
+        value = int(raw)
+    except ValueError:
+        try:
+            number = float(raw)
+        except ValueError:
+            raise InvalidQuery(f'{name} must be a number')
+        if not math.isfinite(number):
+            raise InvalidQuery(f'{name} must be a finite number')
+        value = rounding(number)
+    if minimum is not None and value < minimum:
+        raise InvalidQuery(f'{name} must be >= {minimum}')
+    if maximum is not None and value > maximum:
+        raise InvalidQuery(f'{name} must be <= {maximum}')
+    return value
+
+
+def parse_query(args, default_sort='new', default_fields='card'):
+    """
+    Validates request query parameters
+
+    Parameters:
+        args (Mapping): request.args or any dict-like object
+        default_sort (str): Sort used when the request has none
+        default_fields (str): Projection used when the request has no `fields`
+
+    Returns:
+        dict: Normalized filters (category, price_from, price_to, q, sort, cursor, limit, projection)
+
+    Raises:
+        InvalidQuery: If a parameter has an invalid value
+    """
+    sort = args.get('sort') or default_sort
+    sort = SORT_ALIASES.get(sort, sort)
+    if sort not in SORTS and sort != RELEVANCE:
+        raise InvalidQuery(f"Unknown sort '{sort}'")
+
+    category = args.get('category') or None
+    if category == 'all':
+        category = None
+
+    q = (args.get('q') or '').strip() or None
+    if sort == RELEVANCE and not q:
+        raise InvalidQuery('sort=relevance requires q')
+
+    limit = _parse_int(args, 'limit', 1, MAX_LIMIT) or DEFAULT_LIMIT
+    cursor = args.get('cursor') or None
+
+    return {
+        'category': category,
+        # Rounded inwards: price_from=9.5 must not match a price of 9
+        'price_from': _parse_int(args, 'price_from', 0, rounding=math.ceil),
+        'price_to': _parse_int(args, 'price_to', 0, rounding=math.floor),
+        'q': q,
+        'sort': sort,
+        'cursor': decode_cursor(cursor, sort) if cursor else None,
+        'limit': limit,
+        'projection': parse_projection(args, default_fields),
+    }
+
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _where(filters):
+    conditions = []
+    params = []
+    if filters['category']:
+        conditions.append('category_id = %s')
+        params.append(filters['category'])
+    if filters['price_from'] is not None:
+        conditions.append('price >= %s')
+        params.append(filters['price_from'])
+    if filters['price_to'] is not None:
+        conditions.append('price <= %s')
+        params.append(filters['price_to'])
+    if filters['q']:
+        # Each alternative is served by its own GIN index (combined with BitmapOr)
+        conditions.append(
+            f"(name ILIKE %s OR %s <%% name OR %s <%% description "
+            f"OR {SEARCH_DOCUMENT} @@ websearch_to_tsquery('simple', %s))"
+        )
+        q = filters['q']
+        params.extend([f'%{_escape_like(q)}%', q, q, q])
+    return conditions, params
+
+
+def _score(q):
+    """Relevance of a row for q: name matches weigh more than description ones"""
+    sql = (
+        "(CASE WHEN name ILIKE %s THEN 1 ELSE 0 END"
+        " + 2 * word_similarity(%s, name)"
+        " + word_similarity(%s, coalesce(description, ''))"
+        f" + ts_rank({SEARCH_DOCUMENT}, websearch_to_tsquery('simple', %s)))::float8"
+    )
+    return sql, [f'%{_escape_like(q)}%', q, q, q]
+
+
+def build_page_query(filters):
+    """
+    Builds the SELECT for one page of products
+
+    One extra row is requested so the caller can tell whether a next page exists.
+
+    Returns:
+        tuple: (sql, params)
+    """
+    column, direction = _order(filters['sort'])
+    conditions, params = _where(filters)
+    source = table = 'products'
+
+    if filters['sort'] == RELEVANCE:
+        # The score is computed once per matching row; the cursor compares against it
+        score_sql, score_params = _score(filters['q'])
+        where = f"WHERE {' AND '.join(conditions)}"
+        source = f'(SELECT products.*, {score_sql} AS score FROM products {where}) ranked'
+        table = 'ranked'
+        params = score_params + params
+        conditions = []
+
+    if filters['cursor']:
+        value, product_id = filters['cursor']
+        op = '<' if direction == 'DESC' else '>'
+        cast = {'created_at': '::timestamptz', 'score': '::float8'}.get(column, '')
+        conditions.append(f'({column}, id) {op} (%s{cast}, %s)')
+        params.extend([value, product_id])
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    # The sort column and id are read even if the projection leaves them out, for the cursor
+    columns = filters['projection'].select_sql(table, extra=(column, 'id'))
+    sql = (
+        f'SELECT {columns} FROM {source} {where} '
+        f'ORDER BY {column} {direction}, id {direction} LIMIT %s'
+    )
+    params.append(filters['limit'] + 1)
+    return sql, params
+
+
+def build_count_query(filters):
+    """Builds the COUNT(*) matching the filters (ignores cursor and limit)"""
+    conditions, params = _where(filters)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    return f'SELECT COUNT(*) AS total FROM products {where}', params
+
+
+def build_search_setup(filters):
+    """
+    Statement to run before the page query when searching, or None
+
+    Sets the trigram threshold transaction-locally, so pooled connections
+    keep the server default.
+    """
+    if not filters['q']:
+        return None
+    return "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", (str(SEARCH_SIMILARITY),)
+
+
+def finish_page(filters, rows, total):
+    """Trims the extra row of a page query and builds the page dict"""
+    limit = filters['limit']
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(filters['sort'], rows[-1])
+    items = [filters['projection'].trim(row) for row in rows]
+    return {'items': items, 'total': total, 'next_cursor': next_cursor, 'limit': limit}
+
+
+def fetch_page(cur, filters):
+    """
+    Runs the page and count queries on an open cursor
+
+    Returns:
+        dict: {'items': [...], 'total': int, 'next_cursor': str | None, 'limit': int}
+    """
+    setup = build_search_setup(filters)
+    if setup:
+        cur.execute(*setup)
+
+    sql, params = build_page_query(filters)
+    cur.execute(sql, params)
+    rows = cur.fetchall()
+
+    sql, params = build_count_query(filters)
+    cur.execute(sql, params)
+    total = cur.fetchone()['total']
+
+    return finish_page(filters, rows, total)
+
+
+def _sort_key(column, value):
+    if column == 'created_at' and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def _matches(row, filters):
+    if filters['category'] and row['category_id'] != filters['category']:
+        return False
+    if filters['price_from'] is not None and row['price'] < filters['price_from']:
+        return False
+    if filters['price_to'] is not None and row['price'] > filters['price_to']:
+        return False
+    return True
+
+
+def sort_rows(rows, sort):
+    """Returns rows ordered exactly like build_page_query orders them"""
+    column, direction = SORTS[sort]
+    return sorted(rows, key=lambda r: (r[column], r['id']), reverse=(direction == 'DESC'))
+
+
+def page_from_rows(sorted_rows, filters):
+    """
+    In-memory equivalent of fetch_page for an already sorted list of rows
+
+    Parameters:
+        sorted_rows (list): Every product, ordered by sort_rows(rows, filters['sort'])
+        filters (dict): Result of parse_query, without q
+
+    Returns:
+        dict: Same shape as fetch_page
+
+    Raises:
+        ValueError: If filters has q; search is only done by the database
+            (trigram and full-text matching cannot be reproduced in memory)
+    """
+    if filters['q']:
+        raise ValueError('Search queries must go to the database')
+    column, direction = SORTS[filters['sort']]
+    after = None
+    if filters['cursor']:
+        value, product_id = filters['cursor']
+        after = (_sort_key(column, value), product_id)
+
+    limit = filters['limit']
+    items = []
+    total = 0
+    for row in sorted_rows:
+        if not _matches(row, filters):
+            continue
+        total += 1
+        if after is not None:
+            key = (row[column], row['id'])
+            if (key <= after) if direction == 'ASC' else (key >= after):
+                continue
+        if len(items) <= limit:
+            items.append(row)
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(filters['sort'], items[-1])
+
+    items = [filters['projection'].from_row(row) for row in items]
+    return {'items': items, 'total': total, 'next_cursor': next_cursor, 'limit': limit}
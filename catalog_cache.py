@@ -0,0 +1,215 @@
+"""
+In-process product catalog cache.
+
+Every API worker keeps the whole `products` table in memory and serves
+GET /api/products and GET /api/products/<id> from that copy. A trigger on
+`products` (see migrations.py) bumps `catalog_version` and sends
+NOTIFY on the `products_changed` channel after every write, including
+writes made by the admin bot from a different process; a background
+thread LISTENs and drops the copy so the next read reloads it.
+
+If the notify channel silently dies the cache is still reloaded once it is
+older than CATALOG_CACHE_MAX_AGE seconds.
+
+Settings (environment variables):
+    CATALOG_CACHE_ENABLED   '0' disables the cache and reads go to Postgres (default 1)
+    CATALOG_CACHE_MAX_AGE   maximum staleness in seconds (default 300)
+"""
+
+import os
+import select
+import threading
+import time
+
+from psycopg2 import extensions
+
+import catalog
+from db_pool import connect, db_connection
+
+CHANNEL = 'products_changed'
+
+
+class CatalogCache:
+    """Whole-catalog snapshot with LISTEN/NOTIFY invalidation and a max-age fallback"""
+
+    def __init__(self, max_age=300.0, channel=CHANNEL, listen=True):
+        self.max_age = max_age
+        self.channel = channel
+        self.listen = listen
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        # (rows, rows_by_id, {sort: sorted rows}, (version, updated_at)), swapped atomically
+        self._data = None
+        self._loaded_at = 0.0
+        self._generation = 0       # bumped by every invalidation
+        self._loaded_generation = -1
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._listener = None
+        self._listening = False
+
+    def _check_fork(self):
+        # The listener thread does not survive fork; start over in the child
+        if self._pid != os.getpid():
+            self._reset()
+
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+
+    def invalidate(self):
+        """Marks the cached catalog stale; the next read reloads it"""
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+
+    def _ensure_listener(self):
+        if not self.listen or self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is not None:
+                return
+            self._listener = threading.Thread(
+                target=self._listen_loop, name='catalog-cache-listener', daemon=True
+            )
+        self._listener.start()
+
+    def _listen_loop(self):
+        retry_delay = 1
+        while True:
+            conn = None
+            try:
+                conn = connect()
+                conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                cur = conn.cursor()
+                cur.execute(f'LISTEN {self.channel}')
+                self._listening = True
+                retry_delay = 1
+                # Anything may have changed while we were not listening
+                self.invalidate()
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        self.invalidate()
+            except Exception as e:
+                print(f"⚠️ Catalog cache listener error: {e}")
+            finally:
+                self._listening = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            self.invalidate()
+            time.sleep(retry_delay)
+            retry_delay = min(retry_delay * 2, 60)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def _is_fresh(self):
+        return (
+            self._data is not None
+            and self._loaded_generation == self._generation
+            and time.monotonic() - self._loaded_at < self.max_age
+        )
+
+    def _load(self):
+        generation = self._generation
+        with db_connection() as conn:
+            cur = conn.cursor()
+            # One snapshot for both reads so the version matches the rows
+            cur.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            cur.execute('SELECT version, updated_at FROM catalog_version')
+            version_row = cur.fetchone()
+            cur.execute('SELECT * FROM products')
+            rows = [dict(row) for row in cur.fetchall()]
+            cur.close()
+            conn.rollback()
+        with self._lock:
+            version = (version_row['version'], version_row['updated_at']) if version_row else (0, None)
+            self._data = (rows, {row['id']: row for row in rows}, {}, version)
+            self._loaded_at = time.monotonic()
+            # A NOTIFY that arrived mid-load leaves the snapshot stale
+            self._loaded_generation = generation
+
+    def _snapshot(self):
+        self._check_fork()
+        self._ensure_listener()
+        if self._is_fresh():
+            self.hits += 1
+        else:
+            self.misses += 1
+            # One thread reloads; the others wait and reuse its result
+            with self._load_lock:
+                if not self._is_fresh():
+                    self._load()
+        return self._data
+
+    def get_page(self, filters):
+        """
+        Returns one page of products for filters from catalog.parse_query
+
+        Searches (q) are not served from memory; callers send them to the database.
+
+        Returns:
+            dict: Same shape as catalog.fetch_page
+
+        Raises:
+            ValueError: If filters has q
+        """
+        rows, _, sorted_views, _ = self._snapshot()
+        ordered = sorted_views.get(filters['sort'])
+        if ordered is None:
+            ordered = catalog.sort_rows(rows, filters['sort'])
+            sorted_views[filters['sort']] = ordered
+        return catalog.page_from_rows(ordered, filters)
+
+    def version(self):
+        """
+        Returns the catalog version the current snapshot was loaded at
+
+        Returns:
+            tuple: (version, updated_at) from the catalog_version table
+        """
+        return self._snapshot()[3]
+
+    def get_product(self, product_id):
+        """Returns the product dict or None"""
+        by_id = self._snapshot()[1]
+        return by_id.get(product_id)
+
+    def stats(self):
+        """
+        Returns cache counters for this worker process
+
+        Returns:
+            dict: hits, misses, invalidations, size, age_seconds, listening
+        """
+        self._check_fork()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'size': len(self._data[0]) if self._data is not None else 0,
+            'age_seconds': round(time.monotonic() - self._loaded_at, 1) if self._data is not None else None,
+            'max_age_seconds': self.max_age,
+            'version': self._data[3][0] if self._data is not None else None,
+            'listening': self._listening,
+        }
+
+
+def is_enabled():
+    return os.getenv('CATALOG_CACHE_ENABLED', '1') != '0'
+
+
+products_cache = CatalogCache(max_age=float(os.getenv('CATALOG_CACHE_MAX_AGE', '300')))
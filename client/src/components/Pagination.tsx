@@ -5,12 +5,15 @@ interface PaginationProps {
   currentPage: number;
   totalPages: number;
   onPageChange: (page: number) => void;
+  // Keyset-paginated lists can only jump to pages whose cursor is known
+  isPageReachable?: (page: number) => boolean;
 }
 
 export default function Pagination({
   currentPage,
   totalPages,
   onPageChange,
+  isPageReachable = () => true,
 }: PaginationProps) {
   const pages = Array.from({ length: totalPages }, (_, i) => i + 1);
 
@@ -33,6 +36,7 @@ export default function Pagination({
           size="sm"
           variant={currentPage === page ? "default" : "outline"}
           onClick={() => onPageChange(page)}
+          disabled={!isPageReachable(page)}
           className="min-w-10 h-10"
           data-testid={`button-page-${page}`}
         >
@@ -44,7 +48,7 @@ export default function Pagination({
         size="icon"
         variant="ghost"
         onClick={() => onPageChange(currentPage + 1)}
-        disabled={currentPage === totalPages}
+        disabled={currentPage >= totalPages || !isPageReachable(currentPage + 1)}
         className="h-10 w-10"
         data-testid="button-page-next"
       >
@@ -3,11 +3,19 @@ import { Button } from "@/components/ui/button";
 import { useState, useRef } from "react";
 import { useConfig } from "@/hooks/useConfig";
 
+// Smallest resized copy of the first image (`thumbnail` of list responses)
+export interface ImageVariant {
+  width: number;
+  webp?: string;
+  jpeg?: string;
+}
+
 interface ProductCardProps {
   id: string;
   name: string;
   price: number;
   images: string[];
+  thumbnail?: ImageVariant | null;
   isFavorite?: boolean;
   isInCart?: boolean;
   onToggleFavorite?: (id: string) => void;
@@ -21,6 +29,7 @@ export default function ProductCard({
   name,
   price,
   images,
+  thumbnail,
   isFavorite = false,
   isInCart = false,
   onToggleFavorite,
@@ -129,6 +138,21 @@ export default function ProductCard({
               >
                 <ImageIcon className="w-16 h-16 text-muted-foreground/40" />
               </div>
+            ) : idx === 0 && thumbnail?.jpeg ? (
+              <picture key={idx}>
+                {thumbnail.webp && <source srcSet={thumbnail.webp} type="image/webp" />}
+                <img
+                  src={thumbnail.jpeg}
+                  alt={name}
+                  className={`absolute inset-0 w-full h-full object-cover transition-opacity duration-300 ${
+                    idx === currentImage ? "opacity-100" : "opacity-0"
+                  }`}
+                  loading="lazy"
+                  onError={() => {
+                    setImageErrors(prev => new Set(prev).add(idx));
+                  }}
+                />
+              </picture>
             ) : (
               <img
                 key={idx}
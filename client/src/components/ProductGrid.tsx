@@ -1,10 +1,11 @@
-import ProductCard from "./ProductCard";
+import ProductCard, { type ImageVariant } from "./ProductCard";
 
 interface Product {
   id: string;
   name: string;
   price: number;
   images: string[];
+  thumbnail?: ImageVariant | null;
   isFavorite?: boolean;
 }
 
@@ -1,5 +1,6 @@
 import { createContext, useContext, useEffect, useState, ReactNode } from 'react';
 import { retrieveLaunchParams } from '@telegram-apps/sdk';
+import { queryClient } from '@/lib/queryClient';
 
 interface TelegramUser {
   id: string;
@@ -77,8 +78,8 @@ export function TelegramProvider({ children }: TelegramProviderProps) {
             last_name: telegramUser.lastName,
           });
           
-          // Authenticate with backend
-          const response = await fetch('/api/auth/telegram', {
+          // Authenticate and load cart + favorites in a single request
+          const response = await fetch('/api/bootstrap', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -97,6 +98,9 @@ export function TelegramProvider({ children }: TelegramProviderProps) {
               is_new_user: data.is_new,
               username: data.user.username,
             });
+            // Seed the caches used by useCart/useFavorites so they don't refetch
+            queryClient.setQueryData(['/api/cart', data.user.id], data.cart);
+            queryClient.setQueryData(['/api/favorites', data.user.id], data.favorites);
             setUser(data.user);
           } else {
             console.error('❌ Backend authentication failed:', await response.text());
@@ -1,3 +1,4 @@
+import { useRef } from 'react';
 import { useQuery, useMutation } from '@tanstack/react-query';
 import { queryClient, apiRequest } from '@/lib/queryClient';
 import { useTelegram } from '@/contexts/TelegramContext';
@@ -11,10 +12,67 @@ interface CartItem {
   product_id: string;
 }
 
+type CartOperation =
+  | { op: 'add'; product_id: string; quantity: number }
+  | { op: 'set'; product_id: string; quantity: number }
+  | { op: 'remove'; product_id: string };
+
+// Taps within this window are sent to the server as one batch
+const BATCH_DELAY_MS = 150;
+
 export function useCart() {
   const { user } = useTelegram();
   const userId = user?.id;
 
+  // Pending cart operations, flushed together via POST /api/cart/batch
+  const batchRef = useRef<{
+    operations: CartOperation[];
+    waiters: { resolve: () => void; reject: (error: unknown) => void }[];
+    timer: ReturnType<typeof setTimeout> | null;
+  }>({ operations: [], waiters: [], timer: null });
+  const inFlightRef = useRef(0);
+
+  const flushBatch = async () => {
+    const { operations, waiters } = batchRef.current;
+    batchRef.current = { operations: [], waiters: [], timer: null };
+    inFlightRef.current += 1;
+    try {
+      const response = await apiRequest('/api/cart/batch', {
+        method: 'POST',
+        body: JSON.stringify({ user_id: userId, operations }),
+      });
+      const cart: CartItem[] = await response.json();
+      inFlightRef.current -= 1;
+      // Only adopt the server cart when no newer optimistic edits are waiting
+      if (batchRef.current.operations.length === 0 && inFlightRef.current === 0) {
+        queryClient.setQueryData(['/api/cart', userId], cart);
+      }
+      waiters.forEach((waiter) => waiter.resolve());
+    } catch (error) {
+      inFlightRef.current -= 1;
+      waiters.forEach((waiter) => waiter.reject(error));
+    }
+  };
+
+  const queueOperation = (operation: CartOperation) => {
+    if (!userId) return Promise.reject(new Error('User not authenticated'));
+    return new Promise<void>((resolve, reject) => {
+      const batch = batchRef.current;
+      batch.operations.push(operation);
+      batch.waiters.push({ resolve, reject });
+      if (!batch.timer) {
+        batch.timer = setTimeout(flushBatch, BATCH_DELAY_MS);
+      }
+    });
+  };
+
+  // Refetch after a failure; a successful batch already returned the whole cart
+  const settleCart = (error: unknown) => {
+    if (error) {
+      queryClient.invalidateQueries({ queryKey: ['/api/cart', userId] });
+    }
+  };
+
   // Fetch cart items
   const { data: cartItems = [], isLoading } = useQuery<CartItem[]>({
     queryKey: ['/api/cart', userId],
@@ -28,17 +86,8 @@ export function useCart() {
 
   // Add to cart mutation with optimistic update
   const addToCart = useMutation({
-    mutationFn: async (productId: string) => {
-      if (!userId) throw new Error('User not authenticated');
-      return apiRequest('/api/cart', {
-        method: 'POST',
-        body: JSON.stringify({
-          user_id: userId,
-          product_id: productId,
-          quantity: 1,
-        }),
-      });
-    },
+    mutationFn: (productId: string) =>
+      queueOperation({ op: 'add', product_id: productId, quantity: 1 }),
     onMutate: async (productId: string) => {
       await queryClient.cancelQueries({ queryKey: ['/api/cart', userId] });
       const previousCart = queryClient.getQueryData<CartItem[]>(['/api/cart', userId]);
@@ -69,24 +118,13 @@ export function useCart() {
         queryClient.setQueryData(['/api/cart', userId], context.previousCart);
       }
     },
-    onSettled: () => {
-      queryClient.invalidateQueries({ queryKey: ['/api/cart', userId] });
-    },
+    onSettled: (_data, error) => settleCart(error),
   });
 
   // Update quantity mutation with optimistic update
   const updateQuantity = useMutation({
-    mutationFn: async ({ productId, quantity }: { productId: string; quantity: number }) => {
-      if (!userId) throw new Error('User not authenticated');
-      return apiRequest('/api/cart', {
-        method: 'PUT',
-        body: JSON.stringify({
-          user_id: userId,
-          product_id: productId,
-          quantity,
-        }),
-      });
-    },
+    mutationFn: ({ productId, quantity }: { productId: string; quantity: number }) =>
+      queueOperation({ op: 'set', product_id: productId, quantity }),
     onMutate: async ({ productId, quantity }) => {
       await queryClient.cancelQueries({ queryKey: ['/api/cart', userId] });
       const previousCart = queryClient.getQueryData<CartItem[]>(['/api/cart', userId]);
@@ -104,19 +142,13 @@ export function useCart() {
         queryClient.setQueryData(['/api/cart', userId], context.previousCart);
       }
     },
-    onSettled: () => {
-      queryClient.invalidateQueries({ queryKey: ['/api/cart', userId] });
-    },
+    onSettled: (_data, error) => settleCart(error),
   });
 
   // Remove from cart mutation with optimistic update
   const removeFromCart = useMutation({
-    mutationFn: async (productId: string) => {
-      if (!userId) throw new Error('User not authenticated');
-      return apiRequest(`/api/cart/${userId}/${productId}`, {
-        method: 'DELETE',
-      });
-    },
+    mutationFn: (productId: string) =>
+      queueOperation({ op: 'remove', product_id: productId }),
     onMutate: async (productId: string) => {
       await queryClient.cancelQueries({ queryKey: ['/api/cart', userId] });
       const previousCart = queryClient.getQueryData<CartItem[]>(['/api/cart', userId]);
@@ -132,9 +164,7 @@ export function useCart() {
         queryClient.setQueryData(['/api/cart', userId], context.previousCart);
       }
     },
-    onSettled: () => {
-      queryClient.invalidateQueries({ queryKey: ['/api/cart', userId] });
-    },
+    onSettled: (_data, error) => settleCart(error),
   });
 
   // Clear cart mutation with optimistic update
@@ -4,8 +4,9 @@ import { Button } from "@/components/ui/button";
 import CartItem from "@/components/CartItem";
 import OrderModal from "@/components/OrderModal";
 import { useTelegram } from "@/contexts/TelegramContext";
-import { apiRequest } from "@/lib/queryClient";
+import { apiRequest, queryClient } from "@/lib/queryClient";
 import { useConfig } from "@/hooks/useConfig";
+import { useToast } from "@/hooks/use-toast";
 
 interface CartItemData {
   id: string;
@@ -33,6 +34,7 @@ export default function Cart({
   const { formatPrice } = useConfig();
   const [isModalOpen, setIsModalOpen] = useState(false);
   const { user } = useTelegram();
+  const { toast } = useToast();
 
   const total = items.reduce((sum, item) => sum + item.price * item.quantity, 0);
 
@@ -53,20 +55,21 @@ export default function Cart({
     }
 
     try {
-      console.log('Sending order:', { user_id: user.id, items: orderItems, total });
+      // The server builds the order from the saved cart (items, prices and total)
+      // and removes only the ordered rows, so refetch instead of clearing
       await apiRequest('/api/orders', {
         method: 'POST',
-        body: JSON.stringify({
-          user_id: user.id,
-          items: orderItems,
-          total: total,
-        }),
+        body: JSON.stringify({ user_id: user.id }),
       });
-      console.log('Order sent successfully');
-      onClearCart();
+      queryClient.invalidateQueries({ queryKey: ['/api/cart', user.id] });
     } catch (error) {
+      // Keep the cart so the user can retry
       console.error('Failed to create order:', error);
-      onClearCart();
+      toast({
+        title: "Не удалось оформить заказ",
+        description: "Попробуйте ещё раз",
+        variant: "destructive",
+      });
     }
   };
 
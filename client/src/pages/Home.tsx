@@ -1,19 +1,28 @@
-import { useState, useMemo } from "react";
+import { useState, useEffect } from "react";
 import { useQuery } from "@tanstack/react-query";
 import Header from "@/components/Header";
 import FilterBar from "@/components/FilterBar";
 import ProductGrid from "@/components/ProductGrid";
 import Pagination from "@/components/Pagination";
 import { useConfig } from "@/hooks/useConfig";
+import type { ImageVariant } from "@/components/ProductCard";
 
 interface Product {
   id: string;
   name: string;
   price: number;
   images: string[];
+  thumbnail?: ImageVariant | null;
   category_id: string;
 }
 
+interface ProductsPage {
+  items: Product[];
+  total: number;
+  next_cursor: string | null;
+  limit: number;
+}
+
 interface HomeProps {
   onCartClick: () => void;
   onFavoritesClick: () => void;
@@ -37,7 +46,6 @@ export default function Home({
   favoriteIds,
   cartItemIds,
 }: HomeProps) {
-  const [currentPage, setCurrentPage] = useState(1);
   const [selectedCategory, setSelectedCategory] = useState("all");
   const [selectedSort, setSelectedSort] = useState("new");
   const [priceFrom, setPriceFrom] = useState("");
@@ -48,78 +56,76 @@ export default function Home({
   const { config } = useConfig();
   const categories = config?.categories || [];
 
-  // Fetch products from API
-  const { data: products = [], isLoading: isLoadingProducts } = useQuery<Product[]>({
-    queryKey: ["/api/products"],
+  const productsPerPage = config?.ui?.productsPerPage || 12;
+
+  // Debounce free-text inputs so typing doesn't fire a request per keystroke
+  const [debouncedSearch, setDebouncedSearch] = useState("");
+  const [debouncedPriceFrom, setDebouncedPriceFrom] = useState("");
+  const [debouncedPriceTo, setDebouncedPriceTo] = useState("");
+  useEffect(() => {
+    const timer = setTimeout(() => {
+      setDebouncedSearch(searchQuery.trim());
+      setDebouncedPriceFrom(priceFrom);
+      setDebouncedPriceTo(priceTo);
+    }, 300);
+    return () => clearTimeout(timer);
+  }, [searchQuery, priceFrom, priceTo]);
+
+  // While searching, the default order becomes "best match first" (server-side ranking)
+  const sort = debouncedSearch && selectedSort === "new" ? "relevance" : selectedSort;
+  const params = new URLSearchParams({ sort, limit: String(productsPerPage) });
+  if (selectedCategory !== "all") params.set("category", selectedCategory);
+  if (debouncedSearch) params.set("q", debouncedSearch);
+  if (debouncedPriceFrom) params.set("price_from", debouncedPriceFrom);
+  if (debouncedPriceTo) params.set("price_to", debouncedPriceTo);
+  const filterKey = params.toString();
+
+  // Keyset pagination: cursors[i] is the cursor that loads page i + 1.
+  // Cursors belong to one filter/sort combination; any change starts from page 1.
+  const [paging, setPaging] = useState<{ key: string; page: number; cursors: (string | null)[] }>({
+    key: filterKey,
+    page: 1,
+    cursors: [null],
+  });
+  const isCurrentKey = paging.key === filterKey;
+  const cursors = isCurrentKey ? paging.cursors : [null];
+  const currentPage = isCurrentKey ? paging.page : 1;
+  const setCurrentPage = (page: number) => {
+    setPaging({ key: filterKey, page, cursors });
+  };
+
+  const cursor = cursors[currentPage - 1];
+  if (cursor) params.set("cursor", cursor);
+
+  // Fetch one page of products from API (filtering and sorting happen on the server)
+  const { data: productsPage, isLoading: isLoadingProducts } = useQuery<ProductsPage>({
+    queryKey: ["/api/products", params.toString()],
+    queryFn: async () => {
+      const response = await fetch(`/api/products?${params.toString()}`);
+      if (!response.ok) throw new Error("Failed to fetch products");
+      return response.json();
+    },
   });
 
+  // Remember where the next page starts once this page has loaded
+  useEffect(() => {
+    if (productsPage?.next_cursor && cursors.length === currentPage) {
+      setPaging({ key: filterKey, page: currentPage, cursors: [...cursors, productsPage.next_cursor] });
+    }
+  }, [productsPage]);
+
+  const displayedProducts = productsPage?.items || [];
+  const totalPages = productsPage ? Math.ceil(productsPage.total / productsPerPage) : 0;
+
   const handleResetFilters = () => {
     setSelectedCategory("all");
     setSelectedSort("new");
     setPriceFrom("");
     setPriceTo("");
     setSearchQuery("");
-    setCurrentPage(1);
+    setPaging({ key: "", page: 1, cursors: [null] });
   };
 
-  const productsPerPage = 12;
-  
-  // Apply filtering and sorting with useMemo for performance
-  const { filteredProducts, totalPages, displayedProducts } = useMemo(() => {
-    let filtered = [...products];
-    
-    // Filter by search query
-    if (searchQuery.trim()) {
-      const query = searchQuery.toLowerCase();
-      filtered = filtered.filter(
-        product => product.name.toLowerCase().includes(query)
-      );
-    }
-    
-    // Filter by category
-    if (selectedCategory !== "all") {
-      filtered = filtered.filter(
-        product => product.category_id === selectedCategory
-      );
-    }
-    
-    // Filter by price range
-    const minPrice = priceFrom ? parseFloat(priceFrom) : 0;
-    const maxPrice = priceTo ? parseFloat(priceTo) : Infinity;
-    
-    if (priceFrom || priceTo) {
-      filtered = filtered.filter(
-        product => product.price >= minPrice && product.price <= maxPrice
-      );
-    }
-    
-    // Apply sorting
-    switch (selectedSort) {
-      case 'new':
-        // Keep original order (newest first)
-        break;
-      case 'old':
-        filtered = [...filtered].reverse();
-        break;
-      case 'price-asc':
-        filtered = [...filtered].sort((a, b) => a.price - b.price);
-        break;
-      case 'price-desc':
-        filtered = [...filtered].sort((a, b) => b.price - a.price);
-        break;
-    }
-    
-    const pages = Math.ceil(filtered.length / productsPerPage);
-    const startIndex = (currentPage - 1) * productsPerPage;
-    const displayed = filtered.slice(startIndex, startIndex + productsPerPage);
-    
-    return {
-      filteredProducts: filtered,
-      totalPages: pages,
-      displayedProducts: displayed
-    };
-  }, [products, searchQuery, selectedCategory, priceFrom, priceTo, selectedSort, currentPage]);
-
   return (
     <div className="min-h-screen bg-background">
       <Header
@@ -164,6 +170,7 @@ export default function Home({
             currentPage={currentPage}
             totalPages={totalPages}
             onPageChange={setCurrentPage}
+            isPageReachable={(p) => p <= cursors.length}
           />
         </>
       )}
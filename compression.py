@@ -0,0 +1,125 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+Text-like responses (JSON, HTML, JS, CSS, SVG) above a minimum size are
+compressed with brotli when the client accepts it and the `brotli` package
+is installed, otherwise with gzip. Streamed responses are compressed chunk
+by chunk as they are sent.
+
+Settings (environment variables):
+    COMPRESS_MIN_SIZE      smallest body in bytes worth compressing (default 1024)
+    COMPRESS_GZIP_LEVEL    gzip level 1-9 (default 6)
+    COMPRESS_BROTLI_LEVEL  brotli quality 0-11 (default 4, tuned for dynamic responses)
+"""
+
+import gzip
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+BROTLI_LEVEL = int(os.getenv('COMPRESS_BROTLI_LEVEL', '4'))
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/javascript',
+    'text/',
+    'image/svg+xml',
+)
+
+
+def available_encodings():
+    """Returns supported content codings in order of preference"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding):
+    """
+    Picks the content coding to use for a request
+
+    Parameters:
+        accept_encoding: werkzeug MIMEAccept/Accept object (request.accept_encodings)
+
+    Returns:
+        str | None: 'br', 'gzip' or None for identity
+    """
+    for encoding in available_encodings():
+        if accept_encoding[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(body, encoding, gzip_level=None, brotli_level=None):
+    """Compresses a complete body with the given content coding"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_LEVEL if brotli_level is None else brotli_level)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL if gzip_level is None else gzip_level, mtime=0)
+    raise ValueError(f'Unsupported encoding: {encoding}')
+
+
+def compress_stream(chunks, encoding):
+    """Compresses an iterable of byte chunks, yielding compressed chunks"""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_LEVEL)
+        for chunk in chunks:
+            out = compressor.process(chunk)
+            if out:
+                yield out
+        yield compressor.finish()
+        return
+
+    # wbits=31 produces a gzip container
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _is_compressible(response):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if 'Content-Encoding' in response.headers or response.direct_passthrough:
+        return False
+    mimetype = response.mimetype or ''
+    return mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def init_app(app):
+    """Registers an after_request hook that compresses eligible responses"""
+    from flask import request
+
+    @app.after_request
+    def compress_response(response):
+        if not _is_compressible(response):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < MIN_SIZE:
+                return response
+            response.set_data(compress(body, encoding))
+
+        response.headers['Content-Encoding'] = encoding
+        # A strong ETag identifies the exact bytes, so each coding gets its own
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f'{etag}-{encoding}')
+        return response
+
+    return app
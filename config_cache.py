@@ -0,0 +1,104 @@
+"""
+Cached, pre-serialized JSON config files.
+
+GET /api/config is the first request every Mini App client makes. Instead of
+opening, parsing and re-dumping config/settings.json each time, the file is
+loaded once per worker and kept as ready-to-send UTF-8 bytes together with
+gzip/brotli copies and an ETag.
+
+The file is stat()ed at most every CONFIG_CHECK_INTERVAL seconds. When its
+mtime or size changes it is re-read, and the cached bytes are rebuilt only
+if the content hash actually differs, so edits show up without a restart.
+A broken edit (invalid JSON) keeps the last good version in service.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import compression
+import fast_json
+
+CHECK_INTERVAL = float(os.getenv('CONFIG_CHECK_INTERVAL', '1'))
+
+
+class ConfigEntry:
+    """One loaded version of a config file"""
+
+    def __init__(self, data, body, digest, last_modified):
+        self.data = data
+        self.body = body
+        self.etag = 'cfg-' + digest[:16]
+        self.last_modified = last_modified
+        self.compressed = {
+            encoding: compression.compress(body, encoding, gzip_level=9, brotli_level=11)
+            for encoding in compression.available_encodings()
+        }
+
+
+class CachedJSONFile:
+    """JSON file kept in memory and reloaded when it changes on disk"""
+
+    def __init__(self, path, check_interval=CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entry = None
+        self._stat_key = None
+        self._digest = None
+        self._checked_at = 0.0
+        self.reloads = 0
+
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+            stat_key = (st.st_mtime_ns, st.st_size)
+            if stat_key == self._stat_key and self._entry is not None:
+                return
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+        except OSError as e:
+            # e.g. the file is being replaced by an editor or deploy script
+            if self._entry is None:
+                raise
+            print(f"⚠️ Could not read {self.path}, keeping previous version: {e}")
+            return
+        self._stat_key = stat_key
+        digest = hashlib.sha1(raw).hexdigest()
+        if digest == self._digest and self._entry is not None:
+            # Touched but not changed
+            return
+
+        try:
+            data = json.loads(raw.decode('utf-8'))
+        except ValueError as e:
+            if self._entry is None:
+                raise
+            print(f"⚠️ {self.path} is not valid JSON, keeping previous version: {e}")
+            return
+
+        last_modified = datetime.fromtimestamp(st.st_mtime, tz=timezone.utc)
+        self._entry = ConfigEntry(data, fast_json.dumps(data), digest, last_modified)
+        self._digest = digest
+        self.reloads += 1
+
+    def get(self):
+        """
+        Returns the current version of the file
+
+        Returns:
+            ConfigEntry: data, body, etag, last_modified and compressed bodies
+        """
+        now = time.monotonic()
+        if self._entry is None or now - self._checked_at >= self.check_interval:
+            with self._lock:
+                if self._entry is None or now - self._checked_at >= self.check_interval:
+                    self._refresh()
+                    self._checked_at = now
+        return self._entry
+
+
+settings_file = CachedJSONFile(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'settings.json'))
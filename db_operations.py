@@ -1,28 +1,8 @@
-import psycopg2
-from psycopg2.extras import RealDictCursor
 import os
 import json
-
-
-def get_db_connection():
-    """Creates database connection"""
-    database_url = os.getenv('DATABASE_URL')
-    
-    if database_url:
-        if 'sslmode=' not in database_url:
-            database_url = database_url + ('&' if '?' in database_url else '?') + 'sslmode=require'
-        conn = psycopg2.connect(database_url, cursor_factory=RealDictCursor)
-    else:
-        conn = psycopg2.connect(
-            host=os.getenv('PGHOST'),
-            port=os.getenv('PGPORT', '5432'),
-            user=os.getenv('PGUSER'),
-            password=os.getenv('PGPASSWORD'),
-            database=os.getenv('PGDATABASE'),
-            sslmode='require',
-            cursor_factory=RealDictCursor
-        )
-    return conn
+from psycopg2.extras import Json
+import catalog
+from db_pool import db_connection
 
 
 def get_config():
@@ -60,7 +40,7 @@ def get_categories_from_config():
         return []
 
 
-def add_product(name, description, price, images, category_id=None):
+def add_product(name, description, price, images, category_id=None, image_variants=None):
     """
     Adds new product to database
     
@@ -70,21 +50,22 @@ def add_product(name, description, price, images, category_id=None):
         price (int): Product price in cents
         images (list): Array of image URLs
         category_id (str, optional): Category ID (must match category ID from config)
+        image_variants (list, optional): Resized copies per image (see image_variants.py)
     
     Returns:
         dict: Dictionary with created product data or None if error
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute(
-            'INSERT INTO products (name, description, price, images, category_id) VALUES (%s, %s, %s, %s, %s) RETURNING *',
-            (name, description, price, images, category_id)
-        )
-        product = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(
+                'INSERT INTO products (name, description, price, images, image_variants, category_id) '
+                'VALUES (%s, %s, %s, %s, %s, %s) RETURNING *',
+                (name, description, price, images, Json(image_variants or []), category_id)
+            )
+            product = cur.fetchone()
+            conn.commit()
+            cur.close()
         return product
     except Exception as e:
         print(f"Error adding product: {e}")
@@ -102,13 +83,12 @@ def delete_product(product_id):
         bool: True if product deleted, False if error
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute('DELETE FROM products WHERE id = %s', (product_id,))
-        deleted_count = cur.rowcount
-        conn.commit()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute('DELETE FROM products WHERE id = %s', (product_id,))
+            deleted_count = cur.rowcount
+            conn.commit()
+            cur.close()
         return deleted_count > 0
     except Exception as e:
         print(f"Error deleting product: {e}")
@@ -126,17 +106,16 @@ def get_all_products(category_id=None):
         list: Array of product dictionaries or empty array if error
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with db_connection() as conn:
+            cur = conn.cursor()
         
-        if category_id:
-            cur.execute('SELECT * FROM products WHERE category_id = %s', (category_id,))
-        else:
-            cur.execute('SELECT * FROM products')
+            if category_id:
+                cur.execute('SELECT * FROM products WHERE category_id = %s', (category_id,))
+            else:
+                cur.execute('SELECT * FROM products')
         
-        products = cur.fetchall()
-        cur.close()
-        conn.close()
+            products = cur.fetchall()
+            cur.close()
         return products
     except Exception as e:
         print(f"Error getting products: {e}")
@@ -154,42 +133,47 @@ def get_product_by_id(product_id):
         dict: Dictionary with product data or None if not found
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute('SELECT * FROM products WHERE id = %s', (product_id,))
-        product = cur.fetchone()
-        cur.close()
-        conn.close()
+        with db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute('SELECT * FROM products WHERE id = %s', (product_id,))
+            product = cur.fetchone()
+            cur.close()
         return product
     except Exception as e:
         print(f"Error getting product: {e}")
         return None
 
 
-def find_products_by_name(name):
+def find_products_by_name(name, limit=20, cursor=None):
     """
-    Searches products by name (partial match)
+    Searches products by name and description, best matches first
+    
+    Tolerates typos (trigram similarity) and uses the search indexes,
+    see catalog.py.
     
     Parameters:
-        name (str): Product name or part of name
+        name (str): Search text
+        limit (int): Page size, at most catalog.MAX_LIMIT
+        cursor (str): `next_cursor` of the previous page (optional)
     
     Returns:
-        list: Array of product dictionaries or empty array
+        list: Array of product dictionaries (with `score`) or empty array
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute('SELECT * FROM products WHERE name ILIKE %s', (f'%{name}%',))
-        products = cur.fetchall()
-        cur.close()
-        conn.close()
-        return products
+        filters = catalog.parse_query({'q': name, 'sort': catalog.RELEVANCE, 'limit': limit, 'cursor': cursor,
+                                       'fields': 'admin'})
+        with db_connection() as conn:
+            cur = conn.cursor()
+            page = catalog.fetch_page(cur, filters)
+            cur.close()
+        return page['items']
     except Exception as e:
         print(f"Error searching products: {e}")
         return []
 
 
-def update_product(product_id, name=None, description=None, price=None, images=None, category_id=None):
+def update_product(product_id, name=None, description=None, price=None, images=None, category_id=None,
+                   image_variants=None):
     """
     Updates product in database
     
@@ -200,45 +184,48 @@ def update_product(product_id, name=None, description=None, price=None, images=N
         price (int, optional): New price in cents
         images (list, optional): New array of image URLs
         category_id (str, optional): New category ID
+        image_variants (list, optional): Variants of the new images; cleared when
+            images change without them, so they never point at old photos
     
     Returns:
         dict: Updated product data or None if error
     """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
+        with db_connection() as conn:
+            cur = conn.cursor()
         
-        # Build update query dynamically
-        updates = []
-        values = []
+            # Build update query dynamically
+            updates = []
+            values = []
         
-        if name is not None:
-            updates.append("name = %s")
-            values.append(name)
-        if description is not None:
-            updates.append("description = %s")
-            values.append(description)
-        if price is not None:
-            updates.append("price = %s")
-            values.append(price)
-        if images is not None:
-            updates.append("images = %s")
-            values.append(images)
-        if category_id is not None:
-            updates.append("category_id = %s")
-            values.append(category_id)
+            if name is not None:
+                updates.append("name = %s")
+                values.append(name)
+            if description is not None:
+                updates.append("description = %s")
+                values.append(description)
+            if price is not None:
+                updates.append("price = %s")
+                values.append(price)
+            if images is not None:
+                updates.append("images = %s")
+                values.append(images)
+                updates.append("image_variants = %s")
+                values.append(Json(image_variants or []))
+            if category_id is not None:
+                updates.append("category_id = %s")
+                values.append(category_id)
         
-        if not updates:
-            return None
+            if not updates:
+                return None
         
-        values.append(product_id)
-        query = f"UPDATE products SET {', '.join(updates)} WHERE id = %s RETURNING *"
+            values.append(product_id)
+            query = f"UPDATE products SET {', '.join(updates)} WHERE id = %s RETURNING *"
         
-        cur.execute(query, values)
-        product = cur.fetchone()
-        conn.commit()
-        cur.close()
-        conn.close()
+            cur.execute(query, values)
+            product = cur.fetchone()
+            conn.commit()
+            cur.close()
         return product
     except Exception as e:
         print(f"Error updating product: {e}")
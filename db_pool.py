@@ -0,0 +1,298 @@
+"""
+Per-worker PostgreSQL connection pool.
+
+Each gunicorn worker keeps a small, bounded set of open connections instead
+of running psycopg2.connect() (and a TLS handshake for Neon/AWS) on every
+request. Connections inherited from a parent process after fork are dropped
+and never reused, and every checkout verifies the connection is still alive.
+
+Usage:
+    from db_pool import db_connection
+
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute('SELECT 1')
+
+Settings (environment variables):
+    DB_POOL_MIN_SIZE      connections opened eagerly on first use (default 1)
+    DB_POOL_MAX_SIZE      max connections per worker process (default 10)
+    DB_POOL_TIMEOUT       seconds to wait for a free connection (default 10)
+    DB_POOL_CHECK_IDLE    connections idle longer than this many seconds are
+                          pinged with SELECT 1 before reuse (default 30)
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.extras import RealDictCursor
+
+import metrics
+from query_profiler import ProfiledCursor
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout"""
+
+
+def connect_params():
+    """
+    Connection settings from DATABASE_URL or PG* variables
+
+    Returns:
+        tuple: (dsn, kwargs) accepted by psycopg2.connect and psycopg.conninfo.make_conninfo
+    """
+    # Use DATABASE_URL if available, otherwise build from individual vars
+    database_url = os.getenv('DATABASE_URL')
+
+    if database_url:
+        # Check if this is a remote Neon database (contains neon.tech)
+        # Local PostgreSQL on VPS doesn't need sslmode
+        if 'neon.tech' in database_url or 'amazonaws.com' in database_url:
+            if 'sslmode=' not in database_url:
+                database_url = database_url + ('&' if '?' in database_url else '?') + 'sslmode=require'
+        return database_url, {}
+
+    # Build connection from individual PostgreSQL environment variables
+    return '', {
+        'host': os.getenv('PGHOST', 'localhost'),
+        'port': os.getenv('PGPORT', '5432'),
+        'user': os.getenv('PGUSER'),
+        'password': os.getenv('PGPASSWORD'),
+        'dbname': os.getenv('PGDATABASE'),
+    }
+
+
+class TimedCursor(ProfiledCursor):
+    """Cursor of pooled connections: slow-query log/profiler plus statement metrics"""
+
+    def _observe(self, query, vars, seconds):
+        super()._observe(query, vars, seconds)
+        metrics.DB_QUERY.observe(seconds, statement=metrics.statement_kind(query))
+
+
+def connect():
+    """Opens a new database connection using DATABASE_URL or PG* variables"""
+    dsn, kwargs = connect_params()
+    start = time.perf_counter()
+    conn = psycopg2.connect(dsn, cursor_factory=TimedCursor, **kwargs)
+    metrics.DB_CONNECT.observe(time.perf_counter() - start)
+    return conn
+
+
+class ConnectionPool:
+    """Bounded, thread-safe, fork-aware pool of psycopg2 connections"""
+
+    def __init__(self, min_size=1, max_size=10, timeout=10.0, check_idle=30.0, connect_fn=connect):
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_idle = check_idle
+        self._connect = connect_fn
+        self._reset()
+
+    def _reset(self):
+        """Forgets every connection; used on init and after fork"""
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._idle = []        # [(conn, returned_at)] - LIFO keeps hot connections hot
+        self._in_use = set()
+        self._opened = 0
+        self._discarded = 0
+        self._prefilled = False
+
+    def _check_fork(self):
+        # Connections created in the parent share sockets with it. Closing them
+        # here would send a Terminate message on the parent's session, so the
+        # child simply drops the references and starts from an empty pool.
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _prefill(self):
+        with self._lock:
+            if self._prefilled:
+                return
+            self._prefilled = True
+            missing = self.min_size - len(self._idle) - len(self._in_use)
+        for _ in range(max(missing, 0)):
+            try:
+                conn = self._connect()
+            except psycopg2.Error as e:
+                print(f"⚠️ Could not pre-open pooled connection: {e}")
+                return
+            with self._lock:
+                self._opened += 1
+                self._idle.append((conn, time.monotonic()))
+
+    def _is_healthy(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - returned_at < self.check_idle:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute('SELECT 1')
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        with self._lock:
+            self._discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def getconn(self):
+        """
+        Checks a connection out of the pool, opening one if needed
+
+        Returns:
+            psycopg2.connection: A healthy connection owned by the caller
+
+        Raises:
+            PoolTimeout: If max_size connections stay checked out for `timeout` seconds
+        """
+        self._check_fork()
+        if not self._prefilled:
+            self._prefill()
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeout(
+                f'No database connection available after {self.timeout}s '
+                f'({self.max_size} checked out)'
+            )
+        try:
+            while True:
+                with self._lock:
+                    item = self._idle.pop() if self._idle else None
+                if item is None:
+                    conn = self._connect()
+                    with self._lock:
+                        self._opened += 1
+                    break
+                conn, returned_at = item
+                if self._is_healthy(conn, returned_at):
+                    break
+                self._discard(conn)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._in_use.add(conn)
+        return conn
+
+    def putconn(self, conn, close=False):
+        """
+        Returns a connection to the pool
+
+        Parameters:
+            conn: Connection obtained from getconn()
+            close (bool): Close the connection instead of keeping it idle
+        """
+        if self._pid != os.getpid():
+            # Checked out before a fork; the child's pool never owned it
+            return
+        with self._lock:
+            if conn not in self._in_use:
+                return
+            self._in_use.discard(conn)
+
+        try:
+            if not close and not conn.closed:
+                # Never hand out a connection with an open transaction
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            if close or conn.closed:
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._idle.append((conn, time.monotonic()))
+        except psycopg2.Error:
+            self._discard(conn)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        """Closes every idle connection held by this process"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        if self._pid != os.getpid():
+            return
+        for conn, _ in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        """
+        Returns pool usage counters for this worker process
+
+        Returns:
+            dict: pid, max_size, in_use, idle, opened, discarded
+        """
+        self._check_fork()
+        with self._lock:
+            return {
+                'pid': self._pid,
+                'max_size': self.max_size,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'opened': self._opened,
+                'discarded': self._discarded,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Returns the process-wide pool, creating it from env settings on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    min_size=int(os.getenv('DB_POOL_MIN_SIZE', '1')),
+                    max_size=int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+                    timeout=float(os.getenv('DB_POOL_TIMEOUT', '10')),
+                    check_idle=float(os.getenv('DB_POOL_CHECK_IDLE', '30')),
+                )
+    return _pool
+
+
+@contextmanager
+def db_connection():
+    """
+    Context manager that checks out a pooled connection
+
+    Uncommitted work is rolled back when the block exits, so callers must
+    call conn.commit() explicitly, exactly as with a plain connection.
+    Connections that raised a connection-level error are closed, not reused.
+    """
+    pool = get_pool()
+    start = time.perf_counter()
+    conn = pool.getconn()
+    metrics.DB_ACQUIRE.observe(time.perf_counter() - start)
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        pool.putconn(conn, close=broken or conn.closed != 0)
@@ -0,0 +1,138 @@
+"""
+Fast JSON encoding for API responses.
+
+Installs a Flask JSON provider so every jsonify() call goes through a
+pluggable encoder: orjson when it is installed, the stdlib json module
+otherwise. Large lists (and {'items': [...]} pages) are streamed to the
+client in chunks instead of being built as one big string.
+
+Settings (environment variables):
+    JSON_ENCODER           'orjson' or 'stdlib' (default: orjson if importable)
+    JSON_STREAM_MIN_ITEMS  lists at least this long are streamed (default 1000)
+    JSON_STREAM_CHUNK      items per streamed chunk (default 500)
+"""
+
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+ENCODERS = {'stdlib': _stdlib_dumps}
+if orjson is not None:
+    ENCODERS['orjson'] = _orjson_dumps
+
+_encoder_name = os.getenv('JSON_ENCODER') or ('orjson' if orjson is not None else 'stdlib')
+if _encoder_name not in ENCODERS:
+    print(f"⚠️ JSON encoder '{_encoder_name}' is not available, using stdlib")
+    _encoder_name = 'stdlib'
+
+STREAM_MIN_ITEMS = int(os.getenv('JSON_STREAM_MIN_ITEMS', '1000'))
+STREAM_CHUNK = int(os.getenv('JSON_STREAM_CHUNK', '500'))
+
+
+def encoder_name():
+    """Returns the name of the active encoder ('orjson' or 'stdlib')"""
+    return _encoder_name
+
+
+def set_encoder(name):
+    """Switches the active encoder; raises KeyError for unknown or missing ones"""
+    global _encoder_name
+    ENCODERS[name]
+    _encoder_name = name
+
+
+def dumps(obj):
+    """Encodes obj to UTF-8 JSON bytes with the active encoder"""
+    return ENCODERS[_encoder_name](obj)
+
+
+def iter_json(obj, chunk_size=None):
+    """
+    Yields obj as JSON in byte chunks
+
+    Top-level lists and the `items` list of a page dict are encoded
+    chunk_size elements at a time, so the full body never exists in memory.
+    Anything else is yielded as a single chunk.
+    """
+    chunk_size = chunk_size or STREAM_CHUNK
+    encode = ENCODERS[_encoder_name]
+
+    if isinstance(obj, dict) and isinstance(obj.get('items'), list):
+        rest = {k: v for k, v in obj.items() if k != 'items'}
+        yield b'{"items":'
+        yield from iter_json(obj['items'], chunk_size)
+        if rest:
+            yield b',' + encode(rest)[1:]
+        else:
+            yield b'}'
+        return
+
+    if not isinstance(obj, list):
+        yield encode(obj)
+        return
+
+    yield b'['
+    for start in range(0, len(obj), chunk_size):
+        body = encode(obj[start:start + chunk_size])[1:-1]
+        if start:
+            body = b',' + body
+        yield body
+    yield b']'
+
+
+def _item_count(obj):
+    if isinstance(obj, list):
+        return len(obj)
+    if isinstance(obj, dict) and isinstance(obj.get('items'), list):
+        return len(obj['items'])
+    return 0
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by fast_json.dumps"""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if _item_count(obj) >= STREAM_MIN_ITEMS:
+            return self._app.response_class(iter_json(obj), mimetype=self.mimetype)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
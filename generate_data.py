@@ -0,0 +1,255 @@
+"""
+Synthetic data for scale testing, bulk-loaded with COPY.
+
+Generates N products spread over the categories of config/settings.json,
+M Telegram users, and carts and favorites whose product choice follows a
+Zipf-like popularity curve (a few bestsellers, a long tail), then streams
+everything into Postgres with COPY in chunks. The same --seed always
+produces the same rows (ids and timestamps included).
+
+Unlike seed_db.py this is meant for load tests and benchmarks against
+production-sized data; run it against a local or staging database only.
+
+Usage:
+    python generate_data.py --products 100000 --users 20000
+    python generate_data.py --products 1000000 --users 100000 --truncate --seed 7
+    python generate_data.py --products 0 --users 5000 --cart-share 0.6
+
+Options that shape the data:
+    --cart-share / --favorites-share   fraction of users with a non-empty cart / favorites
+    --cart-items / --favorites-items   mean items per non-empty cart / favorites list
+    --popularity                       Zipf exponent of product popularity (0 = uniform)
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+from bisect import bisect
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from db_pool import connect
+from migrations import migrate
+
+CHUNK_ROWS = 50000
+
+# Telegram ids of generated users (above real ids; the load test uses 9_900_000_000+)
+TELEGRAM_ID_BASE = 9_000_000_000
+
+IMAGE_URL = 'https://res.cloudinary.com/demo/image/upload/v1/telegram_shop_products/{}.jpg'
+
+ITEMS = ['Куртка', 'Шапка', 'Кроссовки', 'Рубашка', 'Брюки', 'Ремень', 'Футболка', 'Худи',
+         'Джинсы', 'Пальто', 'Кепка', 'Свитер', 'Ботинки', 'Шарф', 'Платье', 'Юбка']
+ADJECTIVES = ['Classic', 'Premium', 'Oversize', 'Slim', 'Winter', 'Summer', 'Sport', 'Basic',
+              'Urban', 'Vintage', 'Comfort', 'Street']
+COLORS = ['чёрный', 'белый', 'бежевый', 'серый', 'синий', 'зелёный', 'красный', 'хаки']
+DESCRIPTION_WORDS = ['хлопок', 'полиэстер', 'шерсть', 'удобный', 'тёплый', 'лёгкий', 'стильный',
+                     'размер', 'S', 'M', 'L', 'XL', 'уход', 'стирка', '30°', 'новинка', 'коллекция',
+                     'качество', 'доставка', 'оригинал']
+FIRST_NAMES = ['Алишер', 'Азиз', 'Дилноза', 'Мадина', 'Тимур', 'Анна', 'Иван', 'Мария',
+               'Рустам', 'Сабина', 'Jasur', 'Kamola', 'Bekzod', 'Nilufar']
+LAST_NAMES = ['Каримов', 'Усманова', 'Рахимов', 'Иванова', 'Петров', 'Юсупова', 'Tursunov', 'Aliyeva']
+
+
+def load_category_ids():
+    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'settings.json')
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return [str(cat['id']) for cat in json.load(f).get('categories', [])] or [None]
+
+
+def make_uuid(rng):
+    h = f'{rng.getrandbits(128):032x}'
+    return f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}'
+
+
+def pg_array(values):
+    return '{' + ','.join(f'"{v}"' for v in values) + '}'
+
+
+def generate_products(rng, count, category_ids):
+    """Yields products rows: (id, name, description, price, images, category_id, created_at)"""
+    # Uneven category sizes, like a real shop
+    category_cum = list(accumulate(rng.uniform(0.3, 1.0) for _ in category_ids))
+    # Building every description word by word dominates the run time; a pool is enough
+    descriptions = [' '.join(rng.choices(DESCRIPTION_WORDS, k=rng.randint(8, 40))) for _ in range(2000)]
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for _ in range(count):
+        name = f"{rng.choice(ITEMS)} {rng.choice(ADJECTIVES)} {rng.choice(COLORS)}"
+        description = rng.choice(descriptions)
+        # Log-normal prices rounded to 1000 sum, median ~150 000
+        price = max(int(rng.lognormvariate(11.9, 0.7)) // 1000 * 1000, 1000)
+        images = [IMAGE_URL.format(f'{rng.getrandbits(64):016x}') for _ in range(rng.randint(1, 4))]
+        created_at = now - timedelta(seconds=int(rng.random() * 365 * 24 * 3600))
+        category_id = category_ids[bisect(category_cum, rng.random() * category_cum[-1])]
+        yield (make_uuid(rng), name, description, price, pg_array(images), category_id, created_at.isoformat())
+
+
+def generate_users(rng, count):
+    """Yields users rows: (id, telegram_id, username, first_name, last_name)"""
+    for i in range(count):
+        telegram_id = TELEGRAM_ID_BASE + i
+        username = f'user{telegram_id}' if rng.random() < 0.8 else ''
+        yield (make_uuid(rng), telegram_id, username, rng.choice(FIRST_NAMES),
+               rng.choice(LAST_NAMES) if rng.random() < 0.7 else '')
+
+
+def popularity_picker(rng, product_ids, exponent):
+    """Returns a function picking product ids with Zipf-like weights (rank ** -exponent)"""
+    ranked = product_ids[:]
+    rng.shuffle(ranked)
+    cum_weights = list(accumulate(1 / (rank ** exponent) for rank in range(1, len(ranked) + 1)))
+
+    def pick(k):
+        return rng.choices(ranked, cum_weights=cum_weights, k=k)
+    return pick
+
+
+def generate_links(rng, user_ids, pick, share, mean_items, quantity=False):
+    """
+    Yields cart or favorites rows for a share of the users
+
+    Item counts are geometric with the given mean; a user never gets the same
+    product twice (UNIQUE(user_id, product_id)).
+    """
+    p = 1 / max(mean_items, 1)
+    for user_id in user_ids:
+        if rng.random() >= share:
+            continue
+        count = 1
+        while rng.random() > p and count < 100:
+            count += 1
+        for product_id in dict.fromkeys(pick(count)):
+            row = (make_uuid(rng), user_id, product_id)
+            if quantity:
+                row += (rng.choices((1, 2, 3, 5), (70, 20, 8, 2))[0],)
+            yield row
+
+
+def copy_rows(cur, table, columns, rows):
+    """Streams rows into a table with COPY, CHUNK_ROWS at a time; returns the row count"""
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    total = 0
+    while True:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        written = 0
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+            if written == CHUNK_ROWS:
+                break
+        if not written:
+            return total
+        buffer.seek(0)
+        cur.copy_expert(sql, buffer)
+        total += written
+        if written < CHUNK_ROWS:
+            return total
+
+
+def generate(products, users, seed=42, cart_share=0.3, cart_items=3, favorites_share=0.4,
+             favorites_items=6, popularity=1.1, truncate=False):
+    """
+    Generates and loads the data in one transaction
+
+    Returns:
+        dict: Rows loaded per table
+    """
+    migrate(verbose=False)
+    rng = random.Random(seed)
+    conn = connect()
+    cur = conn.cursor()
+    counts = {}
+    try:
+        if truncate:
+            cur.execute('TRUNCATE order_items, orders, notification_outbox, cart, favorites, users, products')
+
+        started = time.perf_counter()
+        counts['products'] = copy_rows(
+            cur, 'products', ('id', 'name', 'description', 'price', 'images', 'category_id', 'created_at'),
+            generate_products(rng, products, load_category_ids())
+        )
+        counts['users'] = copy_rows(
+            cur, 'users', ('id', 'telegram_id', 'username', 'first_name', 'last_name'),
+            generate_users(rng, users)
+        )
+
+        # Carts and favorites may also point at products that existed before
+        cur.execute('SELECT id FROM products ORDER BY id')
+        product_ids = [row['id'] for row in cur.fetchall()]
+        cur.execute('SELECT id FROM users WHERE telegram_id >= %s AND telegram_id < %s ORDER BY telegram_id',
+                    (TELEGRAM_ID_BASE, TELEGRAM_ID_BASE + users))
+        user_ids = [row['id'] for row in cur.fetchall()]
+        if product_ids and user_ids:
+            pick = popularity_picker(rng, product_ids, popularity)
+            counts['cart'] = copy_rows(
+                cur, 'cart', ('id', 'user_id', 'product_id', 'quantity'),
+                generate_links(rng, user_ids, pick, cart_share, cart_items, quantity=True)
+            )
+            counts['favorites'] = copy_rows(
+                cur, 'favorites', ('id', 'user_id', 'product_id'),
+                generate_links(rng, user_ids, pick, favorites_share, favorites_items)
+            )
+        conn.commit()
+        load_seconds = time.perf_counter() - started
+
+        # Fresh statistics so the planner uses the indexes on the new volume
+        conn.autocommit = True
+        cur.execute('ANALYZE products')
+        cur.execute('ANALYZE users')
+        cur.execute('ANALYZE cart')
+        cur.execute('ANALYZE favorites')
+        counts['seconds'] = round(load_seconds, 1)
+        return counts
+    except Exception:
+        if not conn.autocommit:
+            conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+def main():
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    parser = argparse.ArgumentParser(description='Bulk-load synthetic shop data with COPY')
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--cart-share', type=float, default=0.3)
+    parser.add_argument('--cart-items', type=float, default=3)
+    parser.add_argument('--favorites-share', type=float, default=0.4)
+    parser.add_argument('--favorites-items', type=float, default=6)
+    parser.add_argument('--popularity', type=float, default=1.1)
+    parser.add_argument('--truncate', action='store_true',
+                        help='delete ALL products, users, carts, favorites and orders first')
+    args = parser.parse_args()
+
+    print(f"⏳ Generating {args.products} products and {args.users} users (seed {args.seed})...")
+    try:
+        counts = generate(args.products, args.users, seed=args.seed, cart_share=args.cart_share,
+                          cart_items=args.cart_items, favorites_share=args.favorites_share,
+                          favorites_items=args.favorites_items, popularity=args.popularity,
+                          truncate=args.truncate)
+    except Exception as e:
+        print(f"❌ Generation failed: {e}")
+        if 'duplicate key' in str(e):
+            print("   Rows of this seed already exist; use another --seed or --truncate")
+        return 1
+    seconds = counts.pop('seconds')
+    print(f"✅ Loaded in {seconds}s: " + ', '.join(f"{table}={count}" for table, count in counts.items()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
 Initialize database tables (run this once before starting the app)
+Equivalent to `python migrations.py`
 """
 import os
 from dotenv import load_dotenv
@@ -11,7 +12,6 @@ load_dotenv()
 from app import init_db
 
 if __name__ == '__main__':
-    print("Creating database tables if they don't exist...")
+    print("Applying database migrations...")
     init_db()
-    print("Database tables created successfully!")
     print("\nTo seed sample data, run: python seed_db.py")
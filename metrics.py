@@ -0,0 +1,380 @@
+"""
+Prometheus metrics aggregated across gunicorn workers.
+
+Every process (gunicorn workers, notification_dispatcher.py, the ASGI
+server) counts into its own in-memory registry and a background thread
+writes it to METRICS_DIR/<pid>-<start>.json at most once per
+METRICS_FLUSH_INTERVAL. GET /api/metrics, answered by whichever worker
+receives the scrape, flushes its own counters and sums the files of all
+processes, so the totals do not depend on which worker was hit.
+
+Files of exited processes are folded into archive.json on scrape, so the
+counters stay monotonic across worker restarts while the directory does
+not grow. `python metrics.py --reset` clears the directory (done on
+start, see start_production.sh).
+
+Metrics:
+    http_requests_total                    route, method, status
+    http_request_errors_total              route, method (status >= 500)
+    http_request_duration_seconds          histogram: route, method
+    db_connection_acquire_seconds          histogram: checkout from the pool
+    db_connection_open_seconds             histogram: new connection (incl. TLS)
+    db_query_duration_seconds              histogram: statement (select/insert/with/...)
+    telegram_api_request_duration_seconds  histogram: method, status
+
+Settings (environment variables):
+    METRICS_DIR             shared directory for per-process files
+                            (default: <tmp>/shop-metrics; one per deployment)
+    METRICS_FLUSH_INTERVAL  seconds between writes of a process' file (default 1)
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: scrapes are not serialized
+    fcntl = None
+
+METRICS_DIR = os.getenv('METRICS_DIR') or os.path.join(tempfile.gettempdir(), 'shop-metrics')
+FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '1'))
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = '.lock'
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+EXTERNAL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Registry:
+    """In-memory metric values of the current process"""
+
+    def __init__(self):
+        self.metrics = {}
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._values = {}   # (name, labels) -> float | [bucket counts..., sum, count]
+        self._dirty = False
+        self._file = os.path.join(METRICS_DIR, f'{self._pid}-{time.time_ns()}.json')
+        self._flusher = None
+
+    def _check_fork(self):
+        # Values counted in a parent before fork belong to the parent's file
+        if self._pid != os.getpid():
+            self._reset()
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+            self._flusher.start()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def inc(self, name, labels, amount=1):
+        self._check_fork()
+        key = (name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+            self._dirty = True
+
+    def observe(self, name, labels, buckets, value):
+        self._check_fork()
+        key = (name, labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * (len(buckets) + 3)
+            # Per-bucket counts; made cumulative when rendered
+            index = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+            entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+            self._dirty = True
+
+    def snapshot(self):
+        with self._lock:
+            self._dirty = False
+            return [[name, list(labels), value] for (name, labels), value in self._values.items()]
+
+    def flush(self):
+        """Writes this process' values to its file (atomically)"""
+        if self._pid != os.getpid():
+            return
+        data = self.snapshot()
+        if not data:
+            return
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        tmp = f'{self._file}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'pid': self._pid, 'values': data}, f)
+        os.replace(tmp, self._file)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(FLUSH_INTERVAL)
+            if self._pid != os.getpid():
+                return
+            if self._dirty:
+                try:
+                    self.flush()
+                except OSError as e:
+                    print(f"⚠️ Could not write metrics: {e}")
+
+
+registry = Registry()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        registry.flush()
+    except OSError:
+        pass
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        registry.inc(self.name, tuple(str(labels[n]) for n in self.labelnames), amount)
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=REQUEST_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        registry.register(self)
+
+    def observe(self, value, **labels):
+        registry.observe(self.name, tuple(str(labels[n]) for n in self.labelnames), self.buckets, value)
+
+
+HTTP_REQUESTS = Counter('http_requests_total', 'HTTP requests', ('route', 'method', 'status'))
+HTTP_ERRORS = Counter('http_request_errors_total', 'HTTP requests answered with status >= 500', ('route', 'method'))
+HTTP_LATENCY = Histogram('http_request_duration_seconds', 'Time to produce the response', ('route', 'method'))
+DB_ACQUIRE = Histogram('db_connection_acquire_seconds', 'Time to check a connection out of the pool',
+                       buckets=DB_BUCKETS)
+DB_CONNECT = Histogram('db_connection_open_seconds', 'Time to open a new database connection',
+                       buckets=EXTERNAL_BUCKETS)
+DB_QUERY = Histogram('db_query_duration_seconds', 'Time to execute a statement', ('statement',),
+                     buckets=DB_BUCKETS)
+TELEGRAM_LATENCY = Histogram('telegram_api_request_duration_seconds', 'Telegram Bot API calls',
+                             ('method', 'status'), buckets=EXTERNAL_BUCKETS)
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+def observe_request(route, method, status, seconds):
+    """Records one HTTP request (route is the URL rule, not the concrete path)"""
+    route = route or UNMATCHED_ROUTE
+    HTTP_REQUESTS.inc(route=route, method=method, status=status)
+    if status >= 500:
+        HTTP_ERRORS.inc(route=route, method=method)
+    HTTP_LATENCY.observe(seconds, route=route, method=method)
+
+
+def statement_kind(query):
+    """First SQL keyword of a query, lowercased ('select', 'with', ...), for labels"""
+    if isinstance(query, bytes):
+        query = query[:64].decode('utf-8', 'replace')
+    if not isinstance(query, str):
+        return 'other'
+    for line in query.lstrip().splitlines():
+        line = line.strip()
+        if line and not line.startswith('--'):
+            return line.split(None, 1)[0].lower().rstrip('(;')
+    return 'other'
+
+
+def init_app(app):
+    """Records every request handled by a Flask app (app routes and blueprints)"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def _record(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            rule = request.url_rule.rule if request.url_rule else None
+            observe_request(rule, request.method, response.status_code, time.perf_counter() - start)
+        return response
+
+
+class ASGIMiddleware:
+    """Records every HTTP request handled by a Starlette app"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = getattr(scope.get('route'), 'path', None)
+            observe_request(route, scope['method'], status, time.perf_counter() - start)
+
+
+# ------------------------------------------------------------------
+# Aggregation and exposition
+# ------------------------------------------------------------------
+
+def _merge(totals, values):
+    for name, labels, value in values:
+        key = (name, tuple(labels))
+        current = totals.get(key)
+        if current is None:
+            totals[key] = list(value) if isinstance(value, list) else value
+        elif isinstance(value, list):
+            totals[key] = [a + b for a, b in zip(current, value)]
+        else:
+            totals[key] = current + value
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # Being replaced right now or truncated by a crash
+        return None
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect():
+    """
+    Sums the values of every process sharing METRICS_DIR
+
+    Returns:
+        dict: (name, labels) -> value
+    """
+    registry.flush()
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with open(os.path.join(METRICS_DIR, LOCK_FILE), 'w') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        archive_path = os.path.join(METRICS_DIR, ARCHIVE_FILE)
+        archive = (_read(archive_path) or {}).get('values', [])
+        totals = {}
+        _merge(totals, archive)
+
+        exited = []
+        for filename in os.listdir(METRICS_DIR):
+            if not filename.endswith('.json') or filename == ARCHIVE_FILE:
+                continue
+            path = os.path.join(METRICS_DIR, filename)
+            data = _read(path)
+            if data is None:
+                continue
+            _merge(totals, data['values'])
+            if not _alive(data['pid']):
+                exited.append(path)
+
+        if exited:
+            # Fold exited processes into the archive so their counts survive
+            merged = {}
+            _merge(merged, archive)
+            for path in exited:
+                _merge(merged, _read(path)['values'])
+            tmp = f'{archive_path}.tmp'
+            with open(tmp, 'w') as f:
+                json.dump({'values': [[n, list(l), v] for (n, l), v in merged.items()]}, f)
+            os.replace(tmp, archive_path)
+            for path in exited:
+                os.remove(path)
+    return totals
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Returns all metrics in the Prometheus text exposition format"""
+    totals = collect()
+    lines = []
+    for metric in registry.metrics.values():
+        series = sorted((labels, value) for (name, labels), value in totals.items() if name == metric.name)
+        kind = 'histogram' if isinstance(metric, Histogram) else 'counter'
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {kind}')
+        for labels, value in series:
+            if kind == 'counter':
+                lines.append(f'{metric.name}{_labels(metric.labelnames, labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + (float('inf'),), value[:-2]):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                bucket_labels = _labels(metric.labelnames, labels, f'le="{le}"')
+                lines.append(f'{metric.name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{metric.name}_sum{_labels(metric.labelnames, labels)} {_number(value[-2])}')
+            lines.append(f'{metric.name}_count{_labels(metric.labelnames, labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """Removes every metrics file (run before the workers start)"""
+    if not os.path.isdir(METRICS_DIR):
+        return
+    for filename in os.listdir(METRICS_DIR):
+        if filename.endswith(('.json', '.tmp')):
+            os.remove(os.path.join(METRICS_DIR, filename))
+
+
+if __name__ == '__main__':
+    import sys
+
+    if '--reset' in sys.argv:
+        reset()
+        print(f"🧹 Metrics reset ({METRICS_DIR})")
+    else:
+        sys.stdout.write(render())
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Versioned database schema migrations.
+
+Migrations are applied in order and recorded in the `schema_migrations`
+table, so each one runs exactly once per database. Every step is written to
+be idempotent as well, which keeps databases created by the old init_db()
+(or seed_db.py) safe to migrate.
+
+Run once per deploy, before starting gunicorn:
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # list applied / pending migrations
+
+Migrations marked `transactional=False` run in autocommit mode; that is
+required for CREATE INDEX CONCURRENTLY, which builds indexes without
+blocking writes to the table.
+"""
+
+import argparse
+import sys
+
+from psycopg2 import extensions
+
+from db_pool import connect
+
+# Arbitrary constant: serializes concurrent `migrations.py` runs
+ADVISORY_LOCK_ID = 724_801_553
+
+
+class Migration:
+    """One schema change: an ordered list of SQL statements"""
+
+    def __init__(self, version, name, statements, transactional=True):
+        self.version = version
+        self.name = name
+        self.statements = statements
+        self.transactional = transactional
+
+
+class ConcurrentIndex:
+    """CREATE INDEX CONCURRENTLY that recovers from an earlier failed build"""
+
+    def __init__(self, name, definition):
+        self.name = name
+        self.definition = definition
+
+    def apply(self, cur):
+        # A failed concurrent build leaves an INVALID index behind that
+        # IF NOT EXISTS would silently accept; drop it and build again
+        cur.execute(
+            '''SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid
+               WHERE c.relname = %s AND pg_catalog.pg_table_is_visible(c.oid)''',
+            (self.name,)
+        )
+        row = cur.fetchone()
+        if row and row['indisvalid']:
+            return
+        if row:
+            cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {self.name}')
+        cur.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.name} ON {self.definition}')
+
+
+MIGRATIONS = [
+    Migration(1, 'initial schema', [
+        '''
+        CREATE TABLE IF NOT EXISTS products (
+            id VARCHAR PRIMARY KEY DEFAULT gen_random_uuid(),
+            name TEXT NOT NULL,
+            description TEXT,
+            price INTEGER NOT NULL,
+            images TEXT[] NOT NULL,
+            category_id TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        ''',
+        # Databases created before created_at existed
+        'ALTER TABLE products ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ NOT NULL DEFAULT now()',
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id VARCHAR PRIMARY KEY DEFAULT gen_random_uuid(),
+            username TEXT,
+            password TEXT,
+            telegram_id BIGINT UNIQUE,
+            first_name TEXT,
+            last_name TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS favorites (
+            id VARCHAR PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id VARCHAR REFERENCES users(id) ON DELETE CASCADE,
+            product_id VARCHAR REFERENCES products(id) ON DELETE CASCADE,
+            UNIQUE(user_id, product_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS cart (
+            id VARCHAR PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id VARCHAR REFERENCES users(id) ON DELETE CASCADE,
+            product_id VARCHAR REFERENCES products(id) ON DELETE CASCADE,
+            quantity INTEGER NOT NULL DEFAULT 1,
+            UNIQUE(user_id, product_id)
+        )
+        ''',
+    ]),
+
+    Migration(2, 'catalog version and change notifications', [
+        # Single-row catalog version, used for ETag/Last-Modified on catalog endpoints
+        '''
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+            version BIGINT NOT NULL DEFAULT 1,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        ''',
+        'INSERT INTO catalog_version (id) VALUES (TRUE) ON CONFLICT (id) DO NOTHING',
+        # Bump the version and notify API workers (catalog cache) after every write to products
+        '''
+        CREATE OR REPLACE FUNCTION notify_products_changed() RETURNS trigger AS $$
+        BEGIN
+            UPDATE catalog_version SET version = version + 1, updated_at = now();
+            PERFORM pg_notify('products_changed', TG_OP);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        ''',
+        'DROP TRIGGER IF EXISTS products_changed ON products',
+        '''
+        CREATE TRIGGER products_changed
+        AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON products
+        FOR EACH STATEMENT EXECUTE FUNCTION notify_products_changed()
+        ''',
+    ]),
+
+    Migration(3, 'catalog and per-user lookup indexes', [
+        # Trigram operator classes for name search (ILIKE '%...%' can use a GIN trigram index)
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        # Keyset pagination for each sort order, with and without a category filter
+        ConcurrentIndex('products_created_at_id_idx', 'products (created_at, id)'),
+        ConcurrentIndex('products_price_id_idx', 'products (price, id)'),
+        ConcurrentIndex('products_category_created_at_id_idx', 'products (category_id, created_at, id)'),
+        ConcurrentIndex('products_category_price_id_idx', 'products (category_id, price, id)'),
+        ConcurrentIndex('products_name_trgm_idx', 'products USING gin (name gin_trgm_ops)'),
+        # cart/favorites lookups by user_id already use the UNIQUE (user_id, product_id)
+        # index; deleting a product cascades by product_id, which had no index
+        ConcurrentIndex('cart_product_id_idx', 'cart (product_id)'),
+        ConcurrentIndex('favorites_product_id_idx', 'favorites (product_id)'),
+    ], transactional=False),
+
+    Migration(4, 'product search indexes', [
+        # Typo-tolerant matching on description (name is covered by products_name_trgm_idx)
+        ConcurrentIndex('products_description_trgm_idx', 'products USING gin (description gin_trgm_ops)'),
+        # Full-text search; the expression must match catalog.SEARCH_DOCUMENT
+        ConcurrentIndex(
+            'products_search_fts_idx',
+            "products USING gin ((to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))))"
+        ),
+    ], transactional=False),
+
+    Migration(5, 'notification outbox', [
+        # Written in the same transaction as the order, delivered by notification_dispatcher.py
+        '''
+        CREATE TABLE IF NOT EXISTS notification_outbox (
+            id BIGSERIAL PRIMARY KEY,
+            kind TEXT NOT NULL,
+            payload JSONB NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sent', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            last_error TEXT,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            sent_at TIMESTAMPTZ
+        )
+        ''',
+        # The dispatcher only ever scans due pending rows; sent ones drop out of the index
+        '''
+        CREATE INDEX IF NOT EXISTS notification_outbox_pending_idx
+        ON notification_outbox (next_attempt_at, id) WHERE status = 'pending'
+        ''',
+    ]),
+
+    Migration(6, 'orders', [
+        # Orders keep a snapshot of name/price, so later catalog edits do not rewrite history
+        '''
+        CREATE TABLE IF NOT EXISTS orders (
+            id BIGSERIAL PRIMARY KEY,
+            user_id VARCHAR REFERENCES users(id) ON DELETE SET NULL,
+            status TEXT NOT NULL DEFAULT 'new',
+            total BIGINT NOT NULL,
+            items_count INTEGER NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS order_items (
+            id BIGSERIAL PRIMARY KEY,
+            order_id BIGINT NOT NULL REFERENCES orders(id) ON DELETE CASCADE,
+            product_id VARCHAR REFERENCES products(id) ON DELETE SET NULL,
+            name TEXT NOT NULL,
+            image TEXT,
+            price INTEGER NOT NULL,
+            quantity INTEGER NOT NULL CHECK (quantity > 0)
+        )
+        ''',
+        # Order history per user (newest first), items per order, and product deletes
+        'CREATE INDEX IF NOT EXISTS orders_user_id_id_idx ON orders (user_id, id)',
+        'CREATE INDEX IF NOT EXISTS order_items_order_id_idx ON order_items (order_id)',
+        'CREATE INDEX IF NOT EXISTS order_items_product_id_idx ON order_items (product_id)',
+    ]),
+    Migration(7, 'responsive image variants', [
+        # Resized WebP/JPEG copies per image, aligned with images (see image_variants.py)
+        "ALTER TABLE products ADD COLUMN IF NOT EXISTS image_variants JSONB NOT NULL DEFAULT '[]'::jsonb",
+    ]),
+]
+
+
+def _ensure_migrations_table(cur):
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    ''')
+
+
+def _applied_versions(cur):
+    cur.execute('SELECT version FROM schema_migrations')
+    return {row['version'] for row in cur.fetchall()}
+
+
+def _apply(conn, migration):
+    cur = conn.cursor()
+    if migration.transactional:
+        conn.autocommit = False
+    for statement in migration.statements:
+        if isinstance(statement, ConcurrentIndex):
+            statement.apply(cur)
+        else:
+            cur.execute(statement)
+    cur.execute(
+        'INSERT INTO schema_migrations (version, name) VALUES (%s, %s)',
+        (migration.version, migration.name)
+    )
+    if migration.transactional:
+        conn.commit()
+        conn.autocommit = True
+    cur.close()
+
+
+def migrate(verbose=True):
+    """
+    Applies every pending migration in version order
+
+    Returns:
+        list: Versions applied by this run
+    """
+    conn = connect()
+    conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    cur = conn.cursor()
+    applied_now = []
+    try:
+        cur.execute('SELECT pg_advisory_lock(%s)', (ADVISORY_LOCK_ID,))
+        _ensure_migrations_table(cur)
+        applied = _applied_versions(cur)
+        for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+            if migration.version in applied:
+                continue
+            if verbose:
+                print(f"⏳ Applying migration {migration.version}: {migration.name}")
+            try:
+                _apply(conn, migration)
+            except Exception:
+                if not conn.autocommit:
+                    conn.rollback()
+                    conn.autocommit = True
+                raise
+            applied_now.append(migration.version)
+        if verbose:
+            print(f"✅ Database schema is up to date ({len(applied_now)} migration(s) applied)")
+        return applied_now
+    finally:
+        try:
+            cur.execute('SELECT pg_advisory_unlock(%s)', (ADVISORY_LOCK_ID,))
+        finally:
+            cur.close()
+            conn.close()
+
+
+def status():
+    """Prints applied and pending migrations"""
+    conn = connect()
+    conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+    cur = conn.cursor()
+    try:
+        _ensure_migrations_table(cur)
+        cur.execute('SELECT version, applied_at FROM schema_migrations')
+        applied = {row['version']: row['applied_at'] for row in cur.fetchall()}
+    finally:
+        cur.close()
+        conn.close()
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        when = applied.get(migration.version)
+        state = f"applied {when:%Y-%m-%d %H:%M}" if when else 'pending'
+        print(f"{migration.version:>4}  {migration.name:<50} {state}")
+
+
+def main():
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    parser = argparse.ArgumentParser(description='Apply database schema migrations')
+    parser.add_argument('--status', action='store_true', help='show applied and pending migrations')
+    args = parser.parse_args()
+
+    if args.status:
+        status()
+        return 0
+    try:
+        migrate()
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
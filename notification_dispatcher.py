@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Delivers queued notifications from the `notification_outbox` table.
+
+Runs as its own process next to gunicorn:
+    python notification_dispatcher.py            # run until stopped
+    python notification_dispatcher.py --once     # deliver everything due, then exit
+    python notification_dispatcher.py --status   # outbox counters
+
+Each row is claimed with SELECT ... FOR UPDATE SKIP LOCKED and marked sent in
+the same transaction, so several dispatchers can run side by side without
+sending a row twice. Delivery is at-least-once: if the process dies after
+Telegram accepted a message but before the commit, it is sent again.
+
+Failed deliveries are retried with exponential backoff (honoring Telegram's
+retry_after); after NOTIFY_MAX_ATTEMPTS, or on a permanent error, the row is
+marked 'failed' and kept for inspection. The dispatcher sleeps on
+LISTEN notification_outbox and also polls, so a lost NOTIFY only delays
+delivery by NOTIFY_POLL_INTERVAL.
+
+Settings (environment variables):
+    NOTIFY_MAX_ATTEMPTS    attempts before a row is marked failed (default 10)
+    NOTIFY_RETRY_BASE      first retry delay in seconds (default 5)
+    NOTIFY_RETRY_MAX       longest retry delay in seconds (default 900)
+    NOTIFY_POLL_INTERVAL   longest sleep between outbox scans (default 30)
+"""
+
+import argparse
+import os
+import random
+import select
+import signal
+import sys
+import time
+
+from psycopg2 import extensions
+
+import notifications
+from db_pool import connect
+
+MAX_ATTEMPTS = int(os.getenv('NOTIFY_MAX_ATTEMPTS', '10'))
+RETRY_BASE = float(os.getenv('NOTIFY_RETRY_BASE', '5'))
+RETRY_MAX = float(os.getenv('NOTIFY_RETRY_MAX', '900'))
+POLL_INTERVAL = float(os.getenv('NOTIFY_POLL_INTERVAL', '30'))
+
+
+def retry_delay(attempts, retry_after=None):
+    """Seconds to wait before the next attempt, with ±20% jitter"""
+    delay = min(RETRY_BASE * 2 ** (attempts - 1), RETRY_MAX) * random.uniform(0.8, 1.2)
+    if retry_after:
+        delay = max(delay, float(retry_after))
+    return delay
+
+
+def dispatch_one(conn):
+    """
+    Claims and delivers one due notification
+
+    Returns:
+        bool: True if a row was processed (delivered or not), False if none was due
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute('''
+            SELECT id, kind, payload, attempts FROM notification_outbox
+            WHERE status = 'pending' AND next_attempt_at <= now()
+            ORDER BY next_attempt_at, id
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        ''')
+        row = cur.fetchone()
+        if row is None:
+            conn.rollback()
+            return False
+
+        attempts = row['attempts'] + 1
+        try:
+            notifications.deliver(row['kind'], row['payload'], cur)
+        except notifications.DeliveryError as e:
+            if not e.retryable or attempts >= MAX_ATTEMPTS:
+                print(f"❌ Notification {row['id']} failed permanently after {attempts} attempt(s): {e}")
+                cur.execute(
+                    "UPDATE notification_outbox SET status = 'failed', attempts = %s, last_error = %s WHERE id = %s",
+                    (attempts, str(e), row['id'])
+                )
+            else:
+                delay = retry_delay(attempts, e.retry_after)
+                print(f"⚠️ Notification {row['id']} attempt {attempts} failed, retrying in {delay:.0f}s: {e}")
+                cur.execute(
+                    '''UPDATE notification_outbox
+                       SET attempts = %s, last_error = %s, next_attempt_at = now() + %s * interval '1 second'
+                       WHERE id = %s''',
+                    (attempts, str(e), delay, row['id'])
+                )
+        else:
+            print(f"✅ Notification {row['id']} sent")
+            cur.execute(
+                "UPDATE notification_outbox SET status = 'sent', attempts = %s, last_error = NULL, sent_at = now() WHERE id = %s",
+                (attempts, row['id'])
+            )
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def dispatch_due(conn):
+    """Delivers every notification that is due; returns how many were processed"""
+    processed = 0
+    while dispatch_one(conn):
+        processed += 1
+    return processed
+
+
+def seconds_until_next(conn):
+    """Seconds until the earliest pending retry, capped at POLL_INTERVAL"""
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT EXTRACT(EPOCH FROM min(next_attempt_at) - now()) AS wait
+        FROM notification_outbox WHERE status = 'pending'
+    ''')
+    wait = cur.fetchone()['wait']
+    cur.close()
+    conn.rollback()
+    if wait is None:
+        return POLL_INTERVAL
+    return min(max(float(wait), 0.0), POLL_INTERVAL)
+
+
+def run():
+    """Main loop; returns on SIGTERM/SIGINT"""
+    stopping = []
+
+    def stop(signum, frame):
+        print("🛑 Stopping notification dispatcher...")
+        stopping.append(signum)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    retry_delay_s = 1
+    while not stopping:
+        listen_conn = work_conn = None
+        try:
+            listen_conn = connect()
+            listen_conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            listen_cur = listen_conn.cursor()
+            listen_cur.execute(f'LISTEN {notifications.CHANNEL}')
+            work_conn = connect()
+            print(f"🚀 Notification dispatcher listening on '{notifications.CHANNEL}'")
+            retry_delay_s = 1
+
+            while not stopping:
+                dispatch_due(work_conn)
+                wait = seconds_until_next(work_conn)
+                if wait > 0:
+                    try:
+                        select.select([listen_conn], [], [], wait)
+                    except InterruptedError:
+                        pass
+                listen_conn.poll()
+                listen_conn.notifies.clear()
+        except Exception as e:
+            if stopping:
+                break
+            print(f"⚠️ Notification dispatcher error: {e}")
+        finally:
+            for conn in (listen_conn, work_conn):
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+        if not stopping:
+            time.sleep(retry_delay_s)
+            retry_delay_s = min(retry_delay_s * 2, 60)
+
+
+def status():
+    """Prints outbox counters by status"""
+    conn = connect()
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT status, COUNT(*) AS count, min(created_at) AS oldest
+        FROM notification_outbox GROUP BY status ORDER BY status
+    ''')
+    rows = cur.fetchall()
+    cur.close()
+    conn.close()
+    if not rows:
+        print("Outbox is empty")
+    for row in rows:
+        print(f"{row['status']:<10}{row['count']:>8}   oldest {row['oldest']:%Y-%m-%d %H:%M}")
+
+
+def main():
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    parser = argparse.ArgumentParser(description='Deliver queued order notifications')
+    parser.add_argument('--once', action='store_true', help='deliver everything that is due, then exit')
+    parser.add_argument('--status', action='store_true', help='show outbox counters')
+    args = parser.parse_args()
+
+    if args.status:
+        status()
+        return 0
+    if args.once:
+        conn = connect()
+        try:
+            print(f"✅ Processed {dispatch_due(conn)} notification(s)")
+        finally:
+            conn.close()
+        return 0
+    run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
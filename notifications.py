@@ -0,0 +1,219 @@
+"""
+Order notifications for the shop owner's Telegram chat.
+
+Notifications are not sent from the request that creates an order. The
+checkout statement (orders.py) writes an `order_created` row to
+`notification_outbox` inside the same transaction: the notification exists
+if and only if the order was committed. The separate
+notification_dispatcher.py process renders and delivers pending rows with
+retries.
+
+Settings (environment variables):
+    TELEGRAM_BOT_TOKEN  bot that sends the notifications
+    TELEGRAM_CHAT_ID    chat (or user) that receives them
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+import requests
+
+import metrics
+
+# LISTEN/NOTIFY channel that wakes the dispatcher when a row is enqueued
+CHANNEL = 'notification_outbox'
+
+# payload: {'text': ..., 'parse_mode': ...}
+KIND_TELEGRAM_MESSAGE = 'telegram_message'
+# payload: {'order_id': ...}; the message is built from the orders table when sent
+KIND_ORDER_CREATED = 'order_created'
+
+SEND_TIMEOUT = 10
+
+
+class DeliveryError(Exception):
+    """
+    Raised when a notification could not be delivered
+
+    Attributes:
+        retryable (bool): False if sending the same payload again cannot succeed
+        retry_after (int | None): Seconds the API asked us to wait (HTTP 429)
+    """
+
+    def __init__(self, message, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+def escape_html(text):
+    """Escapes text for Telegram's HTML parse mode"""
+    if text is None:
+        return ''
+    return str(text).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def format_order_message(user_info, cart_items, total, order_time=None, order_id=None):
+    """
+    Builds the HTML message about a new order
+
+    Parameters:
+        user_info (dict): Row from the users table
+        cart_items (list): Items with name, price and quantity
+        total (int): Order total
+        order_time (datetime): When the order was placed (default: now)
+        order_id (int): Order number, if the order is stored
+
+    Returns:
+        str: Message text for parse_mode=HTML
+    """
+    # Format the order message with detailed information
+    first_name = user_info.get('first_name', '')
+    last_name = user_info.get('last_name', '')
+    username = user_info.get('username', '')
+    telegram_id = user_info.get('telegram_id')
+    user_id = user_info.get('id', '')
+
+    # Build full name
+    full_name = f"{first_name or ''} {last_name or ''}".strip()
+    if not full_name:
+        full_name = username or 'Неизвестный'
+
+    # Calculate order details
+    total_items = sum(item['quantity'] for item in cart_items)
+    order_time = (order_time or datetime.now()).strftime('%d.%m.%Y в %H:%M')
+
+    # Start building message with HTML formatting
+    message = "🔔 <b>НОВЫЙ ЗАКАЗ</b>\n"
+    if order_id is not None:
+        message += f"Номер заказа: <b>#{order_id}</b>\n"
+    message += "========================\n\n"
+
+    # User information section
+    message += "👤 <b>ИНФОРМАЦИЯ О КЛИЕНТЕ</b>\n"
+    message += f"ФИО: <b>{escape_html(full_name)}</b>\n"
+
+    if username:
+        message += f"Username: @{escape_html(username)}\n"
+
+    if telegram_id:
+        message += f"Telegram ID: {telegram_id}\n"
+
+    message += f"ID пользователя: {escape_html(user_id)}\n"
+    message += f"Дата заказа: {order_time}\n\n"
+
+    # Order details section
+    message += "📦 <b>ДЕТАЛИ ЗАКАЗА</b>\n"
+    message += f"Всего позиций: {len(cart_items)} шт.\n"
+    message += f"Общее количество: {total_items} ед.\n\n"
+
+    # Items list
+    message += "🛒 <b>СОСТАВ ЗАКАЗА</b>\n"
+    for idx, item in enumerate(cart_items, 1):
+        item_name = escape_html(item['name'])
+        item_quantity = item['quantity']
+        item_price = item['price']
+        item_total = item_price * item_quantity
+
+        message += f"{idx}. <b>{item_name}</b>\n"
+        message += f"   Цена: {item_price:,} сум x {item_quantity} шт.\n"
+        message += f"   Сумма: <b>{item_total:,} сум</b>\n\n"
+
+    # Total section
+    message += "========================\n"
+    message += f"💰 <b>ИТОГО К ОПЛАТЕ: {total:,} сум</b>\n"
+    message += "========================"
+    return message
+
+
+def enqueue(cur, kind, payload):
+    """
+    Adds a notification to the outbox using the caller's transaction
+
+    Nothing is sent until the caller commits; a rollback discards it.
+
+    Returns:
+        int: Outbox row id
+    """
+    cur.execute(
+        'INSERT INTO notification_outbox (kind, payload) VALUES (%s, %s) RETURNING id',
+        (kind, json.dumps(payload, ensure_ascii=False))
+    )
+    outbox_id = cur.fetchone()['id']
+    # Delivered to listeners on commit
+    cur.execute('SELECT pg_notify(%s, %s)', (CHANNEL, str(outbox_id)))
+    return outbox_id
+
+
+def send_telegram_message(text, parse_mode='HTML', chat_id=None):
+    """
+    Sends a message through the Telegram Bot API
+
+    Raises:
+        DeliveryError: On any failure; `retryable` tells whether to try again
+    """
+    bot_token = os.getenv('TELEGRAM_BOT_TOKEN')
+    chat_id = chat_id or os.getenv('TELEGRAM_CHAT_ID')
+    if not bot_token or not chat_id:
+        # Retried, so notifications survive until the credentials are configured
+        raise DeliveryError('Telegram credentials not configured')
+
+    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+    payload = {'chat_id': chat_id, 'text': text, 'parse_mode': parse_mode}
+    start = time.perf_counter()
+    try:
+        response = requests.post(url, json=payload, timeout=SEND_TIMEOUT)
+    except requests.RequestException as e:
+        metrics.TELEGRAM_LATENCY.observe(time.perf_counter() - start, method='sendMessage', status='error')
+        raise DeliveryError(f'Telegram request failed: {e}')
+    metrics.TELEGRAM_LATENCY.observe(time.perf_counter() - start, method='sendMessage', status=response.status_code)
+
+    if response.status_code == 200:
+        return
+    retry_after = None
+    try:
+        retry_after = response.json().get('parameters', {}).get('retry_after')
+    except ValueError:
+        pass
+    # 429 and 5xx are temporary; other 4xx (bad chat id, malformed HTML) will not fix themselves
+    retryable = response.status_code == 429 or response.status_code >= 500
+    raise DeliveryError(
+        f'Telegram API error (status {response.status_code}): {response.text[:500]}',
+        retryable=retryable,
+        retry_after=retry_after,
+    )
+
+
+def format_stored_order(order):
+    """Builds the message for an order loaded by orders.get_order()"""
+    created_at = order['created_at']
+    if created_at.tzinfo is not None:
+        # Shown in the server's local time, like orders placed before the outbox
+        created_at = created_at.astimezone()
+    return format_order_message(order['customer'] or {}, order['items'], order['total'],
+                                order_time=created_at, order_id=order['id'])
+
+
+def deliver(kind, payload, cur=None):
+    """
+    Delivers one outbox payload
+
+    Parameters:
+        cur: Database cursor, needed for kinds that load data (order_created)
+
+    Raises:
+        DeliveryError: On failure
+    """
+    if kind == KIND_TELEGRAM_MESSAGE:
+        send_telegram_message(payload['text'], payload.get('parse_mode', 'HTML'), payload.get('chat_id'))
+        return
+    if kind == KIND_ORDER_CREATED:
+        import orders  # orders.py imports this module
+        order = orders.get_order(cur, payload['order_id'])
+        if order is None:
+            raise DeliveryError(f"Order {payload['order_id']} not found", retryable=False)
+        send_telegram_message(format_stored_order(order))
+        return
+    raise DeliveryError(f'Unknown notification kind: {kind}', retryable=False)
@@ -0,0 +1,143 @@
+"""
+Server-side checkout and order history.
+
+checkout() turns a user's cart into an order with one SQL statement: the
+cart rows are joined with products and locked, the order and its items are
+inserted with name/price snapshots and a total computed by Postgres, the
+checked-out cart rows are deleted and the owner's notification is queued in
+`notification_outbox` (see notifications.py). The caller only commits.
+
+Item prices and the total always come from the products table; whatever a
+client sends as items/total is ignored.
+"""
+
+import notifications
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Items of one order as a JSON array, in the order they were inserted
+_ITEMS_JSON = '''
+    COALESCE((
+        SELECT json_agg(json_build_object(
+            'product_id', oi.product_id, 'name', oi.name, 'image', oi.image,
+            'price', oi.price, 'quantity', oi.quantity
+        ) ORDER BY oi.id)
+        FROM order_items oi WHERE oi.order_id = o.id
+    ), '[]'::json)
+'''
+
+CHECKOUT_SQL = '''
+    WITH cart_rows AS (
+        -- FOR UPDATE: a concurrent checkout of the same cart waits here and then
+        -- finds the rows gone, so one cart can never become two orders
+        SELECT c.id AS cart_id, c.product_id, c.quantity, p.name, p.price, p.images[1] AS image
+        FROM cart c JOIN products p ON p.id = c.product_id
+        WHERE c.user_id = %(user_id)s AND c.quantity > 0
+        FOR UPDATE OF c
+    ),
+    new_order AS (
+        INSERT INTO orders (user_id, total, items_count)
+        SELECT %(user_id)s, SUM(price::bigint * quantity), SUM(quantity)
+        FROM cart_rows
+        HAVING COUNT(*) > 0
+        RETURNING *
+    ),
+    new_items AS (
+        INSERT INTO order_items (order_id, product_id, name, image, price, quantity)
+        SELECT o.id, r.product_id, r.name, r.image, r.price, r.quantity
+        FROM new_order o CROSS JOIN cart_rows r
+        ORDER BY r.name
+        RETURNING *
+    ),
+    cleared AS (
+        -- Only the rows that went into the order; items added meanwhile stay in the cart
+        DELETE FROM cart
+        WHERE id IN (SELECT cart_id FROM cart_rows) AND EXISTS (SELECT 1 FROM new_order)
+    ),
+    outbox AS (
+        INSERT INTO notification_outbox (kind, payload)
+        SELECT %(kind)s, json_build_object('order_id', id) FROM new_order
+        RETURNING id
+    )
+    SELECT o.*,
+           (SELECT json_agg(json_build_object(
+                'product_id', i.product_id, 'name', i.name, 'image', i.image,
+                'price', i.price, 'quantity', i.quantity
+            ) ORDER BY i.id) FROM new_items i) AS items
+    -- Wakes notification_dispatcher.py once the transaction commits
+    FROM new_order o, (SELECT pg_notify(%(channel)s, id::text) FROM outbox) AS notified
+'''
+
+
+def checkout(cur, user_id):
+    """
+    Creates an order from the user's cart (the caller commits)
+
+    Parameters:
+        cur: Cursor of an open transaction
+        user_id (str): User whose cart is checked out
+
+    Returns:
+        dict | None: The order with its `items`, or None if the cart is empty
+    """
+    cur.execute(CHECKOUT_SQL, checkout_params(user_id))
+    return cur.fetchone()
+
+
+def checkout_params(user_id):
+    """Parameters for CHECKOUT_SQL"""
+    return {
+        'user_id': user_id,
+        'kind': notifications.KIND_ORDER_CREATED,
+        'channel': notifications.CHANNEL,
+    }
+
+
+def list_orders(cur, user_id, limit=DEFAULT_LIMIT, before=None):
+    """
+    Returns a user's orders with items, newest first
+
+    Parameters:
+        limit (int): Page size
+        before (int): Only orders with a smaller id (id of the last order of the previous page)
+    """
+    cur.execute(*build_list_query(user_id, limit, before))
+    return cur.fetchall()
+
+
+def build_list_query(user_id, limit=DEFAULT_LIMIT, before=None):
+    """Builds the SELECT used by list_orders; returns (sql, params)"""
+    params = [user_id]
+    condition = ''
+    if before is not None:
+        condition = 'AND o.id < %s'
+        params.append(before)
+    params.append(limit)
+    sql = f'''
+        SELECT o.*, {_ITEMS_JSON} AS items
+        FROM orders o
+        WHERE o.user_id = %s {condition}
+        ORDER BY o.id DESC
+        LIMIT %s
+    '''
+    return sql, params
+
+
+def get_order(cur, order_id):
+    """
+    Returns one order with items and the customer
+
+    Returns:
+        dict | None: Order columns plus `items` and `customer` (dict or None)
+    """
+    cur.execute(f'''
+        SELECT o.*, {_ITEMS_JSON} AS items,
+               CASE WHEN u.id IS NOT NULL THEN json_build_object(
+                   'id', u.id, 'telegram_id', u.telegram_id, 'username', u.username,
+                   'first_name', u.first_name, 'last_name', u.last_name
+               ) END AS customer
+        FROM orders o LEFT JOIN users u ON u.id = o.user_id
+        WHERE o.id = %s
+    ''', (order_id,))
+    return cur.fetchone()
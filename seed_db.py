@@ -1,6 +1,7 @@
 import psycopg2
 from psycopg2.extras import RealDictCursor
 import os
+from migrations import migrate
 
 def seed_database():
     # Debug: print all environment variables starting with PG or DATABASE
@@ -37,51 +38,10 @@ def seed_database():
         )
     cur = conn.cursor()
     
-    # Create tables if they don't exist
-    # Note: Categories are now stored in config/settings.json, not in database
-    
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS products (
-            id VARCHAR PRIMARY KEY DEFAULT gen_random_uuid(),
-            name TEXT NOT NULL,
-            description TEXT,
-            price INTEGER NOT NULL,
-            images TEXT[] NOT NULL,
-            category_id TEXT
-        )
-    ''')
-    
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id VARCHAR PRIMARY KEY DEFAULT gen_random_uuid(),
-            telegram_id BIGINT UNIQUE,
-            username TEXT,
-            first_name TEXT,
-            last_name TEXT,
-            password TEXT
-        )
-    ''')
+    migrate()
     
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS favorites (
-            id VARCHAR PRIMARY KEY DEFAULT gen_random_uuid(),
-            user_id VARCHAR REFERENCES users(id) ON DELETE CASCADE,
-            product_id VARCHAR REFERENCES products(id) ON DELETE CASCADE,
-            UNIQUE(user_id, product_id)
-        )
-    ''')
-    
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS cart (
-            id VARCHAR PRIMARY KEY DEFAULT gen_random_uuid(),
-            user_id VARCHAR REFERENCES users(id) ON DELETE CASCADE,
-            product_id VARCHAR REFERENCES products(id) ON DELETE CASCADE,
-            quantity INTEGER NOT NULL DEFAULT 1,
-            UNIQUE(user_id, product_id)
-        )
-    ''')
-    
-    conn.commit()
+    # Tables are created by the versioned migrations (see migrations.py)
+    # Note: Categories are now stored in config/settings.json, not in database
     
     # Categories are now stored in config/settings.json
     # Load category IDs from config
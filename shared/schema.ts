@@ -1,5 +1,5 @@
 import { sql } from "drizzle-orm";
-import { pgTable, text, varchar, bigint, integer, unique } from "drizzle-orm/pg-core";
+import { pgTable, text, varchar, bigint, bigserial, integer, jsonb, timestamp, unique } from "drizzle-orm/pg-core";
 import { createInsertSchema } from "drizzle-zod";
 import { z } from "zod";
 
@@ -26,7 +26,10 @@ export const products = pgTable("products", {
   description: text("description"),
   price: integer("price").notNull(),
   images: text("images").array().notNull(),
+  // Resized WebP/JPEG copies per image, aligned with images (see image_variants.py)
+  image_variants: jsonb("image_variants").notNull().default([]),
   category_id: text("category_id"), // Stores category ID from config (e.g., "category-1")
+  created_at: timestamp("created_at", { withTimezone: true }).notNull().defaultNow(),
 });
 
 export const favorites = pgTable("favorites", {
@@ -46,6 +49,26 @@ export const cart = pgTable("cart", {
   uniqueUserProduct: unique().on(table.user_id, table.product_id),
 }));
 
+// Orders snapshot product name/price at checkout (created by POST /api/orders)
+export const orders = pgTable("orders", {
+  id: bigserial("id", { mode: "number" }).primaryKey(),
+  user_id: varchar("user_id").references(() => users.id, { onDelete: "set null" }),
+  status: text("status").notNull().default("new"),
+  total: bigint("total", { mode: "number" }).notNull(),
+  items_count: integer("items_count").notNull(),
+  created_at: timestamp("created_at", { withTimezone: true }).notNull().defaultNow(),
+});
+
+export const orderItems = pgTable("order_items", {
+  id: bigserial("id", { mode: "number" }).primaryKey(),
+  order_id: bigint("order_id", { mode: "number" }).notNull().references(() => orders.id, { onDelete: "cascade" }),
+  product_id: varchar("product_id").references(() => products.id, { onDelete: "set null" }),
+  name: text("name").notNull(),
+  image: text("image"),
+  price: integer("price").notNull(),
+  quantity: integer("quantity").notNull(),
+});
+
 // Insert schemas
 export const insertUserSchema = createInsertSchema(users).pick({
   telegram_id: true,
@@ -85,3 +108,6 @@ export type Favorite = typeof favorites.$inferSelect;
 
 export type InsertCart = z.infer<typeof insertCartSchema>;
 export type Cart = typeof cart.$inferSelect;
+
+export type Order = typeof orders.$inferSelect;
+export type OrderItem = typeof orderItems.$inferSelect;
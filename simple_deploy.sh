@@ -146,6 +146,10 @@ PORT=$APP_PORT
 EOF
 chown "$APP_USER:$APP_USER" "$APP_DIR/.env"
 
+# Миграции базы данных
+echo "🗄  Применение миграций базы данных..."
+sudo -u "$APP_USER" bash -c "cd $APP_DIR && python3 migrations.py"
+
 # Создание systemd сервиса
 echo "🔧 Настройка systemd..."
 cat > /etc/systemd/system/shop-app.service <<EOF
@@ -168,6 +172,26 @@ RestartSec=3
 WantedBy=multi-user.target
 EOF
 
+# Доставка уведомлений о заказах (очередь notification_outbox)
+cat > /etc/systemd/system/shop-notifications.service <<EOF
+[Unit]
+Description=Telegram Shop order notification dispatcher
+After=network.target postgresql.service
+
+[Service]
+Type=simple
+User=$APP_USER
+WorkingDirectory=$APP_DIR
+Environment="PATH=/home/$APP_USER/.local/bin:/usr/bin"
+EnvironmentFile=$APP_DIR/.env
+ExecStart=/usr/bin/python3 notification_dispatcher.py
+Restart=always
+RestartSec=10
+
+[Install]
+WantedBy=multi-user.target
+EOF
+
 # Настройка Nginx
 echo "🌐 Настройка Nginx..."
 if [ ! -z "$DOMAIN" ]; then
@@ -200,7 +224,9 @@ systemctl restart nginx
 echo "🚀 Запуск приложения..."
 systemctl daemon-reload
 systemctl enable shop-app
+systemctl enable shop-notifications
 systemctl restart shop-app
+systemctl restart shop-notifications
 
 # Ожидание запуска
 sleep 3
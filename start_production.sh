@@ -1,7 +1,34 @@
 #!/bin/bash
 # Production start script for Render
-# Database tables are created automatically on startup by app.py
+# Database schema is migrated once per deploy, before the workers start
 # To seed sample data, run: python seed_db.py (manually, one time only)
 
+echo "Applying database migrations..."
+python migrations.py || exit 1
+
+# Metrics of the previous run (see metrics.py)
+python metrics.py --reset
+
+# Order notifications are delivered by a separate process (see notification_dispatcher.py).
+# There is no systemd here, so it runs in a restart loop: if it crashes,
+# checkout keeps queueing rows in notification_outbox and nothing is sent.
+# On a VPS use the shop-notifications systemd unit instead (docs/VPS_DEPLOY_GUIDE.md).
+supervise_dispatcher() {
+    while true; do
+        python notification_dispatcher.py
+        echo "⚠️ Notification dispatcher exited with code $?, restarting in 10s..."
+        sleep 10
+    done
+}
+
+echo "Starting notification dispatcher..."
+supervise_dispatcher &
+
+# SERVER_MODE=async serves the API from asgi.py (requires requirements-async.txt)
+if [ "$SERVER_MODE" = "async" ]; then
+    echo "Starting production server with Uvicorn (async mode)..."
+    exec uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers ${WEB_CONCURRENCY:-2}
+fi
+
 echo "Starting production server with Gunicorn..."
 gunicorn app:app --bind 0.0.0.0:$PORT --workers 4 --timeout 120
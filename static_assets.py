@@ -0,0 +1,215 @@
+"""
+In-memory static files for the built SPA (dist/public).
+
+At startup each worker indexes every file of the Vite build once: bytes,
+content type, ETag, Last-Modified and gzip/brotli copies for text-like
+files. After that a request is a dict lookup, with no os.path.exists() or
+open() per request, and unknown SPA routes get the cached index.html.
+
+Cache policy:
+    assets/<name>-<hash>.<ext>  Vite output with a content hash in the name:
+                                `public, max-age=31536000, immutable`
+    everything else             `no-cache` (revalidated with the ETag),
+                                so a deploy is picked up on the next open
+
+Compressed copies are read from `<file>.br` / `<file>.gz` next to the
+original when they are at least as new (written at build time by
+`python static_assets.py --precompress`, see build.sh) and computed at
+load time otherwise.
+
+Settings (environment variables):
+    STATIC_MAX_FILE_SIZE  files larger than this many bytes are not kept in
+                          memory and are sent from disk (default 20971520)
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+
+import compression
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dist', 'public')
+MAX_FILE_SIZE = int(os.getenv('STATIC_MAX_FILE_SIZE', str(20 * 1024 * 1024)))
+
+INDEX = 'index.html'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+# Vite's default `assets/[name]-[hash].[ext]`
+FINGERPRINTED = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+# Missing files under these prefixes are 404s, not SPA routes
+ASSET_PREFIXES = ('assets/',)
+
+# Sibling files holding pre-compressed copies
+SIBLING_SUFFIX = {'br': '.br', 'gzip': '.gz'}
+
+# Load-time compression when no sibling exists (brotli 11 is left to the build step)
+RUNTIME_BROTLI_LEVEL = 9
+BUILD_BROTLI_LEVEL = 11
+
+
+class Asset:
+    """One static file"""
+
+    def __init__(self, path, rel_path, st, body):
+        self.path = path
+        self.body = body  # None: too large, sent from disk
+        self.last_modified = datetime.fromtimestamp(st.st_mtime, timezone.utc)
+        mimetype = mimetypes.guess_type(rel_path)[0] or 'application/octet-stream'
+        if mimetype.startswith('text/') or mimetype in ('application/javascript', 'image/svg+xml'):
+            mimetype += '; charset=utf-8'
+        self.content_type = mimetype
+        self.cache_control = IMMUTABLE if FINGERPRINTED.match(rel_path) else REVALIDATE
+        if body is not None:
+            digest = hashlib.sha1(body).hexdigest()[:16]
+        else:
+            digest = f'{st.st_mtime_ns:x}-{st.st_size:x}'
+        self.etag = 'a-' + digest
+        self.compressed = {}
+
+    def add_compressed(self, encoding, data):
+        # Not worth a Vary split unless it actually saves bytes
+        if len(data) < len(self.body) * 0.95:
+            self.compressed[encoding] = data
+
+
+def is_compressible(rel_path, size):
+    mimetype = mimetypes.guess_type(rel_path)[0] or ''
+    return size >= compression.MIN_SIZE and mimetype.startswith(compression.COMPRESSIBLE_TYPES)
+
+
+def _read_sibling(path, st, encoding):
+    sibling = path + SIBLING_SUFFIX[encoding]
+    try:
+        if os.stat(sibling).st_mtime_ns >= st.st_mtime_ns:
+            with open(sibling, 'rb') as f:
+                return f.read()
+    except OSError:
+        pass
+    return None
+
+
+def _is_sibling(rel_path, names):
+    for suffix in SIBLING_SUFFIX.values():
+        if rel_path.endswith(suffix) and rel_path[:-len(suffix)] in names:
+            return True
+    return False
+
+
+class StaticAssets:
+    """Index of a build directory, loaded once"""
+
+    def __init__(self, root=STATIC_DIR, max_file_size=MAX_FILE_SIZE):
+        self.root = root
+        self.max_file_size = max_file_size
+        # Re-entrant: the lazy first load in _index() runs load() under the lock
+        self._lock = threading.RLock()
+        self._assets = None
+
+    def load(self):
+        """(Re)indexes the directory; returns the number of files"""
+        assets = {}
+        if os.path.isdir(self.root):
+            paths = {}
+            for dirpath, _, filenames in os.walk(self.root):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    paths[os.path.relpath(path, self.root).replace(os.sep, '/')] = path
+            for rel_path, path in paths.items():
+                if _is_sibling(rel_path, paths):
+                    continue
+                assets[rel_path] = self._load_file(rel_path, path)
+        else:
+            print(f"⚠️ Static directory not found: {self.root} (run npm run build)")
+        with self._lock:
+            self._assets = assets
+        return len(assets)
+
+    def _load_file(self, rel_path, path):
+        st = os.stat(path)
+        if st.st_size > self.max_file_size:
+            return Asset(path, rel_path, st, None)
+        with open(path, 'rb') as f:
+            body = f.read()
+        asset = Asset(path, rel_path, st, body)
+        if is_compressible(rel_path, len(body)):
+            for encoding in compression.available_encodings():
+                data = _read_sibling(path, st, encoding)
+                if data is None:
+                    data = compression.compress(body, encoding, gzip_level=9, brotli_level=RUNTIME_BROTLI_LEVEL)
+                asset.add_compressed(encoding, data)
+        return asset
+
+    def _index(self):
+        if self._assets is None:
+            with self._lock:
+                if self._assets is None:
+                    self.load()
+        return self._assets
+
+    def lookup(self, path):
+        """
+        Resolves a request path without touching the filesystem
+
+        Returns:
+            Asset | None: The file, index.html for SPA routes, or None (404)
+        """
+        assets = self._index()
+        asset = assets.get(path.lstrip('/')) if path else None
+        if asset is not None:
+            return asset
+        if path.startswith(ASSET_PREFIXES):
+            return None
+        return assets.get(INDEX)
+
+    def stats(self):
+        assets = self._index()
+        return {
+            'files': len(assets),
+            'bytes': sum(len(a.body) for a in assets.values() if a.body is not None),
+            'compressed_bytes': sum(len(d) for a in assets.values() for d in a.compressed.values()),
+        }
+
+
+static_files = StaticAssets()
+
+
+def precompress(root=STATIC_DIR):
+    """Writes .gz and .br copies of compressible files (build step)"""
+    written = 0
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(tuple(SIBLING_SUFFIX.values())):
+                continue
+            path = os.path.join(dirpath, filename)
+            with open(path, 'rb') as f:
+                body = f.read()
+            if not is_compressible(filename, len(body)):
+                continue
+            variants = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                variants['br'] = brotli.compress(body, quality=BUILD_BROTLI_LEVEL)
+            for encoding, data in variants.items():
+                with open(path + SIBLING_SUFFIX[encoding], 'wb') as f:
+                    f.write(data)
+                written += 1
+    return written
+
+
+if __name__ == '__main__':
+    if '--precompress' in sys.argv:
+        count = precompress(sys.argv[2] if len(sys.argv) > 2 else STATIC_DIR)
+        print(f"✅ Wrote {count} pre-compressed file(s)")
+    else:
+        count = static_files.load()
+        print(f"{count} file(s): {static_files.stats()}")
@@ -4,28 +4,71 @@ Telegram бот для управления товарами в магазине
 """
 
 import os
+import base64
+import html
 import json
+import math
+import secrets
 import telebot
-from telebot import types
+from telebot import apihelper, types
 import cloudinary
-import cloudinary.uploader
 import requests
-from io import BytesIO
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
 import time
+import uuid
 from typing import Dict, Any, List, Optional, cast
 
 load_dotenv()
+from image_variants import get_storage, store_photo
+from webhook import UpdateDispatcher, WebhookServer
 from db_operations import (
     add_product, 
     delete_product, 
-    get_all_products,
+    get_products_page,
     get_product_by_id,
     get_categories_from_config,
     find_products_by_name
 )
 
+# Загрузка фото: размер пула потоков и ожидание остальных фото альбома (media group)
+UPLOAD_WORKERS = int(os.getenv('UPLOAD_WORKERS', '4'))
+MEDIA_GROUP_WAIT = float(os.getenv('MEDIA_GROUP_WAIT', '1.0'))
+MAX_PHOTOS = 9
+DOWNLOAD_TIMEOUT = 60
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Файл скачивается во временный файл, в памяти держится не больше этого размера
+SPOOL_MAX_SIZE = 1024 * 1024
+# Не чаще одного редактирования статуса в секунду (лимиты Telegram)
+PROGRESS_INTERVAL = 1.0
+
+# Списки товаров в боте: размер страницы (список / меню удаления)
+LIST_PAGE_SIZE = 20
+DELETE_PAGE_SIZE = 10
+# Telegram ограничивает callback_data 64 байтами
+CALLBACK_DATA_LIMIT = 64
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+# Режим получения обновлений: polling (по умолчанию) или webhook (см. webhook.py)
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '127.0.0.1')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '4'))
+
+# Адрес Bot API; другой адрес - для локального тестового сервера
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org').rstrip('/')
+if TELEGRAM_API_URL != 'https://api.telegram.org':
+    apihelper.API_URL = TELEGRAM_API_URL + '/bot{0}/{1}'
+    apihelper.FILE_URL = TELEGRAM_API_URL + '/file/bot{0}/{1}'
+
 
 class ProductBot:
     """Класс для управления Telegram ботом товаров"""
@@ -42,8 +85,15 @@ class ProductBot:
         self.user_states = {}  # Хранение состояний пользователей
         self.temp_data = {}    # Временные данные для создания товаров
         
-        # Настройка Cloudinary
+        # Пул загрузки фото: обработчики не ждут скачивания и загрузки
+        self.upload_pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix='photo-upload')
+        self._upload_lock = threading.Lock()
+        self._media_groups = {}     # (user_id, media_group_id) -> [message, ...]
+        self._pending_uploads = {}  # user_id -> фото в процессе загрузки
+        
+        # Настройка Cloudinary и хранилища фото (IMAGE_STORAGE=local для тестов)
         self._setup_cloudinary()
+        self.storage = get_storage()
         
         # Регистрация обработчиков
         self._register_handlers()
@@ -60,37 +110,153 @@ class ProductBot:
         except Exception as e:
             print(f"⚠️ Ошибка настройки Cloudinary: {e}")
     
-    def _upload_photo_to_cloudinary(self, file_id):
+    def _upload_photo(self, file_id):
         """
-        Загружает фото из Telegram в Cloudinary
+        Загружает фото из Telegram в хранилище вместе с уменьшенными копиями
+        
+        Выполняется в пуле upload_pool. Файл скачивается потоком во
+        временный файл (SpooledTemporaryFile) и из него же загружается,
+        без копии всего файла в памяти.
         
         Args:
             file_id (str): Telegram file ID
             
         Returns:
-            str: URL загруженного изображения или None при ошибке
+            tuple: (URL оригинала, список вариантов для image_variants)
+                или (None, None) при ошибке
         """
         try:
             # Получаем информацию о файле
             file_info = self.bot.get_file(file_id)
-            file_url = f"https://api.telegram.org/file/bot{self.bot.token}/{file_info.file_path}"
-            
-            # Скачиваем файл
-            response = requests.get(file_url)
-            if response.status_code != 200:
-                print(f"❌ Ошибка скачивания фото: {response.status_code}")
-                return None
-            
-            # Загружаем в Cloudinary
-            upload_result = cloudinary.uploader.upload(
-                BytesIO(response.content),
-                folder="telegram_shop_products"
+            file_url = f"{TELEGRAM_API_URL}/file/bot{self.bot.token}/{file_info.file_path}"
+            
+            with requests.get(file_url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                if response.status_code != 200:
+                    print(f"❌ Ошибка скачивания фото: {response.status_code}")
+                    return None, None
+                with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as photo:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        photo.write(chunk)
+                    # Оригинал и варианты 200/400/800 px в WebP и JPEG
+                    return store_photo(photo, self.storage)
+        except Exception as e:
+            print(f"❌ Ошибка загрузки фото: {e}")
+            return None, None
+    
+    def _collect_media_group(self, message):
+        """
+        Собирает фото одного альбома: Telegram присылает их отдельными сообщениями
+        
+        Первое фото альбома запускает таймер; когда он срабатывает, все
+        полученные фото загружаются одной пачкой.
+        """
+        key = (message.from_user.id, message.media_group_id)
+        with self._upload_lock:
+            group = self._media_groups.get(key)
+            if group is None:
+                group = self._media_groups[key] = []
+                timer = threading.Timer(MEDIA_GROUP_WAIT, self._flush_media_group, (key,))
+                timer.daemon = True
+                timer.start()
+            group.append(message)
+    
+    def _flush_media_group(self, key):
+        with self._upload_lock:
+            messages = self._media_groups.pop(key, [])
+        if messages:
+            # Порядок фото в альбоме = порядок message_id
+            messages.sort(key=lambda m: m.message_id)
+            self._start_upload_batch(messages[0].chat.id, key[0], messages)
+    
+    def _has_pending_uploads(self, user_id):
+        """True, пока фото пользователя загружаются или альбом еще собирается"""
+        with self._upload_lock:
+            return bool(self._pending_uploads.get(user_id)) or any(
+                key[0] == user_id for key in self._media_groups
             )
-            
-            return upload_result.get('secure_url')
+    
+    def _start_upload_batch(self, chat_id, user_id, messages):
+        """
+        Ставит загрузку пачки фото в пул и возвращается сразу
+        
+        Args:
+            chat_id (int): Чат для статусного сообщения
+            user_id (int): Пользователь, добавляющий товар
+            messages (list): Сообщения с фото в нужном порядке
+        """
+        user_temp = self.temp_data.get(user_id)
+        if not user_temp or self.user_states.get(user_id) != "awaiting_images":
+            return
+        
+        with self._upload_lock:
+            pending = self._pending_uploads.get(user_id, 0)
+            free = MAX_PHOTOS - len(user_temp['images']) - pending
+            accepted = messages[:max(free, 0)]
+            if accepted:
+                self._pending_uploads[user_id] = pending + len(accepted)
+        skipped = len(messages) - len(accepted)
+        
+        if not accepted:
+            self.bot.send_message(
+                chat_id,
+                f"⚠️ Достигнут лимит в {MAX_PHOTOS} фотографий.\n"
+                "Нажмите '✅ Готово' чтобы завершить добавление товара."
+            )
+            return
+        
+        status_msg = self.bot.send_message(chat_id, f"⏳ Загружаю фото 0/{len(accepted)}...")
+        # Самое большое фото из каждого сообщения
+        futures = [self.upload_pool.submit(self._upload_photo, m.photo[-1].file_id) for m in accepted]
+        threading.Thread(
+            target=self._finish_upload_batch,
+            args=(chat_id, user_id, user_temp, status_msg, futures, skipped),
+            daemon=True
+        ).start()
+    
+    def _edit_status(self, chat_id, status_msg, text):
+        try:
+            self.bot.edit_message_text(text, chat_id, status_msg.message_id)
         except Exception as e:
-            print(f"❌ Ошибка загрузки в Cloudinary: {e}")
-            return None
+            print(f"⚠️ Не удалось обновить статус загрузки: {e}")
+    
+    def _finish_upload_batch(self, chat_id, user_id, user_temp, status_msg, futures, skipped):
+        """Показывает прогресс в одном сообщении и добавляет фото в порядке отправки"""
+        total = len(futures)
+        last_edit = time.monotonic()
+        for done, _ in enumerate(as_completed(futures), 1):
+            if done < total and time.monotonic() - last_edit >= PROGRESS_INTERVAL:
+                self._edit_status(chat_id, status_msg, f"⏳ Загружаю фото {done}/{total}...")
+                last_edit = time.monotonic()
+        results = [future.result() for future in futures]
+        
+        with self._upload_lock:
+            self._pending_uploads[user_id] = self._pending_uploads.get(user_id, 0) - total
+            if self._pending_uploads[user_id] <= 0:
+                del self._pending_uploads[user_id]
+            # Могли нажать "Отмена" (или начать новый товар), пока фото загружались
+            active = self.temp_data.get(user_id) is user_temp and self.user_states.get(user_id) == "awaiting_images"
+            if active:
+                for photo_url, variants in results:
+                    if photo_url:
+                        user_temp['images'].append(photo_url)
+                        user_temp['image_variants'].append(variants)
+        
+        if not active:
+            try:
+                self.bot.delete_message(chat_id, status_msg.message_id)
+            except Exception:
+                pass
+            return
+        
+        uploaded = sum(1 for photo_url, _ in results if photo_url)
+        lines = [f"✅ Загружено фото: {uploaded}/{total}"]
+        if uploaded < total:
+            lines.append(f"❌ Не удалось загрузить: {total - uploaded}. Попробуйте отправить их еще раз.")
+        if skipped:
+            lines.append(f"⚠️ Пропущено {skipped}: лимит {MAX_PHOTOS} фотографий.")
+        lines.append(f"\n📸 Всего фото: {len(user_temp['images'])}/{MAX_PHOTOS}")
+        lines.append("Отправьте еще фото или нажмите '✅ Готово'")
+        self._edit_status(chat_id, status_msg, "\n".join(lines))
     
     def _load_authorized_users(self):
         """Загружает список авторизованных пользователей из settingsbot.json"""
@@ -129,6 +295,142 @@ class ProductBot:
         markup.add(btn_list, btn_categories)
         return markup
     
+    def _page_callback(self, kind, category_index, page, direction=None, row=None):
+        """
+        Строит callback_data кнопки страницы
+        
+        Формат: "<kind>:<категория>:<страница>[:<n|p>:<created_at>:<id>]",
+        kind - lp (список) или dp (удаление), категория - индекс в
+        settingsbot.json или пусто для всех, created_at - микросекунды в hex,
+        id - "u" + 16 байт UUID в base64 или "s" + id как есть.
+        
+        Если курсор не помещается в 64 байта, кнопка листает по номеру
+        страницы (OFFSET) - медленнее, но страница остается доступной.
+        
+        Returns:
+            str: callback_data
+        """
+        data = f"{kind}:{'' if category_index is None else category_index}:{page}"
+        if row is None:
+            return data
+        micros = (row['created_at'] - _EPOCH) // _MICROSECOND
+        keyset = f"{data}:{direction[0]}:{micros:x}:{self._encode_id(row['id'])}"
+        if len(keyset.encode('utf-8')) > CALLBACK_DATA_LIMIT:
+            return data
+        return keyset
+    
+    @staticmethod
+    def _encode_id(product_id):
+        """UUID -> 22 символа base64, остальные id без изменений"""
+        try:
+            if str(uuid.UUID(product_id)) == product_id:
+                return 'u' + base64.urlsafe_b64encode(uuid.UUID(product_id).bytes).decode('ascii').rstrip('=')
+        except ValueError:
+            pass
+        return 's' + product_id
+    
+    @staticmethod
+    def _decode_id(encoded):
+        if encoded.startswith('u'):
+            return str(uuid.UUID(bytes=base64.urlsafe_b64decode(encoded[1:] + '==')))
+        if encoded.startswith('s'):
+            return encoded[1:]
+        raise ValueError('Unknown id encoding')
+    
+    def _parse_page_callback(self, data):
+        """
+        Разбирает callback_data из _page_callback
+        
+        Returns:
+            tuple: (kind, индекс категории или None, страница, направление, курсор или None)
+        
+        Raises:
+            ValueError: Если данные повреждены
+        """
+        parts = data.split(':', 5)
+        kind, category, page = parts[0], parts[1], int(parts[2])
+        category_index = int(category) if category else None
+        if len(parts) == 6:
+            direction = {'n': 'next', 'p': 'prev'}[parts[3]]
+            micros, product_id = parts[4], self._decode_id(parts[5])
+            cursor = (_EPOCH + int(micros, 16) * _MICROSECOND, product_id)
+            return kind, category_index, max(page, 1), direction, cursor
+        return kind, category_index, max(page, 1), 'next', None
+    
+    def _render_products_page(self, kind, category_index=None, page=1, direction='next', cursor=None):
+        """
+        Формирует страницу списка товаров (lp) или меню удаления (dp)
+        
+        Читает из БД только одну страницу (LIMIT + курсор, без курсора -
+        OFFSET по номеру страницы) и количество товаров за одно подключение.
+        
+        Returns:
+            tuple: (текст в HTML, InlineKeyboardMarkup)
+        """
+        size = LIST_PAGE_SIZE if kind == 'lp' else DELETE_PAGE_SIZE
+        categories = get_categories_from_config()
+        if category_index is not None and not 0 <= category_index < len(categories):
+            category_index = None
+        category = categories[category_index] if category_index is not None else None
+        category_id = category['id'] if category else None
+        
+        offset = 0 if cursor else (page - 1) * size
+        products, has_more, total = get_products_page(category_id, cursor, direction, size, offset)
+        if cursor and direction == 'prev' and not has_more:
+            # Перед этой страницей ничего нет (например, товары удалили)
+            page = 1
+        if (cursor or page > 1) and not products:
+            # Курсор или номер страницы устарели: начинаем с первой страницы
+            page, direction = 1, 'next'
+            products, has_more, total = get_products_page(category_id, None, direction, size)
+        pages = max(math.ceil(total / size), 1)
+        
+        scope = html.escape(category['name']) if category else "все категории"
+        title = "📋 <b>Список товаров</b>" if kind == 'lp' else "🗑 <b>Выберите товар для удаления:</b>"
+        text = f"{title}\n📁 {scope} · всего: {total}"
+        if products:
+            text += f" · стр. {min(page, pages)}/{pages}"
+        text += "\n\n"
+        
+        markup = types.InlineKeyboardMarkup(row_width=1)
+        if not products:
+            text += "📭 Товаров пока нет."
+        elif kind == 'lp':
+            first = (page - 1) * size + 1
+            for idx, p in enumerate(products, first):
+                text += f"{idx}. <b>{html.escape(p['name'])}</b>\n"
+                text += f"   💰 Цена: {p['price']:,} сум\n"
+                text += f"   🆔 ID: <code>{p['id']}</code>\n\n"
+        else:
+            for p in products:
+                markup.add(types.InlineKeyboardButton(
+                    f"🗑 {p['name']} - {p['price']:,} сум", callback_data=f"delete_{p['id']}"
+                ))
+        
+        # Навигация: назад / вперед от первой / последней строки страницы
+        nav = []
+        if products and page > 1:
+            data = self._page_callback(kind, category_index, page - 1, 'prev', products[0])
+            nav.append(types.InlineKeyboardButton("◀️ Назад", callback_data=data))
+        if products and (has_more if direction == 'next' else True):
+            data = self._page_callback(kind, category_index, page + 1, 'next', products[-1])
+            nav.append(types.InlineKeyboardButton("Вперед ▶️", callback_data=data))
+        if nav:
+            markup.row(*nav)
+        
+        # Фильтр по категориям
+        buttons = [types.InlineKeyboardButton(
+            ("• " if category_index is None else "") + "Все", callback_data=self._page_callback(kind, None, 1)
+        )]
+        for index, cat in enumerate(categories):
+            mark = "• " if index == category_index else ""
+            buttons.append(types.InlineKeyboardButton(
+                f"{mark}{cat['name']}", callback_data=self._page_callback(kind, index, 1)
+            ))
+        for i in range(0, len(buttons), 3):
+            markup.row(*buttons[i:i + 3])
+        return text, markup
+    
     def _register_handlers(self):
         """Регистрирует все обработчики команд и сообщений"""
         
@@ -178,32 +480,9 @@ class ProductBot:
                 self.bot.send_message(message.chat.id, "❌ Доступ запрещен")
                 return
             
-            # Получаем все товары
-            products = get_all_products()
-            
-            if not products:
-                self.bot.send_message(
-                    message.chat.id,
-                    "📭 Товаров пока нет в базе данных.",
-                    reply_markup=self._create_main_menu()
-                )
-                return
-            
-            # Создаем inline кнопки для каждого товара
-            markup = types.InlineKeyboardMarkup(row_width=1)
-            for product in products[:20]:  # Показываем первые 20
-                p = cast(Dict[str, Any], product)
-                btn_text = f"🗑 {p['name']} - {p['price']:,} сум"
-                callback_data = f"delete_{p['id']}"
-                markup.add(types.InlineKeyboardButton(btn_text, callback_data=callback_data))
-            
-            self.bot.send_message(
-                message.chat.id,
-                "🗑 <b>Выберите товар для удаления:</b>\n\n"
-                f"Всего товаров: {len(products)}",
-                parse_mode='HTML',
-                reply_markup=markup
-            )
+            # Первая страница; остальные - по кнопкам (handle_products_page)
+            text, markup = self._render_products_page('dp')
+            self.bot.send_message(message.chat.id, text, parse_mode='HTML', reply_markup=markup)
         
         @self.bot.message_handler(func=lambda message: message.text == "📋 Список товаров")
         def handle_list_products(message):
@@ -211,31 +490,35 @@ class ProductBot:
                 self.bot.send_message(message.chat.id, "❌ Доступ запрещен")
                 return
             
-            products = get_all_products()
-            
-            if not products:
-                self.bot.send_message(
-                    message.chat.id,
-                    "📭 Товаров пока нет в базе данных."
-                )
+            text, markup = self._render_products_page('lp')
+            self.bot.send_message(message.chat.id, text, parse_mode='HTML', reply_markup=markup)
+        
+        @self.bot.callback_query_handler(func=lambda call: call.data.startswith(('lp:', 'dp:')))
+        def handle_products_page(call):
+            """Листание списка товаров и меню удаления, выбор категории"""
+            if not self._is_authorized(call.from_user.id):
+                self.bot.answer_callback_query(call.id, "❌ Доступ запрещен")
                 return
             
-            response = f"📋 <b>Список товаров ({len(products)}):</b>\n\n"
-            
-            for idx, product in enumerate(products[:30], 1):  # Показываем первые 30
-                p = cast(Dict[str, Any], product)
-                response += f"{idx}. <b>{p['name']}</b>\n"
-                response += f"   💰 Цена: {p['price']:,} сум\n"
-                response += f"   🆔 ID: <code>{p['id']}</code>\n\n"
-            
-            if len(products) > 30:
-                response += f"\n... и еще {len(products) - 30} товаров"
+            try:
+                kind, category_index, page, direction, cursor = self._parse_page_callback(call.data)
+            except (ValueError, IndexError, KeyError):
+                self.bot.answer_callback_query(call.id, "❌ Устаревшая кнопка, откройте список заново")
+                return
             
-            self.bot.send_message(
-                message.chat.id,
-                response,
-                parse_mode='HTML'
-            )
+            text, markup = self._render_products_page(kind, category_index, page, direction, cursor)
+            try:
+                self.bot.edit_message_text(
+                    text,
+                    call.message.chat.id,
+                    call.message.message_id,
+                    parse_mode='HTML',
+                    reply_markup=markup
+                )
+            except Exception as e:
+                # Например, "message is not modified" при повторном нажатии
+                print(f"⚠️ Не удалось обновить страницу: {e}")
+            self.bot.answer_callback_query(call.id)
         
         @self.bot.message_handler(func=lambda message: message.text == "📁 Категории")
         def handle_categories(message):
@@ -326,61 +609,14 @@ class ProductBot:
             if user_state != "awaiting_images":
                 return
             
-            # Проверяем лимит фото (безопасно через .get())
-            user_temp = self.temp_data.get(user_id)
-            if not user_temp:
-                return
-            
-            current_images = user_temp.get('images', [])
-            if len(current_images) >= 9:
-                self.bot.send_message(
-                    message.chat.id,
-                    "⚠️ Достигнут лимит в 9 фотографий.\n"
-                    "Нажмите '✅ Готово' чтобы завершить добавление товара."
-                )
-                return
-            
-            # Получаем самое большое фото
-            photo = message.photo[-1]
-            
-            # Отправляем статус загрузки
-            status_msg = self.bot.send_message(
-                message.chat.id,
-                f"⏳ Загружаю фото {len(current_images) + 1}/9..."
-            )
-            
-            # Загружаем фото в Cloudinary
-            photo_url = self._upload_photo_to_cloudinary(photo.file_id)
-            
-            # Повторно проверяем состояние после загрузки
-            # (могли нажать "Готово" или "Отмена" пока фото загружалось)
-            user_temp_after = self.temp_data.get(user_id)
-            user_state_after = self.user_states.get(user_id)
-            
-            if not user_temp_after or user_state_after != "awaiting_images":
-                # Пользователь уже завершил процесс, игнорируем результат загрузки
-                try:
-                    self.bot.delete_message(message.chat.id, status_msg.message_id)
-                except:
-                    pass
+            if not self.temp_data.get(user_id):
                 return
             
-            if photo_url:
-                # Добавляем URL в список (безопасно, т.к. проверили выше)
-                user_temp_after['images'].append(photo_url)
-                
-                self.bot.edit_message_text(
-                    f"✅ Фото {len(user_temp_after['images'])}/9 загружено успешно!\n\n"
-                    f"Отправьте еще фото или нажмите '✅ Готово'",
-                    message.chat.id,
-                    status_msg.message_id
-                )
+            # Загрузка идет в пуле потоков; альбом загружается одной пачкой
+            if message.media_group_id:
+                self._collect_media_group(message)
             else:
-                self.bot.edit_message_text(
-                    "❌ Ошибка загрузки фото. Попробуйте еще раз.",
-                    message.chat.id,
-                    status_msg.message_id
-                )
+                self._start_upload_batch(message.chat.id, user_id, [message])
         
         # Обработчик состояний для добавления товара
         @self.bot.message_handler(func=lambda message: message.from_user.id in self.user_states)
@@ -456,6 +692,7 @@ class ProductBot:
                 
                 self.temp_data[user_id]['category_id'] = selected_category['id']
                 self.temp_data[user_id]['images'] = []  # Инициализируем список для фото
+                self.temp_data[user_id]['image_variants'] = []
                 self.user_states[user_id] = "awaiting_images"
                 
                 markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
@@ -466,17 +703,25 @@ class ProductBot:
                 self.bot.send_message(
                     message.chat.id,
                     "📸 Отправьте фотографии товара (до 9 штук).\n\n"
-                    "Отправляйте по одному фото.\n"
+                    "Можно отправить по одному фото или альбомом.\n"
                     "После загрузки всех фото нажмите '✅ Готово'\n\n"
                     "Или нажмите '⏭ Пропустить' чтобы добавить товар без изображений.",
                     reply_markup=markup
                 )
             
             elif state == "awaiting_images":
+                image_variants = []
                 if message.text == "⏭ Пропустить (без фото)":
                     images = ["https://via.placeholder.com/400x400?text=No+Image"]
                 elif message.text == "✅ Готово":
+                    if self._has_pending_uploads(user_id):
+                        self.bot.send_message(
+                            message.chat.id,
+                            "⏳ Фото еще загружаются. Нажмите '✅ Готово' после сообщения о загрузке."
+                        )
+                        return
                     images = self.temp_data[user_id].get('images', [])
+                    image_variants = self.temp_data[user_id].get('image_variants', [])
                     if not images:
                         images = ["https://via.placeholder.com/400x400?text=No+Image"]
                 else:
@@ -489,7 +734,8 @@ class ProductBot:
                     description=self.temp_data[user_id]['description'],
                     price=self.temp_data[user_id]['price'],
                     images=images,
-                    category_id=self.temp_data[user_id]['category_id']
+                    category_id=self.temp_data[user_id]['category_id'],
+                    image_variants=image_variants
                 )
                 
                 if product:
@@ -518,7 +764,7 @@ class ProductBot:
                 del self.temp_data[user_id]
     
     def run(self):
-        """Запускает бота в режиме polling с автоматическим переподключением"""
+        """Запускает бота: webhook (BOT_MODE=webhook) или polling с автоматическим переподключением"""
         print("🤖 Бот запущен и готов к работе...")
         print(f"👥 Авторизованных пользователей: {len(self.authorized_users)}")
         if self.authorized_users:
@@ -527,6 +773,57 @@ class ProductBot:
             print("   ⚠️ ВНИМАНИЕ: Список авторизованных пользователей пуст!")
             print("   Добавьте Telegram ID в файл settingsbot.json")
         
+        if BOT_MODE == 'webhook':
+            try:
+                self.run_webhook()
+                return
+            except KeyboardInterrupt:
+                print("\n⛔ Бот остановлен пользователем")
+                return
+            except Exception as e:
+                print(f"❌ Webhook недоступен: {e}")
+                print("🔄 Переключаюсь на polling...")
+        
+        self.run_polling()
+    
+    def run_webhook(self):
+        """
+        Принимает обновления через webhook (блокирует поток)
+        
+        Raises:
+            Exception: Если WEBHOOK_URL не задан или setWebhook не удался
+        """
+        if not WEBHOOK_URL:
+            raise ValueError("WEBHOOK_URL не задан")
+        # Telegram допускает в секрете только A-Z, a-z, 0-9, _ и -
+        secret = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+        path = urlsplit(WEBHOOK_URL).path or '/'
+        
+        # Порядок обработки обеспечивает UpdateDispatcher (по чатам),
+        # поэтому обработчики выполняются прямо в его потоках
+        self.bot.threaded = False
+        dispatcher = UpdateDispatcher(self._process_raw_update, workers=WEBHOOK_WORKERS)
+        server = WebhookServer(dispatcher, secret, host=WEBHOOK_LISTEN, port=WEBHOOK_PORT, path=path)
+        try:
+            self.bot.set_webhook(url=WEBHOOK_URL, secret_token=secret)
+            print(f"🌐 Webhook: {WEBHOOK_URL} -> {server.address}")
+            server.serve_forever()
+        finally:
+            server.shutdown()
+            dispatcher.shutdown(wait=False)
+            self.bot.threaded = True
+    
+    def _process_raw_update(self, update):
+        self.bot.process_new_updates([types.Update.de_json(update)])
+    
+    def run_polling(self):
+        """Получает обновления через long polling с автоматическим переподключением"""
+        # При установленном webhook getUpdates возвращает 409
+        try:
+            self.bot.remove_webhook()
+        except Exception as e:
+            print(f"⚠️ Не удалось удалить webhook: {e}")
+        
         retry_delay = 5
         max_retry_delay = 60
         
@@ -546,7 +843,6 @@ class ProductBot:
                 print("\n⛔ Бот остановлен пользователем")
                 break
 
-
 def main():
     """Главная функция запуска бота"""
     # Получаем токен из переменных окружения
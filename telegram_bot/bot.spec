@@ -15,6 +15,8 @@ a = Analysis(
         'telebot.types',
         'cloudinary',
         'cloudinary.uploader',
+        'PIL.Image',
+        'PIL.ImageOps',
         'requests',
         'psycopg2',
         'psycopg2.extras',
@@ -1,11 +1,14 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import Optional, List, Dict, Any, cast
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple, cast
 import os
 import json
 from pathlib import Path
 from dotenv import load_dotenv
 import time
+from psycopg2.extras import Json
+from query_profiler import ProfiledCursor
+import catalog
 
 load_dotenv()
 
@@ -31,7 +34,7 @@ def get_db_connection(max_retries=3, retry_delay=2):
             if database_url:
                 if 'sslmode=' not in database_url:
                     database_url = database_url + ('&' if '?' in database_url else '?') + 'sslmode=require'
-                conn = psycopg2.connect(database_url, cursor_factory=RealDictCursor)
+                conn = psycopg2.connect(database_url, cursor_factory=ProfiledCursor)
             else:
                 conn = psycopg2.connect(
                     host=os.getenv('PGHOST'),
@@ -40,7 +43,7 @@ def get_db_connection(max_retries=3, retry_delay=2):
                     password=os.getenv('PGPASSWORD'),
                     database=os.getenv('PGDATABASE'),
                     sslmode='require',
-                    cursor_factory=RealDictCursor
+                    cursor_factory=ProfiledCursor
                 )
             print(f"✅ Подключение к БД успешно (попытка {attempt + 1})")
             return conn
@@ -74,7 +77,8 @@ def get_categories_from_config():
         return []
 
 
-def add_product(name: str, description: str, price: int, images: List[str], category_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+def add_product(name: str, description: str, price: int, images: List[str], category_id: Optional[str] = None,
+                image_variants: Optional[List[Any]] = None) -> Optional[Dict[str, Any]]:
     """
     Adds new product to database
     
@@ -84,6 +88,7 @@ def add_product(name: str, description: str, price: int, images: List[str], cate
         price (int): Product price in cents
         images (list): Array of image URLs
         category_id (str, optional): Category ID (must match category ID from config)
+        image_variants (list, optional): Resized copies per image (see image_variants.py)
     
     Returns:
         dict: Dictionary with created product data or None if error
@@ -95,8 +100,9 @@ def add_product(name: str, description: str, price: int, images: List[str], cate
             return None
         cur = conn.cursor()
         cur.execute(
-            'INSERT INTO products (name, description, price, images, category_id) VALUES (%s, %s, %s, %s, %s) RETURNING *',
-            (name, description, price, images, category_id)
+            'INSERT INTO products (name, description, price, images, image_variants, category_id) '
+            'VALUES (%s, %s, %s, %s, %s, %s) RETURNING *',
+            (name, description, price, images, Json(image_variants or []), category_id)
         )
         product = cur.fetchone()
         conn.commit()
@@ -172,6 +178,84 @@ def get_all_products(category_id: Optional[str] = None) -> List[Dict[str, Any]]:
         return []
 
 
+def get_products_page(category_id: Optional[str] = None, cursor: Optional[Tuple[datetime, str]] = None,
+                      direction: str = 'next', limit: int = 10,
+                      offset: int = 0) -> Tuple[List[Dict[str, Any]], bool, int]:
+    """
+    Gets one page of products, newest first, with a keyset cursor
+    
+    Only `limit + 1` rows are read (the extra one tells whether more exist),
+    using the (created_at, id) / (category_id, created_at, id) indexes.
+    The total count is read over the same connection.
+    
+    Parameters:
+        category_id (str, optional): Category ID for filtering
+        cursor (tuple, optional): (created_at, id) of the row to page from
+        direction (str): 'next' = rows after the cursor (older),
+            'prev' = rows before it (newer)
+        limit (int): Page size
+        offset (int): Rows to skip when there is no cursor (fallback paging)
+    
+    Returns:
+        tuple: (products with id, name, price, category_id, created_at;
+            True if more rows exist in that direction; total number of products)
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        if not conn:
+            return [], False, 0
+        conditions = []
+        params: List[Any] = []
+        if category_id:
+            conditions.append('category_id = %s')
+            params.append(category_id)
+        count_where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        count_params = list(params)
+        backwards = direction == 'prev'
+        if cursor:
+            conditions.append(f"(created_at, id) {'>' if backwards else '<'} (%s, %s)")
+            params.extend(cursor)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        order = 'ASC' if backwards else 'DESC'
+        params.extend([limit + 1, 0 if cursor else max(offset, 0)])
+        cur = conn.cursor()
+        cur.execute(
+            f'SELECT id, name, price, category_id, created_at FROM products {where} '
+            f'ORDER BY created_at {order}, id {order} LIMIT %s OFFSET %s',
+            params
+        )
+        products = cur.fetchall()
+        cur.execute(f'SELECT count(*) AS total FROM products {count_where}', count_params)
+        total = cur.fetchone()['total']
+        cur.close()
+        conn.close()
+        has_more = len(products) > limit
+        products = products[:limit]
+        if backwards:
+            products.reverse()
+        return cast(List[Dict[str, Any]], products), has_more, total
+    except Exception as e:
+        print(f"Error getting products page: {e}")
+        if conn:
+            conn.close()
+        return [], False, 0
+        cur = conn.cursor()
+        if category_id:
+            cur.execute('SELECT count(*) AS total FROM products WHERE category_id = %s', (category_id,))
+        else:
+            cur.execute('SELECT count(*) AS total FROM products')
+        total = cur.fetchone()['total']
+        cur.close()
+        conn.close()
+        return total
+    except Exception as e:
+        print(f"Error counting products: {e}")
+        if conn:
+            conn.close()
+        return 0
+
+
 def get_product_by_id(product_id: str) -> Optional[Dict[str, Any]]:
     """
     Gets product by ID
@@ -200,27 +284,35 @@ def get_product_by_id(product_id: str) -> Optional[Dict[str, Any]]:
         return None
 
 
-def find_products_by_name(name: str) -> List[Dict[str, Any]]:
+def find_products_by_name(name: str, limit: int = 20, cursor: Optional[str] = None) -> List[Dict[str, Any]]:
     """
-    Searches products by name (partial match)
+    Searches products by name and description, best matches first
+    
+    Uses the same scoring and score/id keyset cursor as the web catalog
+    (see catalog.py), so both rank results identically.
     
     Parameters:
-        name (str): Product name or part of name
+        name (str): Search text
+        limit (int): Page size, at most catalog.MAX_LIMIT
+        cursor (str, optional): `next_cursor` of the previous page
     
     Returns:
-        list: Array of product dictionaries or empty array
+        list: Array of product dictionaries (with `score`) or empty array
     """
     conn = None
     try:
+        if not name.strip():
+            return []
+        filters = catalog.parse_query({'q': name, 'sort': catalog.RELEVANCE, 'limit': limit, 'cursor': cursor,
+                                       'fields': 'admin'})
         conn = get_db_connection()
         if not conn:
             return []
         cur = conn.cursor()
-        cur.execute('SELECT * FROM products WHERE name ILIKE %s', (f'%{name}%',))
-        products = cur.fetchall()
+        page = catalog.fetch_page(cur, filters)
         cur.close()
         conn.close()
-        return cast(List[Dict[str, Any]], products)
+        return cast(List[Dict[str, Any]], page['items'])
     except Exception as e:
         print(f"Error searching products: {e}")
         if conn:
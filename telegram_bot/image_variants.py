@@ -0,0 +1,190 @@
+"""
+Responsive image variants for product photos, generated at upload time.
+
+Every photo the admin bot receives is stored as is, plus resized copies
+bounded by width (200/400/800 px by default) in WebP and JPEG. Nothing is
+ever upscaled: widths above the original collapse into one variant of the
+original width. The variants of a product are kept in
+`products.image_variants`, aligned with `products.images`:
+
+    [                                   # one entry per image
+        [                               # ascending width
+            {"width": 200, "webp": "https://...", "jpeg": "https://..."},
+            {"width": 400, "webp": "https://...", "jpeg": "https://..."},
+            ...
+        ],
+        ...
+    ]
+
+so `image_variants[0][0]` is the smallest variant of the first image (the
+`thumbnail` of product lists, see catalog.thumbnail).
+
+Storage backends:
+    cloudinary  uploads to Cloudinary (configured by the bot as before)
+    local       writes files under IMAGE_LOCAL_DIR; stands in for Cloudinary
+                in tests and local development
+
+Pillow is needed for the variants; without it (or for a file it cannot
+decode) only the original is stored and the variant list is empty.
+
+Photos may be passed as bytes or as a seekable binary file (e.g. a
+SpooledTemporaryFile the download was streamed into), which storage
+backends copy in chunks instead of holding another whole copy in memory.
+
+This file is also used by telegram_bot/ (kept identical).
+
+Settings (environment variables):
+    IMAGE_STORAGE          cloudinary | local (default cloudinary)
+    IMAGE_LOCAL_DIR        directory of the local backend (default ./uploads)
+    IMAGE_LOCAL_URL        public URL of that directory (default its file:// URL)
+    IMAGE_FOLDER           folder / key prefix of stored files (default telegram_shop_products)
+    IMAGE_VARIANT_WIDTHS   comma-separated widths in px (default 200,400,800)
+    IMAGE_VARIANT_QUALITY  WebP/JPEG quality, 1..95 (default 80)
+"""
+
+import os
+import shutil
+import uuid
+from io import BytesIO
+from pathlib import Path
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # optional dependency
+    Image = None
+
+WIDTHS = tuple(sorted(int(w) for w in os.getenv('IMAGE_VARIANT_WIDTHS', '200,400,800').split(',') if w.strip()))
+QUALITY = int(os.getenv('IMAGE_VARIANT_QUALITY', '80'))
+FOLDER = os.getenv('IMAGE_FOLDER', 'telegram_shop_products')
+
+# format -> (Pillow format, file extension, content type)
+FORMATS = {
+    'webp': ('WEBP', 'webp', 'image/webp'),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+}
+
+
+def _as_file(data):
+    """Returns a binary file positioned at the start of data (bytes or a seekable file)"""
+    if isinstance(data, (bytes, bytearray)):
+        return BytesIO(data)
+    data.seek(0)
+    return data
+
+
+def make_variants(data, widths=WIDTHS, quality=QUALITY):
+    """
+    Resizes an image to every width in every format
+
+    Parameters:
+        data (bytes | file): Original image (any format Pillow can read)
+        widths (tuple): Target widths in px, ascending
+        quality (int): Encoder quality
+
+    Returns:
+        list: (width, format, bytes) tuples in ascending width, or [] without Pillow
+
+    Raises:
+        OSError: If Pillow cannot decode the image
+    """
+    if Image is None:
+        return []
+    with Image.open(_as_file(data)) as original:
+        # Phone photos are often rotated through EXIF only
+        image = ImageOps.exif_transpose(original)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+
+        variants = []
+        done = set()
+        for width in widths:
+            width = min(width, image.width)
+            if width in done:
+                continue
+            done.add(width)
+            height = max(round(image.height * width / image.width), 1)
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for name, (pil_format, _, _) in FORMATS.items():
+                buffer = BytesIO()
+                resized.save(buffer, pil_format, quality=quality, optimize=True)
+                variants.append((width, name, buffer.getvalue()))
+        return variants
+
+
+class LocalStorage:
+    """Files in a local directory (tests, development)"""
+
+    def __init__(self, root=None, base_url=None):
+        self.root = Path(root or os.getenv('IMAGE_LOCAL_DIR', 'uploads')).resolve()
+        self.base_url = (base_url or os.getenv('IMAGE_LOCAL_URL') or self.root.as_uri()).rstrip('/')
+
+    def save(self, data, key, content_type):
+        """Writes data (bytes or a file) under key; returns its URL"""
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(_as_file(data), f)
+        return f'{self.base_url}/{key}'
+
+
+class CloudinaryStorage:
+    """Cloudinary uploads (cloudinary.config() must have been called)"""
+
+    def save(self, data, key, content_type):
+        """Uploads data under a public id derived from key; returns its URL"""
+        import cloudinary.uploader
+
+        # Cloudinary ignores the extension in public ids, so the WebP and JPEG
+        # variants of one width would overwrite each other: keep it in the id
+        stem, extension = key.rsplit('.', 1)
+        result = cloudinary.uploader.upload(_as_file(data), public_id=f'{stem}_{extension}', format=extension,
+                                            overwrite=True)
+        return result.get('secure_url')
+
+
+def get_storage(name=None):
+    """
+    Returns the backend selected by IMAGE_STORAGE
+
+    Raises:
+        ValueError: For an unknown backend name
+    """
+    name = (name or os.getenv('IMAGE_STORAGE', 'cloudinary')).lower()
+    if name == 'local':
+        return LocalStorage()
+    if name == 'cloudinary':
+        return CloudinaryStorage()
+    raise ValueError(f'Unknown IMAGE_STORAGE: {name}')
+
+
+def store_photo(data, storage, name=None):
+    """
+    Stores an original photo and its variants
+
+    Parameters:
+        data (bytes | file): Original photo (Telegram sends JPEG)
+        storage: LocalStorage or CloudinaryStorage
+        name (str, optional): Base file name, random by default
+
+    Returns:
+        tuple: (original URL, list of variants for image_variants)
+    """
+    name = name or uuid.uuid4().hex
+    url = storage.save(data, f'{FOLDER}/{name}.jpg', 'image/jpeg')
+    try:
+        encoded = make_variants(data)
+    except Exception as e:
+        print(f"⚠️ Could not build image variants: {e}")
+        encoded = []
+
+    by_width = {}
+    for width, fmt, body in encoded:
+        _, extension, content_type = FORMATS[fmt]
+        variant_url = storage.save(body, f'{FOLDER}/{name}_w{width}.{extension}', content_type)
+        by_width.setdefault(width, {'width': width})[fmt] = variant_url
+    return url, [by_width[width] for width in sorted(by_width)]
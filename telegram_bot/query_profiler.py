@@ -0,0 +1,269 @@
+"""
+Slow-query log and SQL fingerprint profiler.
+
+ProfiledCursor (a RealDictCursor) times every execute() and executemany();
+ProfiledAsyncCursor does the same for the psycopg 3 pool of asgi.py.
+Statements slower than SLOW_QUERY_MS are printed with their duration, row
+count and caller; a sampled fraction of slow read-only statements is re-run
+with EXPLAIN (ANALYZE, BUFFERS) and the plan is printed too.
+
+With QUERY_PROFILE=1 every statement is also aggregated by fingerprint
+(the SQL with literals and parameters replaced by `?`, so
+`WHERE id = %s` for any id is one entry): calls, total/mean/max time,
+rows and the callers that issued it. top() returns the heaviest
+fingerprints by total time; the report is printed at exit and served by
+GET /api/debug/queries (per worker process).
+
+The caller is the Flask route (`GET /api/products`) inside a request,
+otherwise the first function outside the database plumbing
+(`db_operations.get_all_products`, `asgi.get_products`). Statements of
+the async pool are never re-run with EXPLAIN.
+
+This file is also used by telegram_bot/ (kept identical).
+
+Settings (environment variables):
+    SLOW_QUERY_MS              log statements slower than this, -1 disables (default 500)
+    SLOW_QUERY_EXPLAIN_SAMPLE  fraction of slow SELECTs to EXPLAIN ANALYZE, 0..1 (default 0)
+    QUERY_PROFILE              1 = aggregate fingerprints (default 0)
+    QUERY_PROFILE_TOP          fingerprints in the exit report (default 20)
+"""
+
+import atexit
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+from psycopg2 import extensions
+from psycopg2.extras import RealDictCursor
+
+try:
+    from psycopg import AsyncCursor
+except ImportError:  # optional dependency (asgi.py)
+    AsyncCursor = None
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '500'))
+EXPLAIN_SAMPLE = float(os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE', '0'))
+PROFILE_ENABLED = os.getenv('QUERY_PROFILE', '0') == '1'
+REPORT_TOP = int(os.getenv('QUERY_PROFILE_TOP', '20'))
+
+# Keeps memory bounded if callers build SQL with inlined values
+MAX_FINGERPRINTS = 2000
+OTHER_FINGERPRINT = '<other>'
+
+# Modules skipped when looking for the calling function
+_PLUMBING = ('query_profiler', 'db_pool', 'psycopg', 'contextlib', 'asyncio')
+
+_COMMENT = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r'%\(\w+\)s|%s')
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+def query_text(sql, context=None):
+    """
+    Returns a query as str: bytes are decoded, psycopg2.sql.Composed and
+    friends (unhashable) are rendered with as_string(context)
+
+    Parameters:
+        sql: Query as passed to cursor.execute()
+        context: Connection or cursor used to render composed queries
+    """
+    if isinstance(sql, str):
+        return sql
+    if isinstance(sql, bytes):
+        return sql.decode('utf-8', 'replace')
+    if context is not None and hasattr(sql, 'as_string'):
+        return sql.as_string(context)
+    return str(sql)
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """
+    Normalizes a statement so that executions differing only in values match
+
+    Parameters:
+        sql (str): Query text (see query_text)
+
+    Example:
+        "SELECT * FROM products\\n WHERE id = %s LIMIT 20" -> "SELECT * FROM products WHERE id = ? LIMIT ?"
+    """
+    sql = _COMMENT.sub(' ', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _PARAM.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _LIST.sub('(?, ...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+def _caller():
+    flask = sys.modules.get('flask')
+    if flask is not None and flask.has_request_context():
+        rule = flask.request.url_rule
+        return f'{flask.request.method} {rule.rule if rule else flask.request.path}'
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if not module.startswith(_PLUMBING):
+            return f'{module}.{frame.f_code.co_name}'
+        frame = frame.f_back
+    return '?'
+
+
+def _is_read_only(sql):
+    # EXPLAIN ANALYZE executes the statement, so writes must never be sampled
+    text = fingerprint(sql).upper()
+    return (text.startswith(('SELECT', 'WITH'))
+            and not re.search(r'\b(INSERT|UPDATE|DELETE|MERGE|NOTIFY|PG_NOTIFY|NEXTVAL|SET_CONFIG)\b', text))
+
+
+class QueryProfiler:
+    """Per-process statistics by fingerprint"""
+
+    def __init__(self, enabled=PROFILE_ENABLED, slow_ms=SLOW_QUERY_MS, explain_sample=EXPLAIN_SAMPLE):
+        self.enabled = enabled
+        self.slow_ms = slow_ms
+        self.explain_sample = explain_sample
+        self._lock = threading.Lock()
+        self._stats = {}  # fingerprint -> [calls, total_s, max_s, rows, Counter(callers)]
+
+    def record(self, cursor, sql, params, seconds, explain=True):
+        """
+        Called by the profiled cursors after every execute(), including failed ones
+
+        explain=False for async connections, which cannot run the EXPLAIN here.
+        """
+        slow = 0 <= self.slow_ms <= seconds * 1000
+        if not (self.enabled or slow):
+            return
+        sql = query_text(sql, cursor)
+        caller = _caller()
+        rows = max(cursor.rowcount, 0)
+        if self.enabled:
+            key = fingerprint(sql)
+            with self._lock:
+                entry = self._stats.get(key)
+                if entry is None:
+                    if len(self._stats) >= MAX_FINGERPRINTS:
+                        key = OTHER_FINGERPRINT
+                        entry = self._stats.get(key)
+                    if entry is None:
+                        entry = self._stats[key] = [0, 0.0, 0.0, 0, Counter()]
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+                entry[3] += rows
+                entry[4][caller] += 1
+        if slow:
+            print(f"🐢 Slow query {seconds * 1000:.0f} ms, {rows} row(s) [{caller}]: {fingerprint(sql)[:1000]}")
+            if explain and self.explain_sample > 0 and random.random() < self.explain_sample and _is_read_only(sql):
+                self._explain(cursor.connection, sql, params)
+
+    def _explain(self, conn, sql, params):
+        # Never touch a connection whose transaction has failed or is busy
+        if conn.closed or conn.info.transaction_status not in (
+            extensions.TRANSACTION_STATUS_INTRANS, extensions.TRANSACTION_STATUS_IDLE
+        ):
+            return
+        try:
+            # A plain cursor, so the EXPLAIN itself is not profiled
+            cur = conn.cursor(cursor_factory=extensions.cursor)
+            cur.execute('EXPLAIN (ANALYZE, BUFFERS) ' + sql, params)
+            plan = '\n'.join(row[0] for row in cur.fetchall())
+            cur.close()
+            print(f"🔎 EXPLAIN (ANALYZE, BUFFERS):\n{plan}")
+        except Exception as e:
+            print(f"⚠️ EXPLAIN failed: {e}")
+
+    def top(self, n=REPORT_TOP):
+        """
+        Returns the fingerprints with the largest total time
+
+        Returns:
+            list: dicts with fingerprint, calls, total_ms, mean_ms, max_ms, rows, callers
+        """
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda item: item[1][1], reverse=True)[:n]
+            return [{
+                'fingerprint': key,
+                'calls': calls,
+                'total_ms': round(total * 1000, 2),
+                'mean_ms': round(total * 1000 / calls, 3),
+                'max_ms': round(longest * 1000, 2),
+                'rows': rows,
+                'callers': dict(callers.most_common(5)),
+            } for key, (calls, total, longest, rows, callers) in items]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def report(self, n=REPORT_TOP):
+        """Formats top() as a text table"""
+        lines = [f"📊 Top {n} queries by total time (pid {os.getpid()})"]
+        for index, item in enumerate(self.top(n), 1):
+            callers = ', '.join(f'{name} x{count}' for name, count in item['callers'].items())
+            lines.append(
+                f"{index:>3}. {item['total_ms']:>10.1f} ms total | {item['calls']:>7} calls | "
+                f"{item['mean_ms']:>8.2f} ms mean | {item['max_ms']:>8.1f} ms max | {item['rows']:>8} rows"
+            )
+            lines.append(f"     {item['fingerprint'][:300]}")
+            lines.append(f"     callers: {callers}")
+        return '\n'.join(lines)
+
+
+profiler = QueryProfiler()
+
+
+@atexit.register
+def _report_on_exit():
+    if profiler.enabled and profiler.top(1):
+        print(profiler.report())
+
+
+class ProfiledCursor(RealDictCursor):
+    """RealDictCursor that reports every statement to the profiler"""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            self._observe(query, vars, time.perf_counter() - start)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            self._observe(query, None, time.perf_counter() - start)
+
+    def _observe(self, query, vars, seconds):
+        """Hook for subclasses that record more (see db_pool.TimedCursor)"""
+        # Runs in a finally block: profiling must never hide the query's own result or error
+        try:
+            profiler.record(self, query, vars, seconds)
+        except Exception as e:
+            print(f"⚠️ Query profiling failed: {e}")
+
+
+if AsyncCursor is not None:
+    class ProfiledAsyncCursor(AsyncCursor):
+        """psycopg 3 AsyncCursor that reports every statement to the profiler (asgi.py)"""
+
+        async def execute(self, query, params=None, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await super().execute(query, params, **kwargs)
+            finally:
+                try:
+                    profiler.record(self, query, params, time.perf_counter() - start, explain=False)
+                except Exception as e:
+                    print(f"⚠️ Query profiling failed: {e}")
@@ -0,0 +1,165 @@
+"""
+Webhook mode for the admin bot.
+
+Telegram POSTs every update to WEBHOOK_URL; a reverse proxy (Nginx)
+terminates HTTPS and forwards the path to this small HTTP server on
+WEBHOOK_LISTEN:WEBHOOK_PORT. For each request the server:
+
+    1. checks the X-Telegram-Bot-Api-Secret-Token header against the
+       secret registered with setWebhook (403 otherwise)
+    2. drops updates whose update_id was already seen (Telegram re-sends
+       an update when the previous delivery timed out)
+    3. hands the update to UpdateDispatcher and answers 200 right away
+
+UpdateDispatcher runs updates on a pool of worker threads. Updates of one
+chat always go to the same worker, so a user's messages are handled in
+order (the add-product dialog is a state machine), while different chats
+are handled in parallel.
+
+Standard library only, so the packaged bot needs no web framework.
+"""
+
+import hmac
+import json
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+# Telegram updates are small; anything bigger is not from Telegram
+MAX_BODY_SIZE = 1024 * 1024
+SEEN_UPDATES = 10000
+
+
+class RecentUpdateIds:
+    """Bounded set of the last update_ids (oldest forgotten first)"""
+
+    def __init__(self, max_size=SEEN_UPDATES):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._ids = OrderedDict()
+
+    def add(self, update_id):
+        """Remembers update_id; returns False if it was already there"""
+        with self._lock:
+            if update_id in self._ids:
+                return False
+            self._ids[update_id] = None
+            if len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+            return True
+
+
+def _chat_key(update):
+    # Order matters per chat; updates without a chat (rare) are spread by id
+    for name in ('message', 'edited_message', 'channel_post', 'edited_channel_post'):
+        message = update.get(name)
+        if message and message.get('chat'):
+            return message['chat']['id']
+    callback = update.get('callback_query')
+    if callback and callback.get('from'):
+        return callback['from']['id']
+    return update.get('update_id', 0)
+
+
+class UpdateDispatcher:
+    """Worker pool that keeps the order of updates within a chat"""
+
+    def __init__(self, handle, workers=4):
+        """
+        Parameters:
+            handle (callable): Called with one raw update dict on a worker thread
+            workers (int): Number of worker threads
+        """
+        self.handle = handle
+        self._shards = [ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'update-{i}')
+                        for i in range(max(workers, 1))]
+
+    def submit(self, update):
+        shard = zlib.crc32(str(_chat_key(update)).encode()) % len(self._shards)
+        self._shards[shard].submit(self._run, update)
+
+    def _run(self, update):
+        try:
+            self.handle(update)
+        except Exception as e:
+            print(f"❌ Ошибка обработки update {update.get('update_id')}: {e}")
+
+    def shutdown(self, wait=True):
+        for shard in self._shards:
+            shard.shutdown(wait=wait)
+
+
+class WebhookServer:
+    """HTTP endpoint receiving Telegram updates"""
+
+    def __init__(self, dispatcher, secret, host='127.0.0.1', port=8443, path='/'):
+        self.dispatcher = dispatcher
+        self.secret = secret
+        self.path = path
+        self.seen = RecentUpdateIds()
+        self.received = 0
+        self.duplicates = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    @property
+    def address(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}{self.path}'
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if urlsplit(self.path).path != server.path:
+                    return self._reply(404)
+                token = self.headers.get(SECRET_HEADER) or ''
+                if not hmac.compare_digest(token.encode(), server.secret.encode()):
+                    return self._reply(403)
+                length = int(self.headers.get('Content-Length') or 0)
+                if length <= 0 or length > MAX_BODY_SIZE:
+                    return self._reply(413 if length > 0 else 400)
+                try:
+                    update = json.loads(self.rfile.read(length))
+                    update_id = update['update_id']
+                except (ValueError, KeyError, TypeError):
+                    return self._reply(400)
+                # Answer first: Telegram waits for the response before the next delivery
+                self._reply(200)
+                server.received += 1
+                if server.seen.add(update_id):
+                    server.dispatcher.submit(update)
+                else:
+                    server.duplicates += 1
+
+            def do_GET(self):
+                self._reply(405)
+
+            def _reply(self, status):
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                # One line per update would flood the console
+                pass
+
+        return Handler
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def start(self):
+        """Serves on a background thread (tests, embedding)"""
+        thread = threading.Thread(target=self.serve_forever, name='webhook', daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -8,9 +8,8 @@ import json
 import telebot
 from telebot import types
 import cloudinary
-import cloudinary.uploader
 import requests
-from io import BytesIO
+from image_variants import get_storage, store_photo
 from db_operations import (
     add_product, 
     delete_product, 
@@ -36,8 +35,9 @@ class ProductBot:
         self.user_states = {}  # Хранение состояний пользователей
         self.temp_data = {}    # Временные данные для создания товаров
         
-        # Настройка Cloudinary
+        # Настройка Cloudinary и хранилища фото (IMAGE_STORAGE=local для тестов)
         self._setup_cloudinary()
+        self.storage = get_storage()
         
         # Регистрация обработчиков
         self._register_handlers()
@@ -54,15 +54,16 @@ class ProductBot:
         except Exception as e:
             print(f"⚠️ Ошибка настройки Cloudinary: {e}")
     
-    def _upload_photo_to_cloudinary(self, file_id):
+    def _upload_photo(self, file_id):
         """
-        Загружает фото из Telegram в Cloudinary
+        Загружает фото из Telegram в хранилище вместе с уменьшенными копиями
         
         Args:
             file_id (str): Telegram file ID
             
         Returns:
-            str: URL загруженного изображения или None при ошибке
+            tuple: (URL оригинала, список вариантов для image_variants)
+                или (None, None) при ошибке
         """
         try:
             # Получаем информацию о файле
@@ -73,18 +74,13 @@ class ProductBot:
             response = requests.get(file_url)
             if response.status_code != 200:
                 print(f"❌ Ошибка скачивания фото: {response.status_code}")
-                return None
+                return None, None
             
-            # Загружаем в Cloudinary
-            upload_result = cloudinary.uploader.upload(
-                BytesIO(response.content),
-                folder="telegram_shop_products"
-            )
-            
-            return upload_result.get('secure_url')
+            # Оригинал и варианты 200/400/800 px в WebP и JPEG
+            return store_photo(response.content, self.storage)
         except Exception as e:
-            print(f"❌ Ошибка загрузки в Cloudinary: {e}")
-            return None
+            print(f"❌ Ошибка загрузки фото: {e}")
+            return None, None
     
     def _load_authorized_users(self):
         """Загружает список авторизованных пользователей из settingsbot.json"""
@@ -339,8 +335,8 @@ class ProductBot:
                 f"⏳ Загружаю фото {len(current_images) + 1}/9..."
             )
             
-            # Загружаем фото в Cloudinary
-            photo_url = self._upload_photo_to_cloudinary(photo.file_id)
+            # Загружаем фото и его уменьшенные копии
+            photo_url, variants = self._upload_photo(photo.file_id)
             
             # Повторно проверяем состояние после загрузки
             # (могли нажать "Готово" или "Отмена" пока фото загружалось)
@@ -358,6 +354,7 @@ class ProductBot:
             if photo_url:
                 # Добавляем URL в список (безопасно, т.к. проверили выше)
                 user_temp_after['images'].append(photo_url)
+                user_temp_after['image_variants'].append(variants)
                 
                 self.bot.edit_message_text(
                     f"✅ Фото {len(user_temp_after['images'])}/9 загружено успешно!\n\n"
@@ -446,6 +443,7 @@ class ProductBot:
                 
                 self.temp_data[user_id]['category_id'] = selected_category['id']
                 self.temp_data[user_id]['images'] = []  # Инициализируем список для фото
+                self.temp_data[user_id]['image_variants'] = []
                 self.user_states[user_id] = "awaiting_images"
                 
                 markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
@@ -463,10 +461,12 @@ class ProductBot:
                 )
             
             elif state == "awaiting_images":
+                image_variants = []
                 if message.text == "⏭ Пропустить (без фото)":
                     images = ["https://via.placeholder.com/400x400?text=No+Image"]
                 elif message.text == "✅ Готово":
                     images = self.temp_data[user_id].get('images', [])
+                    image_variants = self.temp_data[user_id].get('image_variants', [])
                     if not images:
                         images = ["https://via.placeholder.com/400x400?text=No+Image"]
                 else:
@@ -479,7 +479,8 @@ class ProductBot:
                     description=self.temp_data[user_id]['description'],
                     price=self.temp_data[user_id]['price'],
                     images=images,
-                    category_id=self.temp_data[user_id]['category_id']
+                    category_id=self.temp_data[user_id]['category_id'],
+                    image_variants=image_variants
                 )
                 
                 if product:
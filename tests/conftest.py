@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The application modules live in the repository root (telegram_bot/ is loaded by path)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,77 @@
+"""store_photo with the local storage backend standing in for Cloudinary"""
+
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('PIL')
+from PIL import Image
+
+import image_variants
+
+
+class RecordingStorage(image_variants.LocalStorage):
+    """LocalStorage that remembers every key it was asked to write"""
+
+    def __init__(self, root):
+        super().__init__(root, 'https://cdn.test')
+        self.keys = []
+
+    def save(self, data, key, content_type):
+        self.keys.append(key)
+        return super().save(data, key, content_type)
+
+
+def _jpeg(width, height):
+    image = Image.new('RGB', (width, height), (200, 30, 30))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def _path(storage, url):
+    return Path(storage.root) / url[len(storage.base_url) + 1:]
+
+
+def test_store_photo_writes_every_width_and_format(tmp_path):
+    storage = RecordingStorage(tmp_path)
+    url, variants = image_variants.store_photo(_jpeg(1000, 600), storage, name='photo')
+
+    assert _path(storage, url).is_file()
+    assert [v['width'] for v in variants] == list(image_variants.WIDTHS)
+    for variant in variants:
+        for fmt, (pil_format, extension, _) in image_variants.FORMATS.items():
+            path = _path(storage, variant[fmt])
+            assert path.is_file() and path.suffix == f'.{extension}'
+            with Image.open(path) as stored:
+                assert stored.format == pil_format
+                assert stored.width <= variant['width']
+
+    # One original plus one file per width and format, none written twice
+    assert len(storage.keys) == 1 + len(variants) * len(image_variants.FORMATS)
+    assert len(set(storage.keys)) == len(storage.keys)
+
+
+def test_store_photo_never_upscales(tmp_path):
+    storage = RecordingStorage(tmp_path)
+    _, variants = image_variants.store_photo(_jpeg(300, 200), storage, name='small')
+
+    assert [v['width'] for v in variants] == [200, 300]
+    with Image.open(_path(storage, variants[-1]['jpeg'])) as stored:
+        assert stored.size == (300, 200)
+
+
+def test_cloudinary_public_ids_are_distinct_per_format(monkeypatch):
+    cloudinary_uploader = pytest.importorskip('cloudinary.uploader')
+    public_ids = []
+
+    def upload(file, public_id, **options):
+        public_ids.append(public_id)
+        return {'secure_url': f"https://res.test/{public_id}.{options['format']}"}
+
+    monkeypatch.setattr(cloudinary_uploader, 'upload', upload)
+    _, variants = image_variants.store_photo(_jpeg(1000, 600), image_variants.CloudinaryStorage(), name='photo')
+
+    assert len(set(public_ids)) == len(public_ids)
+    assert all(v['webp'] != v['jpeg'] for v in variants)
@@ -0,0 +1,117 @@
+"""Webhook mode of the admin bot (telegram_bot/webhook.py), driven like Telegram would"""
+
+import importlib.util
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    'bot_webhook', Path(__file__).resolve().parent.parent / 'telegram_bot' / 'webhook.py'
+)
+webhook = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(webhook)
+
+SECRET = 'test-secret'
+
+
+class Recorder:
+    """Handle function of UpdateDispatcher that collects updates"""
+
+    def __init__(self):
+        self.updates = []
+        self._lock = threading.Lock()
+
+    def __call__(self, update):
+        with self._lock:
+            self.updates.append(update)
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while len(self.updates) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.updates
+
+
+@pytest.fixture
+def server():
+    recorder = Recorder()
+    dispatcher = webhook.UpdateDispatcher(recorder, workers=2)
+    # Port 0: the OS picks a free port
+    srv = webhook.WebhookServer(dispatcher, SECRET, host='127.0.0.1', port=0, path='/hook')
+    srv.start()
+    srv.recorder = recorder
+    yield srv
+    srv.shutdown()
+    dispatcher.shutdown()
+
+
+def post(srv, update, secret=SECRET):
+    body = json.dumps(update).encode()
+    request = urllib.request.Request(srv.address, data=body, method='POST',
+                                     headers={'Content-Type': 'application/json'})
+    if secret is not None:
+        request.add_header(webhook.SECRET_HEADER, secret)
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def message(update_id, chat_id, text='hi'):
+    return {'update_id': update_id, 'message': {'message_id': update_id, 'chat': {'id': chat_id}, 'text': text}}
+
+
+@pytest.mark.parametrize('secret', [None, '', 'wrong-secret'])
+def test_rejects_missing_or_wrong_secret(server, secret):
+    assert post(server, message(1, 10), secret=secret) == 403
+    assert post(server, message(2, 10)) == 200
+    assert [u['update_id'] for u in server.recorder.wait_for(1)] == [2]
+
+
+def test_duplicate_update_is_handled_once(server):
+    assert post(server, message(5, 10)) == 200
+    # Telegram re-sends an update whose delivery timed out
+    assert post(server, message(5, 10)) == 200
+    assert post(server, message(6, 10)) == 200
+
+    assert [u['update_id'] for u in server.recorder.wait_for(2)] == [5, 6]
+    time.sleep(0.1)
+    assert len(server.recorder.updates) == 2
+    assert server.duplicates == 1
+
+
+def test_recent_update_ids_forget_oldest_at_capacity():
+    seen = webhook.RecentUpdateIds(max_size=3)
+    assert all(seen.add(update_id) for update_id in (1, 2, 3))
+    assert not seen.add(3)
+    assert seen.add(4)        # evicts 1
+    assert seen.add(1)        # forgotten, so accepted again (evicts 2)
+    assert not seen.add(3)
+    assert not seen.add(4)
+
+
+def test_dispatcher_keeps_order_within_a_chat():
+    handled = []
+    lock = threading.Lock()
+
+    def handle(update):
+        # Slower for earlier updates: out-of-order handling would show up
+        time.sleep(0.005 * (20 - update['update_id'] % 20))
+        with lock:
+            handled.append((update['message']['chat']['id'], update['update_id']))
+
+    dispatcher = webhook.UpdateDispatcher(handle, workers=4)
+    for update_id in range(40):
+        dispatcher.submit(message(update_id, chat_id=100 + update_id % 3))
+    dispatcher.shutdown(wait=True)
+
+    assert len(handled) == 40
+    for chat_id in (100, 101, 102):
+        ids = [update_id for chat, update_id in handled if chat == chat_id]
+        assert ids == sorted(ids)
@@ -92,6 +92,14 @@ pip install --upgrade pip
 pip install -r requirements.txt
 EOF
 
+# Миграции базы данных (один раз на каждый деплой)
+print_step "Применение миграций базы данных..."
+sudo -u $APP_USER bash <<EOF
+cd $APP_DIR
+source venv/bin/activate
+python3 migrations.py
+EOF
+
 # Настройка прав доступа для Nginx
 print_step "Обновление прав доступа для Nginx..."
 chmod 755 /home/$APP_USER
@@ -110,6 +118,10 @@ fi
 # Перезапуск приложения
 print_step "Перезапуск приложения..."
 systemctl restart shop-app
+# Диспетчер уведомлений (есть только на серверах, развёрнутых после его появления)
+if [ -f /etc/systemd/system/shop-notifications.service ]; then
+    systemctl restart shop-notifications
+fi
 
 # Ожидание запуска
 sleep 3
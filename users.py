@@ -0,0 +1,214 @@
+"""
+Telegram users: identity upsert, identity cache and Mini App bootstrap.
+
+POST /api/auth/telegram resolves a Telegram identity to a users row with a
+single INSERT ... ON CONFLICT (telegram_id) DO UPDATE ... RETURNING, so two
+concurrent first logins cannot race on the unique constraint. Resolved rows
+are kept in a bounded per-worker LRU cache with a TTL; a repeat login with
+the same profile is answered without touching the database.
+
+POST /api/bootstrap replaces the startup sequence auth -> cart -> favorites
+with one request and one SQL statement: the user is upserted by telegram_id
+and the same statement returns the user row, the cart (shaped like
+GET /api/cart/<user_id>) and the favorites (shaped like
+GET /api/favorites/<user_id>).
+
+Settings (environment variables):
+    USER_CACHE_SIZE  max cached identities per worker, 0 disables (default 10000)
+    USER_CACHE_TTL   seconds a cached identity is trusted (default 300)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import catalog
+
+
+class InvalidIdentity(ValueError):
+    """Raised when the request does not carry a usable Telegram identity (HTTP 400)"""
+
+
+def parse_identity(data):
+    """
+    Extracts the Telegram identity sent by the Mini App
+
+    Returns:
+        dict: telegram_id, username, first_name, last_name
+
+    Raises:
+        InvalidIdentity: If telegram_id is missing or not a number
+    """
+    data = data or {}
+    telegram_id = data.get('telegram_id')
+    if not telegram_id:
+        raise InvalidIdentity('telegram_id is required')
+    try:
+        telegram_id = int(telegram_id)
+    except (TypeError, ValueError):
+        raise InvalidIdentity('telegram_id must be a number')
+    return {
+        'telegram_id': telegram_id,
+        'username': data.get('username', ''),
+        'first_name': data.get('first_name', ''),
+        'last_name': data.get('last_name', ''),
+    }
+
+
+# Inserts the user or refreshes the profile fields. Unchanged profiles are not
+# rewritten (no dead tuple per login); the existing row is then read instead.
+# xmax = 0 only for a freshly inserted row.
+_UPSERT_CTE = '''
+    upserted AS (
+        INSERT INTO users (telegram_id, username, first_name, last_name)
+        VALUES (%(telegram_id)s, %(username)s, %(first_name)s, %(last_name)s)
+        ON CONFLICT (telegram_id) DO UPDATE
+        SET username = EXCLUDED.username, first_name = EXCLUDED.first_name, last_name = EXCLUDED.last_name
+        WHERE (users.username, users.first_name, users.last_name)
+              IS DISTINCT FROM (EXCLUDED.username, EXCLUDED.first_name, EXCLUDED.last_name)
+        RETURNING users.*, (xmax = 0) AS is_new
+    ),
+    app_user AS (
+        SELECT * FROM upserted
+        UNION ALL
+        SELECT users.*, FALSE AS is_new FROM users
+        WHERE telegram_id = %(telegram_id)s AND NOT EXISTS (SELECT 1 FROM upserted)
+    )
+'''
+
+UPSERT_SQL = f'''
+    WITH {_UPSERT_CTE}
+    SELECT * FROM app_user
+'''
+
+BOOTSTRAP_SQL = f'''
+    WITH {_UPSERT_CTE}
+    SELECT u.*,
+           COALESCE((
+               SELECT jsonb_agg({catalog.CARD.jsonb_sql('p')} || jsonb_build_object('quantity', c.quantity))
+               FROM cart c JOIN products p ON p.id = c.product_id
+               WHERE c.user_id = u.id
+           ), '[]'::jsonb) AS cart,
+           COALESCE((
+               SELECT jsonb_agg({catalog.CARD.jsonb_sql('p')})
+               FROM favorites f JOIN products p ON p.id = f.product_id
+               WHERE f.user_id = u.id
+           ), '[]'::jsonb) AS favorites
+    FROM app_user u
+'''
+
+
+PROFILE_FIELDS = ('username', 'first_name', 'last_name')
+
+
+class UserCache:
+    """Bounded LRU of telegram_id -> users row, entries expire after `ttl` seconds"""
+
+    def __init__(self, max_size=10000, ttl=300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # telegram_id -> (user, expires_at)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, identity):
+        """
+        Returns the cached users row for an identity, or None
+
+        A cached row only counts if its profile fields equal the identity's,
+        so a changed name or username still reaches the database.
+        """
+        if self.max_size <= 0:
+            return None
+        telegram_id = identity['telegram_id']
+        with self._lock:
+            entry = self._entries.get(telegram_id)
+            if entry is not None:
+                user, expires_at = entry
+                if expires_at > time.monotonic() and all(
+                    (user.get(field) or '') == (identity.get(field) or '') for field in PROFILE_FIELDS
+                ):
+                    self._entries.move_to_end(telegram_id)
+                    self.hits += 1
+                    return user
+                del self._entries[telegram_id]
+            self.misses += 1
+        return None
+
+    def put(self, user):
+        """Stores a users row (dict with telegram_id)"""
+        if self.max_size <= 0 or user.get('telegram_id') is None:
+            return
+        with self._lock:
+            self._entries[user['telegram_id']] = (dict(user), time.monotonic() + self.ttl)
+            self._entries.move_to_end(user['telegram_id'])
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+user_cache = UserCache(
+    max_size=int(os.getenv('USER_CACHE_SIZE', '10000')),
+    ttl=float(os.getenv('USER_CACHE_TTL', '300')),
+)
+
+
+def upsert_user(cur, identity):
+    """
+    Creates or refreshes the user for a Telegram identity (the caller commits)
+
+    Returns:
+        tuple: (users row as dict, is_new)
+    """
+    cur.execute(UPSERT_SQL, identity)
+    row = cur.fetchone()
+    if row is None:
+        # See bootstrap(): the row was committed after this statement's snapshot
+        cur.execute(UPSERT_SQL, identity)
+        row = cur.fetchone()
+    is_new = row.pop('is_new')
+    return row, is_new
+
+
+def bootstrap(cur, identity):
+    """
+    Upserts the user and loads their cart and favorites (the caller commits)
+
+    Parameters:
+        cur: Cursor of an open transaction
+        identity (dict): Result of parse_identity
+
+    Returns:
+        dict: {'user': dict, 'is_new': bool, 'cart': list, 'favorites': list}
+    """
+    cur.execute(BOOTSTRAP_SQL, identity)
+    row = cur.fetchone()
+    if row is None:
+        # A concurrent first login committed the row after this statement's
+        # snapshot was taken; it is visible to a new statement
+        cur.execute(BOOTSTRAP_SQL, identity)
+        row = cur.fetchone()
+    return bootstrap_result(row)
+
+
+def bootstrap_result(row):
+    """Splits a BOOTSTRAP_SQL row into the /api/bootstrap response"""
+    row = dict(row)
+    cart = row.pop('cart')
+    favorites = row.pop('favorites')
+    is_new = row.pop('is_new')
+    return {'user': row, 'is_new': is_new, 'cart': cart, 'favorites': favorites}